@@ -0,0 +1,365 @@
+"""Compiles parse trees into nested Python closures.
+
+The tree-walking evaluator in interpreter.py rediscovers the shape of an
+expression every time it evaluates it.  Here, we analyze each expression
+once, and produce an 'execution procedure': a Python function that takes
+an environment and returns the expression's value.  Special-form dispatch,
+syntax checks and the constant/variable decision are all made during
+analysis, so executing the procedure does only the remaining work.
+
+Function invocations and 'let' bodies run in environment.Frames.  During
+analysis we track the Scopes of the enclosing frames, innermost first, so
+that each variable reference is resolved to a lexical address up front.
+Names that no enclosing scope binds are looked up by name, starting just
+beyond the outermost frame.
+
+Proper tail recursion is preserved: execution procedures for expressions
+in a tail context may return an interpreter._DelayedCall, exactly as the
+tree-walking evaluator does.
+"""
+
+import datatypes
+import environment
+import interpreter
+import lexical
+
+
+def execute(ast, env):
+    """Analyze an expression, then execute it in an environment."""
+    return _force(analyze(ast)(env))
+
+
+def analyze(expr, scopes=(), tail=False):
+    """Return an execution procedure for an expression.
+
+    Args:
+        expr: The parse tree to analyze.
+        scopes: The Scopes of the frames enclosing the expression,
+            innermost first.
+        tail: Whether the expression is in a tail context, so that its
+            execution procedure may return a _DelayedCall.
+    """
+    if isinstance(expr, list):
+        return _analyze_list(expr, scopes, tail)
+    elif isinstance(expr, str):
+        # Strings represent variables.
+        return _analyze_variable(expr, scopes)
+    else:
+        # Everything else evaluates to itself.
+        return _analyze_constant(expr)
+
+
+def _analyze_constant(value):
+    """Analyze a self-evaluating expression."""
+    return lambda env: value
+
+
+def _analyze_variable(name, scopes):
+    """Analyze a variable reference."""
+    address = lexical.resolve(name, scopes)
+    if address is None:
+        return _analyze_free_variable(name, len(scopes))
+
+    depth, index = address
+    def execute_variable(env):
+        for _ in xrange(depth):
+            env = env.parent
+        value = env.values[index]
+        if value is environment.unassigned:
+            # Not defined yet, so it still refers to an outer binding.
+            return env.parent[name]
+        return value
+
+    if depth == 0:
+        def execute_local_variable(env):
+            value = env.values[index]
+            if value is environment.unassigned:
+                return env.parent[name]
+            return value
+        return execute_local_variable
+    return execute_variable
+
+
+def _analyze_free_variable(name, depth):
+    """Analyze a reference to a variable bound outside of all frames."""
+    if depth == 0:
+        return lambda env: env[name]
+
+    def execute_free_variable(env):
+        for _ in xrange(depth):
+            env = env.parent
+        return env[name]
+    return execute_free_variable
+
+
+def _analyze_assignment(name, scopes, assign_free, assign_slot):
+    """Build a procedure that finds where a name is bound, then assigns it.
+
+    Args:
+        name: The name being assigned.
+        scopes: The enclosing Scopes, innermost first.
+        assign_free: A function of (env, name, value), used when no frame
+            binds the name.  It is passed the environment beyond the
+            outermost frame.
+        assign_slot: A function of (frame, index, value), used when a
+            frame binds the name.
+
+    Returns a function of (env, value).
+    """
+    address = lexical.resolve(name, scopes)
+    if address is None:
+        depth = len(scopes)
+        def assign(env, value):
+            for _ in xrange(depth):
+                env = env.parent
+            return assign_free(env, name, value)
+    else:
+        depth, index = address
+        def assign(env, value):
+            for _ in xrange(depth):
+                env = env.parent
+            return assign_slot(env, index, value)
+    return assign
+
+
+def _analyze_list(expr, scopes, tail):
+    """Analyze a list, which is special syntax or a function call."""
+    if not expr:
+        # It's a null value
+        return _analyze_constant(datatypes.null)
+
+    directive, data = expr[0], expr[1:]
+    if isinstance(directive, str) and directive in analyzers:
+        return analyzers[directive](data, scopes, tail)
+    else:
+        return _analyze_application(directive, data, scopes, tail)
+
+
+def _analyze_application(operator_expr, operand_exprs, scopes, tail):
+    """Analyze a function call."""
+    operator_proc = analyze(operator_expr, scopes)
+    operand_procs = [analyze(operand, scopes) for operand in operand_exprs]
+
+    def execute_application(env):
+        function = operator_proc(env)
+        inputs = [operand_proc(env) for operand_proc in operand_procs]
+        return _apply(function, inputs, tail)
+    return execute_application
+
+
+def apply(function, inputs):
+    """Apply a function to evaluated inputs, from Python code."""
+    return _force(_apply(function, list(inputs), False))
+
+
+def _apply(function, inputs, tail):
+    """Apply a function to some evaluated inputs.
+
+    If 'tail' is True, a LispFunction's body is not evaluated: instead, a
+    _DelayedCall is returned, which the calling context must force.
+    """
+    if isinstance(function, datatypes.LispFunction):
+        assert len(inputs) == len(function.arg_names)
+        scope = interpreter.function_scope(function)
+        if scope.padding:
+            inputs.extend(scope.padding)
+        invocation_env = environment.Frame(scope, inputs, function.env)
+        call = interpreter._DelayedCall(function, invocation_env)
+        return call if tail else _force(call)
+    else:
+        # It's a builtin Python function.
+        return function(*inputs)
+
+
+def _force(value):
+    """Resolve a value which may be a _DelayedCall."""
+    while isinstance(value, interpreter._DelayedCall):
+        value = _function_body(value.function)(value.invocation_env)
+    return value
+
+
+def _function_body(function):
+    """Get the execution procedure for a LispFunction's body.
+
+    Functions created by this module come with an analyzed body.  Those
+    created by the tree-walking evaluator are analyzed on first call.
+    Since we cannot know the Scopes enclosing such a function, its free
+    variables are looked up by name.
+    """
+    if function.body is None:
+        scope = interpreter.function_scope(function)
+        function.body = _analyze_sequence(function.exprs, (scope,),
+                                          tail=True)
+    return function.body
+
+
+# Analyzers for special forms.
+def _analyze_if(data, scopes, tail):
+    """Analyze an 'if' expression."""
+    assert len(data) == 3
+    cond_proc = analyze(data[0], scopes)
+    true_case_proc = analyze(data[1], scopes, tail)
+    false_case_proc = analyze(data[2], scopes, tail)
+
+    def execute_if(env):
+        if interpreter._is_truthy(cond_proc(env)):
+            return true_case_proc(env)
+        else:
+            return false_case_proc(env)
+    return execute_if
+
+
+def _analyze_define(data, scopes, tail):
+    """Analyze a 'define' expression."""
+    assert data
+    defined = data[0]
+
+    if isinstance(defined, list):
+        assert len(data) >= 2
+        assert defined
+        name, arg_names = defined[0], defined[1:]
+        value_proc = _analyze_function(arg_names, data[1:], scopes, name)
+    else:
+        assert len(data) == 2
+        name = defined
+        if interpreter.is_lambda(data[1]):
+            lambda_data = data[1][1:]
+            assert len(lambda_data) >= 2
+            value_proc = _analyze_function(lambda_data[0], lambda_data[1:],
+                                           scopes, name)
+        else:
+            value_proc = analyze(data[1], scopes)
+
+    assign = _analyze_assignment(name, scopes, _define_free, _define_slot)
+    def execute_define(env):
+        assign(env, value_proc(env))
+    return execute_define
+
+
+def _define_free(env, name, value):
+    env[name] = value
+
+
+def _define_slot(frame, index, value):
+    frame.values[index] = value
+
+
+def _analyze_lambda(data, scopes, tail):
+    """Analyze a 'lambda' expression."""
+    assert len(data) >= 2
+    return _analyze_function(data[0], data[1:], scopes)
+
+
+def _analyze_function(arg_names, implementation, scopes, name=None):
+    """Helper for analyzing a function's creation."""
+    scope = lexical.function_scope(arg_names, implementation)
+    body = _analyze_sequence(implementation, (scope,) + scopes, tail=True)
+
+    def execute_function(env):
+        function = datatypes.LispFunction(env, arg_names, implementation,
+                                          name)
+        function.scope = scope
+        function.body = body
+        return function
+    return execute_function
+
+
+def _analyze_set(data, scopes, tail):
+    """Analyze a 'set!' expression."""
+    assert len(data) == 2
+    name, expr = data
+    value_proc = analyze(expr, scopes)
+    assign = _analyze_assignment(name, scopes, _set_free, _set_slot)
+    return lambda env: assign(env, value_proc(env))
+
+
+def _set_free(env, name, value):
+    return env.redefine(name, value)
+
+
+def _set_slot(frame, index, value):
+    original = frame.values[index]
+    if original is environment.unassigned:
+        # Not defined yet, so it still refers to an outer binding.
+        return frame.parent.redefine(frame.scope.names[index], value)
+    frame.values[index] = value
+    return original
+
+
+def _analyze_begin(data, scopes, tail):
+    """Analyze a 'begin' expression."""
+    return _analyze_sequence(data, scopes, tail)
+
+
+def _analyze_sequence(expressions, scopes, tail):
+    """Analyze a sequence of expressions.
+
+    The resulting value is the last expression's value.
+    """
+    if not expressions:
+        # An empty begin has no effect and returns nothing.
+        return _analyze_constant(None)
+
+    leading_procs = [analyze(expression, scopes)
+                     for expression in expressions[:-1]]
+    # The last one may be in a tail context, so we do not force it.
+    last_proc = analyze(expressions[-1], scopes, tail)
+    if not leading_procs:
+        return last_proc
+
+    def execute_sequence(env):
+        for proc in leading_procs:
+            proc(env)
+        return last_proc(env)
+    return execute_sequence
+
+
+def _analyze_let(data, scopes, tail):
+    """Analyze a 'let' expression."""
+    assert data
+    bindings, exprs = data[0], data[1:]
+
+    binding_procs = []
+    for binding in bindings:
+        assert len(binding) == 2
+        # Evaluate the expression in the enclosing environment.
+        binding_procs.append(analyze(binding[1], scopes))
+    scope = lexical.let_scope(bindings, exprs)
+    body_proc = _analyze_sequence(exprs, (scope,) + scopes, tail)
+
+    def execute_let(enclosing_env):
+        values = [proc(enclosing_env) for proc in binding_procs]
+        if scope.padding:
+            values.extend(scope.padding)
+        return body_proc(environment.Frame(scope, values, enclosing_env))
+    return execute_let
+
+
+def _analyze_quote(data, scopes, tail):
+    """Analyze a 'quote' expression."""
+    return _analyze_constant(interpreter._eval_quote(data, None))
+
+
+def _analyze_time(data, scopes, tail):
+    """Analyze a 'time' expression."""
+    assert len(data) == 1
+    proc = analyze(data[0], scopes)
+
+    def execute_time(env):
+        start = interpreter.start_timer()
+        value = proc(env)
+        interpreter.report_time(start)
+        return value
+    return execute_time
+
+
+analyzers = {
+    'if': _analyze_if,
+    'define': _analyze_define,
+    'lambda': _analyze_lambda,
+    'set!': _analyze_set,
+    'begin': _analyze_begin,
+    'let': _analyze_let,
+    'quote': _analyze_quote,
+    'time': _analyze_time,
+}
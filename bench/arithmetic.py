@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+"""Compares arithmetic on native ints against arithmetic on Fractions.
+
+Integers used to be parsed into Fractions, so every builtin paid for
+fractions.Fraction's normalization.  Now they are native ints.  This
+times the pyfuncs builtins on both representations.
+
+Run from the repository root:  python bench/arithmetic.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import datatypes
+import pyfuncs
+
+_OPERATIONS = (
+    ('+', (17, 25)),
+    ('-', (17, 25)),
+    ('*', (17, 25)),
+    ('/', (100, 4)),
+    ('/', (100, 7)),
+    ('<', (17, 25)),
+)
+
+
+def _best_time(function, args, number=20000, repeat=3):
+    """Return the best time per call, in microseconds."""
+    timer = timeit.Timer(lambda: function(*args))
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+
+def main():
+    print '%-12s %12s %12s %8s' % ('operation', 'Fraction (us)', 'int (us)',
+                                   'speedup')
+    for name, args in _OPERATIONS:
+        function = pyfuncs.functions[name]
+        fraction_args = [datatypes.Fraction(arg) for arg in args]
+        fraction_time = _best_time(function, fraction_args)
+        int_time = _best_time(function, args)
+        label = '(%s %s %s)' % (name, args[0], args[1])
+        print '%-12s %12.2f %12.2f %7.1fx' % (
+            label, fraction_time, int_time, fraction_time / int_time)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+
+"""Compares the engines on deep non-tail recursion.
+
+A naive recursive length over a list nests one pending call per element.
+The walk and analyze engines recurse in Python, and overflow its stack
+after a few hundred elements.  The vm and cek engines keep their own
+stacks, and are limited only by memory.
+
+Run from the repository root:  python bench/deep_recursion.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import interpreter
+import lexer
+import lisp
+import parser
+
+_DEPTHS = (100, 1000, 10000, 100000, 1000000)
+
+_DEFINITIONS = '''
+(define (naive-length l)
+  (if (eq? l '())
+      0
+    (+ 1 (naive-length (cdr l)))))
+(define (build n acc)
+  (if (< n 1)
+      acc
+    (build (- n 1) (cons n acc))))
+'''
+
+
+def _parse(source):
+    return list(parser.parse_trees(
+        lexer.TokenSupply(lexer.lisp_tokens(source.splitlines(True)))))
+
+
+def _time_depth(engine, env, depth):
+    """Return the time to measure a list of some length, or None."""
+    interpreter.execute(_parse('(define items (build %d (quote ())))' %
+                               depth)[0], env, engine)
+    tree, = _parse('(naive-length items)')
+    start = time.time()
+    try:
+        result = interpreter.execute(tree, env, engine)
+    except RuntimeError:
+        # Python's recursion limit.
+        return None
+    assert result == depth
+    return time.time() - start
+
+
+def main():
+    print '%-10s' % 'depth' + ''.join(
+        '%12s' % ('%s (s)' % engine) for engine in interpreter.ENGINES)
+    envs = {}
+    for engine in interpreter.ENGINES:
+        envs[engine] = lisp._base_env(engine)
+        for tree in _parse(_DEFINITIONS):
+            interpreter.execute(tree, envs[engine], engine)
+    # Once an engine overflows, deeper runs would too.
+    overflowed = set()
+    for depth in _DEPTHS:
+        cells = []
+        for engine in interpreter.ENGINES:
+            elapsed = None
+            if engine not in overflowed:
+                elapsed = _time_depth(engine, envs[engine], depth)
+            if elapsed is None:
+                overflowed.add(engine)
+                cells.append('%12s' % 'overflow')
+            else:
+                cells.append('%12.3f' % elapsed)
+        print '%-10d' % depth + ''.join(cells)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+"""Compares the evaluation engines on tail-call style loops.
+
+Run from the repository root:  python bench/engines.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import interpreter
+import lexer
+import lisp
+import parser
+
+# Like test/tail-call.lisp, but without printing, which would dominate.
+_PROGRAMS = (
+    ('self tail call', '''
+(define (count n)
+  (if (< n 100000)
+      (count (+ n 1))
+    n))
+(count 0)
+'''),
+    ('mutual tail call', '''
+(define (count-a n)
+  (if (< n 100000)
+      (count-b (+ n 1))
+    n))
+(define (count-b n)
+  (count-a (+ n 1)))
+(count-a 0)
+'''),
+    ('let in loop', '''
+(define (loop n acc)
+  (let ((next (+ n 1)))
+    (if (< next 50000)
+        (loop next (+ acc n))
+      acc)))
+(loop 0 0)
+'''),
+)
+
+
+def _time_program(source, engine, repeat=3):
+    """Return the best wall time of running source with an engine."""
+    trees = list(parser.parse_trees(
+        lexer.TokenSupply(lexer.lisp_tokens(source.splitlines(True)))))
+    best = None
+    for _ in range(repeat):
+        env = lisp._base_env(engine)
+        start = time.time()
+        for tree in trees:
+            interpreter.execute(tree, env, engine)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    print '%-20s' % 'program' + ''.join(
+        '%12s' % ('%s (s)' % engine) for engine in interpreter.ENGINES)
+    for name, source in _PROGRAMS:
+        print '%-20s' % name + ''.join(
+            '%12.3f' % _time_program(source, engine)
+            for engine in interpreter.ENGINES)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""Compares looking keys up in a hash table with an association list.
+
+assoc scans the list, so a lookup takes time linear in its length; hash-ref
+takes constant time.  Tables and lists of symbol keys are built in Python,
+then looked up from Lisp, with eq and equal tables, and with assq and assoc.
+
+Run from the repository root:  python bench/hash_tables.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import datatypes
+import hashtable
+import interpreter
+import lexer
+import lisp
+import parser
+
+# Entry counts, and how many lookups to time for each.
+_SIZES = ((10000, 1000), (1000000, 20))
+
+_DEFINITIONS = '''
+(define (lookups find keys)
+  (fold (lambda (key found) (find key)) #f keys))
+'''
+
+
+def _parse(source):
+    return list(parser.parse_trees(
+        lexer.TokenSupply(lexer.lisp_tokens(source.splitlines(True)))))
+
+
+def _time(env, source, lookups):
+    """Return the wall time of one lookup, in microseconds."""
+    tree, = _parse(source)
+    start = time.time()
+    interpreter.execute(tree, env)
+    return (time.time() - start) / lookups * 1e6
+
+
+def _populate(env, entries, lookups):
+    """Bind tables, an alist and keys to look up, spread over the entries."""
+    keys = [datatypes.Symbol('key-%d' % index) for index in xrange(entries)]
+    for kind in hashtable.KINDS:
+        table = hashtable.HashTable(kind)
+        for index, key in enumerate(keys):
+            table.set(key, index)
+        env[kind + '-table'] = table
+    env['alist'] = datatypes.make_list(
+        datatypes.Pair(key, index) for index, key in enumerate(keys))
+    step = entries // lookups
+    env['wanted'] = datatypes.make_list(keys[step - 1::step][:lookups])
+
+
+def main():
+    env = lisp._base_env()
+    for tree in _parse(_DEFINITIONS):
+        interpreter.execute(tree, env)
+    print '%-9s %12s %12s %12s %12s' % (
+        'entries', 'eq (us)', 'equal (us)', 'assq (us)', 'assoc (us)')
+    for entries, lookups in _SIZES:
+        _populate(env, entries, lookups)
+        times = [
+            _time(env, '(lookups (lambda (key) (hash-ref %s-table key)) '
+                  'wanted)' % kind, lookups)
+            for kind in hashtable.KINDS]
+        times.extend(
+            _time(env, '(lookups (lambda (key) (%s key alist)) wanted)' %
+                  function, lookups)
+            for function in ('assq', 'assoc'))
+        print '%-9d %12.1f %12.1f %12.1f %12.1f' % tuple([entries] + times)
+
+if __name__ == '__main__':
+    main()
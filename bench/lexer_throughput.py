@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+"""Measures lexer throughput on large generated Lisp inputs.
+
+Run from the repository root:  python bench/lexer_throughput.py [megabytes]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import lexer
+
+_FORM = '''(define (count-%(n)d n) ; A comment.
+  (if (< n %(n)d)
+      (count-%(n)d (+ n 1))
+    (vector-ref #(1 2 3) 0)))
+'''
+
+
+def _generate_lines(megabytes):
+    """Make lines of Lisp totalling roughly some number of megabytes."""
+    lines = []
+    size, n = 0, 0
+    while size < megabytes * 2 ** 20:
+        form = _FORM % {'n': n}
+        lines.extend(form.splitlines(True))
+        size += len(form)
+        n += 1
+    return lines
+
+
+def _throughput(chunks):
+    """Return (tokens, megabytes per second) for lexing some chunks."""
+    size = sum(len(chunk) for chunk in chunks)
+    start = time.time()
+    token_count = 0
+    for _ in lexer.lisp_tokens(chunks):
+        token_count += 1
+    elapsed = time.time() - start
+    return token_count, size / 2.0 ** 20 / elapsed
+
+
+def main(argv):
+    megabytes = float(argv[1]) if len(argv) > 1 else 4
+    lines = _generate_lines(megabytes)
+    # Without comments, which would run to the end of the line.
+    one_line = ''.join(lines).replace('; A comment.', '').replace('\n', ' ')
+    for name, chunks in (('many lines', lines),
+                         ('one long line', [one_line])):
+        token_count, rate = _throughput(chunks)
+        print '%-14s %5.1f MB %9d tokens %6.2f MB/s' % (
+            name, megabytes, token_count, rate)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+"""Compares loading s-expression data with evaluating it as code.
+
+The same records are loaded three ways: by evaluating a file that
+defines them as one quoted list, with load-data, which reads them
+straight into a list, and by folding over file-data's Stream of them,
+which holds one record at a time.  Each way runs in a child process,
+which reports its time and the growth of its peak resident set.
+
+Run from the repository root:  python bench/load_data.py [records]
+"""
+
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import lisp
+
+# Without vectors, which the parser does not take.
+_RECORD = '(item %(n)d "name-%(n)d" #t (tags red green) (%(n)d 2 3))\n'
+
+
+def _write_files(directory, records):
+    """Write the records as data, and as code that quotes them."""
+    data_path = os.path.join(directory, 'data.lisp')
+    code_path = os.path.join(directory, 'code.lisp')
+    with open(data_path, 'w') as data_file:
+        for n in xrange(records):
+            data_file.write(_RECORD % {'n': n})
+    with open(code_path, 'w') as code_file:
+        code_file.write("(define data '(\n")
+        with open(data_path) as data_file:
+            shutil.copyfileobj(data_file, code_file)
+        code_file.write('))\n')
+    return data_path, code_path
+
+
+def _measure(env, run):
+    """Run a function in a child process.
+
+    Returns its wall time in seconds, and its peak memory growth in
+    kilobytes.
+    """
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            start = time.time()
+            run(env)
+            elapsed = time.time() - start
+            after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            os.write(write_end, '%f %d' % (elapsed, after - before))
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    result = os.read(read_end, 64).split()
+    os.close(read_end)
+    os.waitpid(pid, 0)
+    return float(result[0]), int(result[1])
+
+
+def _source_runner(source):
+    def run(env):
+        lisp._execute_file(source.splitlines(True), env)
+    return run
+
+
+def main(argv):
+    records = int(argv[1]) if len(argv) > 1 else 1000000
+    env = lisp._base_env()
+    directory = tempfile.mkdtemp()
+    try:
+        data_path, code_path = _write_files(directory, records)
+        ways = (
+            ('evaluate quoted code',
+             lambda env: lisp._execute_path(code_path, env, use_cache=False)),
+            ('load-data', _source_runner(
+                '(define data (load-data "%s"))' % data_path)),
+            ('fold over file-data', _source_runner(
+                '(fold (lambda (record count) (+ count 1)) 0 '
+                '(file-data "%s"))' % data_path)),
+        )
+        print '%d records, %.1f MB:' % (
+            records, os.path.getsize(data_path) / 2.0 ** 20)
+        for name, run in ways:
+            elapsed, kilobytes = _measure(env, run)
+            print '  %-22s %8.2f s %10d KB' % (name, elapsed, kilobytes)
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""Measures how parallel-map scales with the number of worker processes.
+
+Maps a CPU-bound Lisp function over a list, first with the serial map
+builtin, then with parallel-map on pools of 1, 2, 4, ... workers, up to
+the number of CPUs.  Near-linear scaling halves the time with each
+doubling of workers.
+
+Run from the repository root:  python bench/parallel_map.py
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import interpreter
+import lexer
+import lisp
+import parallel
+import parser
+
+_SETUP = '''
+(define (fib n)
+  (if (< n 2)
+      n
+    (+ (fib (- n 1)) (fib (- n 2)))))
+(define (score x) (fib (+ 14 (- x (* 4 (/ x 4))))))
+(define (iota n acc)
+  (if (> n 0)
+      (iota (- n 1) (cons n acc))
+    acc))
+(define inputs (iota 64 '()))
+'''
+
+
+def _trees(source):
+    return list(parser.parse_trees(
+        lexer.TokenSupply(lexer.lisp_tokens(source.splitlines(True)))))
+
+
+def _time(env, source, repeat=3):
+    """Return the best wall time of running source in env."""
+    trees = _trees(source)
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        for tree in trees:
+            interpreter.execute(tree, env)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    env = lisp._base_env()
+    for tree in _trees(_SETUP):
+        interpreter.execute(tree, env)
+
+    serial_time = _time(env, '(map score inputs)')
+    print '%-22s %10.3fs' % ('map', serial_time)
+
+    workers = 1
+    while workers <= multiprocessing.cpu_count():
+        parallel.start(workers)
+        # Warm the pool up, so worker start-up is not timed.
+        _time(env, '(parallel-map score inputs)', repeat=1)
+        parallel_time = _time(env, '(parallel-map score inputs)')
+        print '%-22s %10.3fs %7.2fx' % (
+            'parallel-map, %d worker%s' % (workers, 's'[workers == 1:]),
+            parallel_time, serial_time / parallel_time)
+        workers *= 2
+    parallel.shutdown()
+
+if __name__ == '__main__':
+    main()
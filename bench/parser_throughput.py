@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""Measures parser throughput on a large generated s-expression file.
+
+The file is written to a temporary directory, then read and parsed a
+line at a time, as lisp.py reads a script, with and without recording
+source positions.  The time includes lexing.  The trees are kept, as
+lisp.py keeps a script's trees, and as a SourceMap keeps those it has
+recorded.
+
+Run from the repository root:  python bench/parser_throughput.py [megabytes]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import lexer
+import parser
+
+_FORM = '''(define (count-%(n)d n) ; A comment.
+  (if (< n %(n)d)
+      (count-%(n)d (+ n 1))
+    '(record "name %(n)d" #\\x #t (nested (data %(n)d)))))
+'''
+
+
+def _write_file(path, megabytes):
+    """Write Lisp totalling roughly some number of megabytes."""
+    size, n = 0, 0
+    with open(path, 'w') as lisp_file:
+        while size < megabytes * 2 ** 20:
+            form = _FORM % {'n': n}
+            lisp_file.write(form)
+            size += len(form)
+            n += 1
+    return size
+
+
+def _parse(path, positions):
+    """Return (tree count, seconds) for parsing a file."""
+    source_map = parser.SourceMap(path) if positions else None
+    start = time.time()
+    with open(path) as lisp_file:
+        tokens = lexer.TokenSupply(
+            lexer.lisp_tokens(lisp_file, positions=positions))
+        trees = list(parser.parse_trees(tokens, source_map))
+    return len(trees), time.time() - start
+
+
+def main(argv):
+    megabytes = float(argv[1]) if len(argv) > 1 else 50
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'data.lisp')
+        size = _write_file(path, megabytes) / 2.0 ** 20
+        for name, positions in (('plain', False), ('with positions', True)):
+            tree_count, elapsed = _parse(path, positions)
+            print '%-15s %5.1f MB %8d trees %7.2f s %6.2f MB/s' % (
+                name, size, tree_count, elapsed, size / elapsed)
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""Compares persistent maps with copy-on-write dicts.
+
+A copy-on-write dict copies all of its entries on every update, so that
+the old version is left intact; a persistent map copies only the trie
+nodes on the path to the key, and shares the rest.  This times building
+a map one assoc at a time, and looking up each of its keys, then
+measures the memory held by snapshots that each differ from the last by
+one update.
+
+Run from the repository root:  python bench/persistent_maps.py
+"""
+
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pmap
+
+_SIZES = (1000, 10000, 30000)
+# The size of the map to take snapshots of, and how many to take.
+_SNAPSHOT_SIZE = 10000
+_SNAPSHOTS = 200
+
+
+class _CopyOnWriteDict(object):
+    """An immutable map, which copies its dict to make a new version."""
+    def __init__(self, entries=None):
+        self._entries = entries or {}
+
+    def assoc(self, key, value):
+        entries = self._entries.copy()
+        entries[key] = value
+        return _CopyOnWriteDict(entries)
+
+    def get(self, key, default):
+        return self._entries.get(key, default)
+
+
+def _build(empty, size):
+    result = empty
+    for key in xrange(size):
+        result = result.assoc(key, key)
+    return result
+
+
+def _time(function, *args):
+    """Return the result and wall time of a call, in seconds."""
+    start = time.time()
+    result = function(*args)
+    return result, time.time() - start
+
+
+def _lookups(map_, size):
+    for key in xrange(size):
+        map_.get(key, None)
+
+
+def _snapshot_kilobytes(empty):
+    """Measure the memory held by snapshots, in a child process.
+
+    Returns the growth of the child's peak resident set, in kilobytes.
+    """
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            current = _build(empty, _SNAPSHOT_SIZE)
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            snapshots = []
+            for index in xrange(_SNAPSHOTS):
+                current = current.assoc(index, -index)
+                snapshots.append(current)
+            after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            os.write(write_end, str(after - before))
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    kilobytes = int(os.read(read_end, 64))
+    os.close(read_end)
+    os.waitpid(pid, 0)
+    return kilobytes
+
+
+def main():
+    print '%-8s %16s %16s %16s %16s' % (
+        'entries', 'pmap build (s)', 'dict build (s)',
+        'pmap get (us)', 'dict get (us)')
+    for size in _SIZES:
+        persistent, pmap_build = _time(_build, pmap.empty, size)
+        copied, dict_build = _time(_build, _CopyOnWriteDict(), size)
+        _, pmap_get = _time(_lookups, persistent, size)
+        _, dict_get = _time(_lookups, copied, size)
+        print '%-8d %16.3f %16.3f %16.2f %16.2f' % (
+            size, pmap_build, dict_build,
+            pmap_get / size * 1e6, dict_get / size * 1e6)
+    print
+    print '%d snapshots of a %d-entry map, one update apart:' % (
+        _SNAPSHOTS, _SNAPSHOT_SIZE)
+    print '  pmap: %7d KB' % _snapshot_kilobytes(pmap.empty)
+    print '  dict: %7d KB' % _snapshot_kilobytes(_CopyOnWriteDict())
+
+if __name__ == '__main__':
+    main()
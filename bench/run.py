@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+"""Runs the benchmark workloads, and compares saved results.
+
+Each workload in bench/workloads is run in its own process, which times
+lexing (lexer.lisp_tokens), parsing (parser.parse_trees) and evaluation
+(interpreter.execute) separately, and reports its peak memory use.  The
+workloads are short, so lexing and parsing time the source repeated
+--source-copies times, to take long enough to measure; evaluation runs
+it once.
+
+Run from the repository root:
+
+    python bench/run.py run --output before.json
+    ... change the interpreter ...
+    python bench/run.py run --output after.json
+    python bench/run.py compare before.json after.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+_REPO_DIR = os.path.dirname(_BENCH_DIR)
+_WORKLOAD_DIR = os.path.join(_BENCH_DIR, 'workloads')
+sys.path.insert(0, _REPO_DIR)
+
+import interpreter
+import lexer
+import lisp
+import parser
+
+# The timed phases of each workload, in order.
+PHASES = ('lex', 'parse', 'execute')
+# How many times the source is repeated for the lex and parse phases,
+# by default.  At this many, each workload's lex and parse phases take
+# tens of milliseconds, well above compare's --min-seconds.
+_SOURCE_COPIES = 500
+
+
+def _workload_paths(names):
+    """Find the workload files, optionally restricted to some names."""
+    paths = sorted(glob.glob(os.path.join(_WORKLOAD_DIR, '*.lisp')))
+    if names:
+        paths = [path for path in paths if _workload_name(path) in names]
+    return paths
+
+
+def _workload_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _best_time(function, repeat):
+    """Return the best wall time of calling a function, and its last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.time()
+        result = function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure(path, engine, repeat, source_copies):
+    """Time each phase of one workload in this process.
+
+    Returns a dict of seconds per phase, and the peak resident memory.
+    The peak is taken before the source copies are lexed and parsed, so
+    that it reflects running the workload once.
+    """
+    with open(path) as workload_file:
+        lines = workload_file.readlines()
+    trees = list(parser.parse_trees(
+        lexer.TokenSupply(lexer.lisp_tokens(lines))))
+
+    def execute():
+        # Build the base environment outside of the timed region.
+        env = lisp._base_env(engine)
+        start = time.time()
+        for tree in trees:
+            interpreter.execute(tree, env, engine)
+        return time.time() - start
+    execute_time = min(execute() for _ in range(repeat))
+
+    # ru_maxrss is in kilobytes on Linux.
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    copied_lines = lines * source_copies
+    lex_time, token_list = _best_time(
+        lambda: list(lexer.lisp_tokens(copied_lines)), repeat)
+    parse_time, _ = _best_time(
+        lambda: list(parser.parse_trees(lexer.TokenSupply(token_list))),
+        repeat)
+    return {
+        'lex': lex_time,
+        'parse': parse_time,
+        'execute': execute_time,
+        'peak_memory_kb': peak_kb,
+    }
+
+
+def run(args):
+    """Run each workload in a fresh process, and save the results."""
+    results = {}
+    for path in _workload_paths(args.workloads):
+        name = _workload_name(path)
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), 'measure', path,
+             '--engine', args.engine, '--repeat', str(args.repeat),
+             '--source-copies', str(args.source_copies)],
+            cwd=_REPO_DIR)
+        results[name] = json.loads(output)
+        print '%-18s' % name + ''.join(
+            ' %s %8.3fs' % (phase, results[name][phase]) for phase in PHASES
+        ) + ' peak %7d KB' % results[name]['peak_memory_kb']
+
+    report = {
+        'engine': args.engine,
+        'repeat': args.repeat,
+        'source_copies': args.source_copies,
+        'python': platform.python_version(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2, sort_keys=True)
+
+
+def compare(args):
+    """Compare two saved runs, and flag regressions.
+
+    Exits with status 1 if any phase of any workload got slower, or used
+    more memory, by more than the threshold.  Timing changes smaller than
+    --min-seconds are noise, and never count.
+    """
+    with open(args.baseline) as baseline_file:
+        baseline_report = json.load(baseline_file)
+    with open(args.candidate) as candidate_file:
+        candidate_report = json.load(candidate_file)
+    if (baseline_report.get('source_copies') !=
+            candidate_report.get('source_copies')):
+        print ('Warning: the runs lexed and parsed different numbers of '
+               'source copies.')
+    baseline = baseline_report['results']
+    candidate = candidate_report['results']
+
+    regressions = 0
+    for name in sorted(set(baseline) & set(candidate)):
+        for metric in PHASES + ('peak_memory_kb',):
+            before, after = baseline[name][metric], candidate[name][metric]
+            change = (after - before) / float(before) if before else 0.0
+            if metric in PHASES and abs(after - before) < args.min_seconds:
+                change = 0.0
+            flag = ''
+            if change > args.threshold:
+                flag = 'REGRESSION'
+                regressions += 1
+            elif change < -args.threshold:
+                flag = 'improved'
+            print '%-18s %-15s %12.4g %12.4g %+7.1f%% %s' % (
+                name, metric, before, after, change * 100, flag)
+
+    for name in sorted(set(baseline) ^ set(candidate)):
+        print '%-18s only in one run' % name
+    if regressions:
+        print '%d regression(s) beyond %.0f%%.' % (regressions,
+                                                   args.threshold * 100)
+        sys.exit(1)
+
+
+def _arg_parser():
+    """Make the parser for command line arguments."""
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = arg_parser.add_subparsers()
+
+    run_parser = subparsers.add_parser('run', help='Run the workloads.')
+    run_parser.add_argument('workloads', nargs='*',
+                            help='Workload names.  Default: all of them.')
+    run_parser.add_argument('--engine', choices=interpreter.ENGINES,
+                            default=interpreter.DEFAULT_ENGINE)
+    run_parser.add_argument('--repeat', type=int, default=3,
+                            help='Keep the best of this many timings.')
+    run_parser.add_argument('--source-copies', type=int,
+                            default=_SOURCE_COPIES,
+                            help='Lex and parse the source repeated this '
+                            'many times.')
+    run_parser.add_argument('--output', help='Save the results as JSON.')
+    run_parser.set_defaults(command=run)
+
+    compare_parser = subparsers.add_parser(
+        'compare', help='Compare two saved runs.')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='The fractional change that counts as '
+                                'a regression.')
+    compare_parser.add_argument('--min-seconds', type=float, default=0.005,
+                                help='Ignore timing changes smaller than '
+                                'this.')
+    compare_parser.set_defaults(command=compare)
+
+    # Used by 'run', to measure each workload in a fresh process.
+    measure_parser = subparsers.add_parser('measure')
+    measure_parser.add_argument('path')
+    measure_parser.add_argument('--engine', choices=interpreter.ENGINES,
+                                default=interpreter.DEFAULT_ENGINE)
+    measure_parser.add_argument('--repeat', type=int, default=3)
+    measure_parser.add_argument('--source-copies', type=int,
+                                default=_SOURCE_COPIES)
+    measure_parser.set_defaults(
+        command=lambda args: sys.stdout.write(json.dumps(
+            measure(args.path, args.engine, args.repeat,
+                    args.source_copies))))
+    return arg_parser
+
+
+def main(argv):
+    args = _arg_parser().parse_args(argv[1:])
+    args.command(args)
+
+if __name__ == '__main__':
+    main(sys.argv)
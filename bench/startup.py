@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""Compares ways of building the base environment at startup.
+
+Builds the base environment plus a generated library of functions from
+source (lexing and parsing everything), from cached parse trees, and by
+loading an image.
+
+Run from the repository root:  python bench/startup.py [functions]
+"""
+
+import os
+import shutil
+import cStringIO
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import image
+import lisp
+
+_FUNCTION = '''
+(define (helper-%(n)d x y)
+  (let ((sum (+ x y %(n)d)))
+    (if (> sum 100)
+        (* sum 2)
+      (helper-%(n)d (+ x 1) y))))
+'''
+
+
+def _best_time(function, repeat=5):
+    """Return the best wall time of calling a function."""
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv):
+    function_count = int(argv[1]) if len(argv) > 1 else 1000
+    temp_dir = tempfile.mkdtemp()
+    try:
+        library_path = os.path.join(temp_dir, 'library.lisp')
+        with open(library_path, 'w') as library_file:
+            for n in range(function_count):
+                library_file.write(_FUNCTION % {'n': n})
+
+        def from_source(use_cache):
+            env = lisp._base_env(use_cache=use_cache)
+            lisp._execute_path(library_path, env, use_cache)
+            return env
+
+        image_buffer = cStringIO.StringIO()
+        image.dump(from_source(False), image_buffer)
+        image_data = image_buffer.getvalue()
+
+        # Warm the parse tree cache.
+        from_source(True)
+        results = (
+            ('from source', _best_time(lambda: from_source(False))),
+            ('cached trees', _best_time(lambda: from_source(True))),
+            ('image', _best_time(
+                lambda: image.load(cStringIO.StringIO(image_data)))),
+        )
+    finally:
+        shutil.rmtree(temp_dir)
+
+    print 'Base environment plus %d library functions:' % function_count
+    source_time = results[0][1]
+    for name, elapsed in results:
+        print '%-14s %8.2f ms %7.1fx' % (name, elapsed * 1000,
+                                         source_time / elapsed)
+
+if __name__ == '__main__':
+    main(sys.argv)
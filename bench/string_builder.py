@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+"""Compares building a long string by string-append with a string port.
+
+Appending to a string copies it, so a report built a line at a time with
+string-append takes quadratic time.  An output string port appends to a
+growing buffer, in amortized constant time.
+
+Run from the repository root:  python bench/string_builder.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import interpreter
+import lexer
+import lisp
+import parser
+
+_LINES = (1000, 8000, 64000)
+
+_DEFINITIONS = '''
+(define (append-report report n)
+  (if (< n 1)
+      report
+    (append-report
+      (string-append report "line " (number->string n) "\\n")
+      (- n 1))))
+(define (port-report port n)
+  (if (< n 1)
+      (get-output-string port)
+    (begin
+      (display "line " port)
+      (display n port)
+      (newline port)
+      (port-report port (- n 1)))))
+'''
+
+
+def _parse(source):
+    return list(parser.parse_trees(
+        lexer.TokenSupply(lexer.lisp_tokens(source.splitlines(True)))))
+
+
+def _time(env, source):
+    """Return the wall time of evaluating one expression."""
+    tree, = _parse(source)
+    start = time.time()
+    interpreter.execute(tree, env)
+    return time.time() - start
+
+
+def main():
+    env = lisp._base_env()
+    for tree in _parse(_DEFINITIONS):
+        interpreter.execute(tree, env)
+    print '%-8s %18s %18s' % ('lines', 'string-append (s)', 'string port (s)')
+    for lines in _LINES:
+        print '%-8d %18.3f %18.3f' % (
+            lines, _time(env, '(append-report "" %d)' % lines),
+            _time(env, '(port-report (open-output-string) %d)' % lines))
+
+if __name__ == '__main__':
+    main()
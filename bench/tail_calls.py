@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+"""Measures what tail-recursive loops allocate, with and without frame reuse.
+
+The tree-walking engine used to build a Frame, an argument list and a
+_DelayedCall for every tail call, and a new Applier for every call.  Now
+a tail call whose caller's frame cannot have been captured reuses that
+frame, and recycles its old values list for the arguments.  This counts
+the frames and _DelayedCalls each loop constructs per iteration, and
+times the loops, with interpreter.REUSE_FRAMES on and off.
+
+Python 2 has no tracemalloc, so we count constructions by wrapping the
+classes' __init__ methods, in a separate run from the timed ones.
+
+Run from the repository root:  python bench/tail_calls.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import environment
+import interpreter
+import lexer
+import lisp
+import parser
+
+_ITERATIONS = 100000
+
+_PROGRAMS = (
+    ('self tail call', '''
+(define (count n)
+  (if (< n %d)
+      (count (+ n 1))
+    n))
+(count 0)
+''' % _ITERATIONS),
+    ('mutual tail call', '''
+(define (count-a n)
+  (if (< n %d)
+      (count-b (+ n 1))
+    n))
+(define (count-b n)
+  (count-a (+ n 1)))
+(count-a 0)
+''' % _ITERATIONS),
+    ('event loop', '''
+(define (handle event total)
+  (+ total event))
+(define (loop n total)
+  (define event (- n (* 2 (/ n 2))))
+  (if (< n %d)
+      (loop (+ n 1) (handle event total))
+    total))
+(loop 0 0)
+''' % _ITERATIONS),
+)
+
+# The classes whose constructions we count.
+_COUNTED = (
+    ('Frame', environment.Frame),
+    ('_DelayedCall', interpreter._DelayedCall),
+)
+
+
+def _count_constructions(counts):
+    """Make the counted classes tally their constructions in counts."""
+    for name, cls in _COUNTED:
+        cls.__init__ = _counting_init(cls.__init__, name, counts)
+
+
+def _counting_init(original_init, name, counts):
+    def counting_init(self, *args, **kwargs):
+        counts[name] += 1
+        original_init(self, *args, **kwargs)
+    counting_init.original = original_init
+    return counting_init
+
+
+def _restore():
+    """Undo _count_constructions."""
+    for _, cls in _COUNTED:
+        cls.__init__ = cls.__init__.original
+
+
+def _run(trees):
+    """Return the wall time of running trees with the walk engine."""
+    env = lisp._base_env('walk')
+    start = time.time()
+    for tree in trees:
+        interpreter.execute(tree, env, 'walk')
+    return time.time() - start
+
+
+def main():
+    print '%-18s %-6s %8s %13s %10s' % (
+        'program', 'reuse', 'Frame', '_DelayedCall', 'time (s)')
+    for name, source in _PROGRAMS:
+        trees = list(parser.parse_trees(
+            lexer.TokenSupply(lexer.lisp_tokens(source.splitlines(True)))))
+        for reuse in (False, True):
+            interpreter.REUSE_FRAMES = reuse
+            counts = dict((counted, 0) for counted, _ in _COUNTED)
+            _count_constructions(counts)
+            try:
+                _run(trees)
+            finally:
+                _restore()
+            elapsed = min(_run(trees) for _ in range(3))
+            print '%-18s %-6s %8.2f %13.2f %10.3f' % (
+                name, 'on' if reuse else 'off',
+                counts['Frame'] / float(_ITERATIONS),
+                counts['_DelayedCall'] / float(_ITERATIONS), elapsed)
+    print '(Constructions are per iteration.)'
+
+if __name__ == '__main__':
+    main()
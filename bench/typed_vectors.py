@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+
+"""Compares element-by-element Lisp loops with bulk vector builtins.
+
+Each task is run once as a Lisp loop over vector-ref and vector-set!,
+and once with the bulk builtins from typedvector.py on typed vectors.
+
+Run from the repository root:  python bench/typed_vectors.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import interpreter
+import lexer
+import lisp
+import parser
+import typedvector
+
+_SIZE = 20000
+
+_SETUP = '''
+(define size %d)
+(define (iota-into vec i)
+  (if (< i size)
+      (begin
+       (vector-set! vec i i)
+       (iota-into vec (+ i 1)))
+    vec))
+(define a (iota-into (make-vector size 0) 0))
+(define b (iota-into (make-vector size 0) 0))
+(define fa (vector->f64vector a))
+(define fb (vector->f64vector b))
+''' % _SIZE
+
+# Each task is (name, loop source, bulk source).
+_TASKS = (
+    ('sum', '''
+(define (sum-from i total)
+  (if (< i size)
+      (sum-from (+ i 1) (+ total (vector-ref a i)))
+    total))
+(sum-from 0 0)
+''', '(vector-sum fa)'),
+    ('dot product', '''
+(define (dot-from i total)
+  (if (< i size)
+      (dot-from (+ i 1) (+ total (* (vector-ref a i) (vector-ref b i))))
+    total))
+(dot-from 0 0)
+''', '(vector-dot fa fb)'),
+    ('add', '''
+(define out (make-vector size 0))
+(define (add-from i)
+  (if (< i size)
+      (begin
+       (vector-set! out i (+ (vector-ref a i) (vector-ref b i)))
+       (add-from (+ i 1)))
+    out))
+(add-from 0)
+''', '(vector+ fa fb)'),
+    ('scale', '''
+(define out (make-vector size 0))
+(define (scale-from i)
+  (if (< i size)
+      (begin
+       (vector-set! out i (* 3 (vector-ref a i)))
+       (scale-from (+ i 1)))
+    out))
+(scale-from 0)
+''', '(vector* fa 3)'),
+)
+
+
+def _trees(source):
+    return list(parser.parse_trees(
+        lexer.TokenSupply(lexer.lisp_tokens(source.splitlines(True)))))
+
+
+def _time_task(source, engine, repeat=3):
+    """Return the best wall time of running source after the setup."""
+    setup_trees, trees = _trees(_SETUP), _trees(source)
+    best = None
+    for _ in range(repeat):
+        env = lisp._base_env(engine)
+        for tree in setup_trees:
+            interpreter.execute(tree, env, engine)
+        start = time.time()
+        for tree in trees:
+            interpreter.execute(tree, env, engine)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    engine = interpreter.DEFAULT_ENGINE
+    print '%d elements, %s engine, NumPy %s' % (
+        _SIZE, engine, 'on' if typedvector.numpy else 'off')
+    print '%-12s %12s %12s %8s' % ('task', 'loop (ms)', 'bulk (ms)',
+                                   'speedup')
+    for name, loop_source, bulk_source in _TASKS:
+        loop_time = _time_task(loop_source, engine)
+        bulk_time = _time_task(bulk_source, engine)
+        print '%-12s %12.2f %12.2f %7.1fx' % (
+            name, loop_time * 1000, bulk_time * 1000, loop_time / bulk_time)
+
+if __name__ == '__main__':
+    main()
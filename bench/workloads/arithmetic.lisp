@@ -0,0 +1,19 @@
+; Big exact arithmetic: bignum factorials and rational sums.
+(define (factorial n acc)
+  (if (> n 1)
+      (factorial (- n 1) (* acc n))
+    acc))
+
+(define (harmonic n total)
+  (if (> n 0)
+      (harmonic (- n 1) (+ total (/ 1 n)))
+    total))
+
+(define (repeat n)
+  (if (> n 0)
+      (begin
+       (factorial 1000 1)
+       (repeat (- n 1)))
+    n))
+(repeat 20)
+(harmonic 300 0)
@@ -0,0 +1,19 @@
+; Many closure-based counters, like test/begin.lisp.
+(define (counter init)
+  (define count init)
+  (lambda ()
+    (set! count (+ count 1))
+    count))
+
+(define (bump ctr times)
+  (if (> times 0)
+      (begin
+       (ctr)
+       (bump ctr (- times 1)))
+    (ctr)))
+
+(define (make-and-bump n total)
+  (if (> n 0)
+      (make-and-bump (- n 1) (+ total (bump (counter n) 20)))
+    total))
+(make-and-bump 2000 0)
@@ -0,0 +1,17 @@
+; Building and walking long lists of pairs.  Lists end with a zero, since
+; there is no null? builtin.
+(define (build n tail)
+  (if (> n 0)
+      (build (- n 1) (cons n tail))
+    tail))
+
+(define (sum-list items total)
+  (if (> (car items) 0)
+      (sum-list (cdr items) (+ total (car items)))
+    total))
+
+(define (repeat n total)
+  (if (> n 0)
+      (repeat (- n 1) (+ total (sum-list (build 5000 (cons 0 ())) 0)))
+    total))
+(repeat 8 0)
@@ -0,0 +1,8 @@
+; Mutual tail recursion, like count-a/count-b in test/tail-call.lisp.
+(define (count-a n)
+  (if (< n 100000)
+      (count-b (+ n 1))
+    n))
+(define (count-b n)
+  (count-a (+ n 1)))
+(count-a 0)
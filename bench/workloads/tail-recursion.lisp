@@ -0,0 +1,6 @@
+; Deep tail recursion: one self-recursive loop.
+(define (count n limit)
+  (if (< n limit)
+      (count (+ n 1) limit)
+    n))
+(count 0 100000)
@@ -0,0 +1,23 @@
+; Element-by-element vector loops.
+(define size 1000)
+(define vec (make-vector size 0))
+
+(define (fill-squares i)
+  (if (< i size)
+      (begin
+       (vector-set! vec i (* i i))
+       (fill-squares (+ i 1)))
+    vec))
+
+(define (sum-from i total)
+  (if (< i size)
+      (sum-from (+ i 1) (+ total (vector-ref vec i)))
+    total))
+
+(define (passes n total)
+  (if (> n 0)
+      (begin
+       (fill-squares 0)
+       (passes (- n 1) (+ total (sum-from 0 0))))
+    total))
+(passes 20 0)
@@ -0,0 +1,298 @@
+"""Compiles parse trees into bytecode for the virtual machine in vm.py.
+
+A Code object holds a flat list of (opcode, argument) instructions and a
+pool of constants.  Every expression's instructions leave exactly one
+value on the VM's stack.  Variables live in environment.Frame slots, and
+are resolved to lexical addresses at compile time, just as the analyzer
+does.  Names bound outside of all frames are looked up by name.
+
+Calls in a tail context compile to TAIL_CALL, which replaces the calling
+function's activation instead of stacking a new one.
+"""
+
+import datatypes
+import interpreter
+import lexical
+
+from opcodes import (CONST, LOAD_LOCAL, LOAD_DEREF, LOAD_FREE, DEFINE_SLOT,
+                     DEFINE_FREE, SET_SLOT, SET_FREE, POP, JUMP,
+                     JUMP_IF_FALSE, MAKE_FUNCTION, CALL, TAIL_CALL, RETURN,
+                     LET, END_LET, TIME_START, TIME_END, OPCODE_NAMES)
+
+
+class Code(object):
+    """A unit of compiled code: a function body or a top-level form."""
+    def __init__(self, name, scope=None):
+        self.name = name
+        # The Scope of the frame this code runs in.  None for top-level
+        # code, which runs directly in the environment it is given.
+        self.scope = scope
+        self.instructions = []
+        self.constants = []
+
+    def emit(self, opcode, arg=None):
+        """Append an instruction, and return its position."""
+        self.instructions.append((opcode, arg))
+        return len(self.instructions) - 1
+
+    def patch(self, position, arg):
+        """Change the argument of the instruction at a position."""
+        opcode, _ = self.instructions[position]
+        self.instructions[position] = (opcode, arg)
+
+    def constant(self, value):
+        """Get the constants pool index of a value, adding it if needed."""
+        for index, existing in enumerate(self.constants):
+            if existing is value:
+                return index
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def __repr__(self):
+        return 'Code[%s]' % self.name
+
+
+class FunctionTemplate(object):
+    """What MAKE_FUNCTION needs to create a LispFunction."""
+    def __init__(self, name, arg_names, exprs, code):
+        self.name = name
+        self.arg_names = arg_names
+        self.exprs = exprs
+        self.code = code
+
+    def __repr__(self):
+        return 'FunctionTemplate[%s]' % self.code.name
+
+
+def compile_toplevel(expr):
+    """Compile a top-level expression, which runs in a given environment."""
+    code = Code('<toplevel>')
+    _compile(expr, code, (), tail=False)
+    code.emit(RETURN)
+    return code
+
+
+def compile_function(function):
+    """Compile the body of a LispFunction that has no bytecode yet.
+
+    Since we cannot know the Scopes enclosing such a function, its free
+    variables are looked up by name.
+    """
+    if function.code is None:
+        function.code = _compile_body(
+            '<lambda>', function.exprs, interpreter.function_scope(function),
+            ())
+    return function.code
+
+
+def _compile_body(name, exprs, scope, scopes):
+    """Compile a function body, to run in a frame for 'scope'."""
+    code = Code(name, scope)
+    _compile_sequence(exprs, code, (scope,) + scopes, tail=True)
+    code.emit(RETURN)
+    return code
+
+
+def _compile(expr, code, scopes, tail):
+    """Append the instructions for an expression to some code."""
+    if isinstance(expr, list):
+        if not expr:
+            # It's a null value
+            code.emit(CONST, code.constant(datatypes.null))
+            return
+        directive, data = expr[0], expr[1:]
+        if isinstance(directive, str) and directive in _compilers:
+            _compilers[directive](data, code, scopes, tail)
+        else:
+            _compile_application(directive, data, code, scopes, tail)
+    elif isinstance(expr, str):
+        # Strings represent variables.
+        _compile_variable(expr, code, scopes)
+    else:
+        # Everything else evaluates to itself.
+        code.emit(CONST, code.constant(expr))
+
+
+def _compile_variable(name, code, scopes):
+    """Compile a variable reference."""
+    address = lexical.resolve(name, scopes)
+    if address is None:
+        code.emit(LOAD_FREE, (len(scopes), name))
+    elif address[0] == 0:
+        code.emit(LOAD_LOCAL, address[1])
+    else:
+        code.emit(LOAD_DEREF, address)
+
+
+def _compile_assignment(name, code, scopes, slot_opcode, free_opcode):
+    """Compile the store half of a 'define' or 'set!'."""
+    address = lexical.resolve(name, scopes)
+    if address is None:
+        code.emit(free_opcode, (len(scopes), name))
+    else:
+        code.emit(slot_opcode, address)
+
+
+def _compile_application(operator_expr, operand_exprs, code, scopes, tail):
+    """Compile a function call."""
+    _compile(operator_expr, code, scopes, tail=False)
+    for operand in operand_exprs:
+        _compile(operand, code, scopes, tail=False)
+    code.emit(TAIL_CALL if tail else CALL, len(operand_exprs))
+
+
+def _compile_if(data, code, scopes, tail):
+    """Compile an 'if' expression."""
+    assert len(data) == 3
+    cond_expr, true_case_expr, false_case_expr = data
+    _compile(cond_expr, code, scopes, tail=False)
+    jump_to_false_case = code.emit(JUMP_IF_FALSE)
+    _compile(true_case_expr, code, scopes, tail)
+    jump_to_end = code.emit(JUMP)
+    code.patch(jump_to_false_case, len(code.instructions))
+    _compile(false_case_expr, code, scopes, tail)
+    code.patch(jump_to_end, len(code.instructions))
+
+
+def _compile_define(data, code, scopes, tail):
+    """Compile a 'define' expression."""
+    assert data
+    defined = data[0]
+
+    if isinstance(defined, list):
+        assert len(data) >= 2
+        assert defined
+        name, arg_names = defined[0], defined[1:]
+        _compile_function(name, arg_names, data[1:], code, scopes)
+    else:
+        assert len(data) == 2
+        name = defined
+        if interpreter.is_lambda(data[1]):
+            lambda_data = data[1][1:]
+            assert len(lambda_data) >= 2
+            _compile_function(name, lambda_data[0], lambda_data[1:], code,
+                              scopes)
+        else:
+            _compile(data[1], code, scopes, tail=False)
+    _compile_assignment(name, code, scopes, DEFINE_SLOT, DEFINE_FREE)
+
+
+def _compile_lambda(data, code, scopes, tail):
+    """Compile a 'lambda' expression."""
+    assert len(data) >= 2
+    _compile_function(None, data[0], data[1:], code, scopes)
+
+
+def _compile_function(name, arg_names, implementation, code, scopes):
+    """Helper for compiling a function's creation."""
+    scope = lexical.function_scope(arg_names, implementation)
+    body = _compile_body(name or '<lambda>', implementation, scope, scopes)
+    template = FunctionTemplate(name, arg_names, implementation, body)
+    code.emit(MAKE_FUNCTION, code.constant(template))
+
+
+def _compile_set(data, code, scopes, tail):
+    """Compile a 'set!' expression."""
+    assert len(data) == 2
+    name, expr = data
+    _compile(expr, code, scopes, tail=False)
+    _compile_assignment(name, code, scopes, SET_SLOT, SET_FREE)
+
+
+def _compile_begin(data, code, scopes, tail):
+    """Compile a 'begin' expression."""
+    _compile_sequence(data, code, scopes, tail)
+
+
+def _compile_sequence(expressions, code, scopes, tail):
+    """Compile a sequence of expressions, keeping the last one's value."""
+    if not expressions:
+        # An empty begin has no effect and returns nothing.
+        code.emit(CONST, code.constant(None))
+        return
+
+    for expression in expressions[:-1]:
+        _compile(expression, code, scopes, tail=False)
+        code.emit(POP)
+    _compile(expressions[-1], code, scopes, tail)
+
+
+def _compile_let(data, code, scopes, tail):
+    """Compile a 'let' expression."""
+    assert data
+    bindings, exprs = data[0], data[1:]
+
+    for binding in bindings:
+        assert len(binding) == 2
+        # Evaluate the expression in the enclosing environment.
+        _compile(binding[1], code, scopes, tail=False)
+    scope = lexical.let_scope(bindings, exprs)
+    code.emit(LET, (code.constant(scope), len(bindings)))
+    _compile_sequence(exprs, code, (scope,) + scopes, tail)
+    # In a tail context, the activation ends with the body, so there is
+    # no need to leave the frame.
+    if not tail:
+        code.emit(END_LET)
+
+
+def _compile_quote(data, code, scopes, tail):
+    """Compile a 'quote' expression."""
+    code.emit(CONST, code.constant(interpreter._eval_quote(data, None)))
+
+
+def _compile_time(data, code, scopes, tail):
+    """Compile a 'time' expression."""
+    assert len(data) == 1
+    code.emit(TIME_START)
+    _compile(data[0], code, scopes, tail=False)
+    code.emit(TIME_END)
+
+
+_compilers = {
+    'if': _compile_if,
+    'define': _compile_define,
+    'lambda': _compile_lambda,
+    'set!': _compile_set,
+    'begin': _compile_begin,
+    'let': _compile_let,
+    'quote': _compile_quote,
+    'time': _compile_time,
+}
+
+
+def disassemble(code):
+    """Return a human-readable listing of some Code.
+
+    The code of any functions it creates is listed afterwards.
+    """
+    lines = []
+    pending = [code]
+    while pending:
+        current = pending.pop(0)
+        if lines:
+            lines.append('')
+        scope_names = ' '.join(current.scope.names) if current.scope else ''
+        lines.append('%s (slots: %s)' % (current.name, scope_names))
+        for position, (opcode, arg) in enumerate(current.instructions):
+            lines.append('%5d %-14s %s' % (
+                position, OPCODE_NAMES[opcode],
+                _describe_arg(current, opcode, arg)))
+            if opcode == MAKE_FUNCTION:
+                pending.append(current.constants[arg].code)
+    return '\n'.join(lines)
+
+
+def _describe_arg(code, opcode, arg):
+    """Format an instruction's argument for disassembly."""
+    if arg is None:
+        return ''
+    elif opcode in (CONST, MAKE_FUNCTION):
+        return '%d (%r)' % (arg, code.constants[arg])
+    elif opcode == LET:
+        return '%d (%r) %d' % (arg[0], code.constants[arg[0]], arg[1])
+    elif opcode in (LOAD_DEREF, DEFINE_SLOT, SET_SLOT):
+        return '%d %d' % arg
+    elif opcode in (LOAD_FREE, DEFINE_FREE, SET_FREE):
+        return '%d %s' % arg
+    else:
+        return '%s' % arg
@@ -0,0 +1,274 @@
+"""Evaluates parse trees on an explicit continuation stack.
+
+The tree-walking evaluator in interpreter.py uses Python's stack for
+Lisp's: each pending Lisp expression holds several Python frames, so
+deep non-tail recursion exceeds Python's recursion limit.  Here, in the
+style of a CEK machine, the state is an expression to evaluate (the
+control), the environment it is evaluated in, and a continuation-- a
+stack of entries saying what to do with each value.  The stack is a
+Python list, so recursion depth is limited only by memory, or by
+max_depth.  A builtin that calls back into Lisp, like map, starts a
+machine of its own through interpreter.apply, so only the nesting of
+such builtins uses Python's stack; max_depth limits each machine
+separately.
+
+Each continuation entry is a tuple, whose first element is the function
+that continues with a value.  Special forms and continuation functions
+return the next (expression, environment) pair to evaluate.  If they
+have a value instead, they return (value, _VALUE).
+
+Calls in tail position push nothing, so tail recursion runs in constant
+space.
+"""
+
+import datatypes
+import environment
+import interpreter
+
+# The most continuation entries that may be pending at once, or None for
+# no limit.  About one entry is pending for each nested expression that
+# waits on a value, such as a non-tail call.
+max_depth = None
+
+# Marks that the control register holds a value, in place of an
+# environment.
+_VALUE = object()
+
+
+class DepthExceeded(RuntimeError):
+    """Raised when a program's continuation grows past max_depth."""
+
+
+def execute(ast, env):
+    """Evaluate an expression in an environment, and return its value."""
+    return _run(ast, env, [])
+
+
+def apply(function, inputs):
+    """Apply a function to evaluated inputs, from Python code."""
+    stack = []
+    if isinstance(function, datatypes.LispFunction):
+        expr, env = _invoke(function, list(inputs), stack)
+    else:
+        expr, env = function(*inputs), _VALUE
+    return _run(expr, env, stack)
+
+
+def _run(expr, env, stack):
+    """Run the machine from a state, until the stack is used up.
+
+    Returns the final value.
+    """
+    limit = max_depth
+    while True:
+        if env is not _VALUE:
+            if isinstance(expr, list) and expr:
+                directive = expr[0]
+                if isinstance(directive, str) and directive in _special_forms:
+                    expr, env = _special_forms[directive](expr[1:], env,
+                                                          stack)
+                else:
+                    # A function call.  Evaluate the operator, then each
+                    # operand, collecting the values.
+                    stack.append((_continue_application, expr, [], env))
+                    expr = directive
+                if limit is not None and len(stack) > limit:
+                    raise DepthExceeded(
+                        'Maximum depth of %d exceeded.' % limit)
+                continue
+            expr = _eval_atom(expr, env)
+            env = _VALUE
+
+        if not stack:
+            return expr
+        entry = stack.pop()
+        expr, env = entry[0](entry, expr, stack)
+
+
+def _eval_atom(expr, env):
+    """Evaluate an expression that is not a special form or a call."""
+    if isinstance(expr, str):
+        # Strings represent variables.
+        return env[expr]
+    elif isinstance(expr, list):
+        # It's a null value.
+        return datatypes.null
+    else:
+        # Everything else evaluates to itself.
+        return expr
+
+
+def _sequence(exprs, env, stack):
+    """Evaluate a sequence of expressions, the last in tail position."""
+    if not exprs:
+        # An empty begin has no effect and returns nothing.
+        return None, _VALUE
+    if len(exprs) > 1:
+        stack.append((_continue_sequence, exprs, 1, env))
+    return exprs[0], env
+
+
+# Continuations.
+def _continue_application(entry, value, stack):
+    _, expr, values, env = entry
+    values.append(value)
+    if len(values) < len(expr):
+        stack.append(entry)
+        return expr[len(values)], env
+
+    function, inputs = values[0], values[1:]
+    if isinstance(function, datatypes.LispFunction):
+        return _invoke(function, inputs, stack)
+    else:
+        # It's a builtin Python function.
+        return function(*inputs), _VALUE
+
+
+def _invoke(function, inputs, stack):
+    """Start evaluating a LispFunction's body, for a call."""
+    assert len(inputs) == len(function.arg_names)
+    scope = interpreter.function_scope(function)
+    invocation_env = environment.Frame(scope, inputs + scope.padding,
+                                       function.env)
+    return _sequence(function.exprs, invocation_env, stack)
+
+
+def _continue_sequence(entry, value, stack):
+    _, exprs, index, env = entry
+    if index < len(exprs) - 1:
+        stack.append((_continue_sequence, exprs, index + 1, env))
+    return exprs[index], env
+
+
+def _continue_if(entry, value, stack):
+    _, data, env = entry
+    if interpreter._is_truthy(value):
+        return data[1], env
+    return data[2], env
+
+
+def _continue_define(entry, value, stack):
+    _, name, env = entry
+    env[name] = value
+    return None, _VALUE
+
+
+def _continue_define_lambda(entry, value, stack):
+    value.name = entry[1]
+    return _continue_define(entry, value, stack)
+
+
+def _continue_set(entry, value, stack):
+    _, name, env = entry
+    return env.redefine(name, value), _VALUE
+
+
+def _continue_let(entry, value, stack):
+    _, data, values, enclosing_env = entry
+    values.append(value)
+    bindings = data[0]
+    if len(values) < len(bindings):
+        stack.append(entry)
+        return bindings[len(values)][1], enclosing_env
+    return _let_body(data, values, enclosing_env, stack)
+
+
+def _continue_time(entry, value, stack):
+    interpreter.report_time(entry[1])
+    return value, _VALUE
+
+
+# Special forms.
+def _eval_if(data, env, stack):
+    """Evaluate an 'if' expression."""
+    assert len(data) == 3
+    stack.append((_continue_if, data, env))
+    return data[0], env
+
+
+def _eval_define(data, env, stack):
+    """Evaluate a 'define' expression."""
+    assert data
+    defined = data[0]
+
+    if isinstance(defined, list):
+        assert len(data) >= 2
+        assert defined
+        func_name, arg_names = defined[0], defined[1:]
+        env[func_name] = datatypes.LispFunction(env, arg_names, data[1:],
+                                                func_name)
+        return None, _VALUE
+
+    assert len(data) == 2
+    if interpreter.is_lambda(data[1]):
+        stack.append((_continue_define_lambda, defined, env))
+    else:
+        stack.append((_continue_define, defined, env))
+    return data[1], env
+
+
+def _eval_lambda(data, env, stack):
+    """Evaluate a 'lambda' expression."""
+    assert len(data) >= 2
+    return datatypes.LispFunction(env, data[0], data[1:]), _VALUE
+
+
+def _eval_set(data, env, stack):
+    """Evaluate a 'set!' expression."""
+    assert len(data) == 2
+    stack.append((_continue_set, data[0], env))
+    return data[1], env
+
+
+def _eval_begin(data, env, stack):
+    """Evaluate a 'begin' expression."""
+    return _sequence(data, env, stack)
+
+
+def _eval_let(data, env, stack):
+    """Evaluate a 'let' expression."""
+    assert data
+    bindings = data[0]
+    for binding in bindings:
+        assert len(binding) == 2
+    if not bindings:
+        return _let_body(data, [], env, stack)
+    # Evaluate the expressions in the enclosing environment.
+    stack.append((_continue_let, data, [], env))
+    return bindings[0][1], env
+
+
+def _let_body(data, values, enclosing_env, stack):
+    """Evaluate a 'let' body, once its bindings' values are known.
+
+    As in the tree-walking evaluator, names defined in the body go in the
+    frame's overflow.
+    """
+    names = [binding[0] for binding in data[0]]
+    new_env = environment.Frame(environment.Scope(names), values,
+                                enclosing_env)
+    return _sequence(data[1:], new_env, stack)
+
+
+def _eval_quote(data, env, stack):
+    """Evaluate a 'quote' expression."""
+    return interpreter._eval_quote(data, env), _VALUE
+
+
+def _eval_time(data, env, stack):
+    """Evaluate a 'time' expression."""
+    assert len(data) == 1
+    stack.append((_continue_time, interpreter.start_timer()))
+    return data[0], env
+
+
+_special_forms = {
+    'if': _eval_if,
+    'define': _eval_define,
+    'lambda': _eval_lambda,
+    'set!': _eval_set,
+    'begin': _eval_begin,
+    'let': _eval_let,
+    'quote': _eval_quote,
+    'time': _eval_time,
+}
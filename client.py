@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+"""Runs a Lisp script on a server started with lisp.py --serve.
+
+The script's output is printed as it arrives, and the client exits with
+the script's exit status.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+import server
+
+
+def _arg_parser():
+    """Make the parser for command line arguments."""
+    arg_parser = argparse.ArgumentParser(
+        description='Run a Lisp script on a jlisp server.')
+    arg_parser.add_argument('socket_path', help="The server's socket.")
+    arg_parser.add_argument('file_name', nargs='?',
+                            help='A Lisp script.  If omitted, the script is '
+                            'read from standard input.')
+    arg_parser.add_argument('-e', dest='source',
+                            help='Run this Lisp code, instead of a file.')
+    return arg_parser
+
+
+def main(argv):
+    """Send a request, and copy the output it produces."""
+    args = _arg_parser().parse_args(argv[1:])
+    if args.source is not None:
+        request = {'source': args.source}
+    elif args.file_name:
+        # The server has its own working directory.
+        request = {'path': os.path.abspath(args.file_name)}
+    else:
+        request = {'source': sys.stdin.read()}
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(args.socket_path)
+    connection.sendall(json.dumps(request) + '\n')
+    outputs = {server.STDOUT: sys.stdout, server.STDERR: sys.stderr}
+    for kind, data in server.read_frames(connection):
+        if kind == server.EXIT:
+            sys.exit(int(data))
+        outputs[kind].write(data)
+        outputs[kind].flush()
+    sys.exit('Error: the server closed the connection.')
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -1,4 +1,3 @@
-from collections import namedtuple
 import fractions
 
 
@@ -7,43 +6,233 @@ class DataType(object):
 
     We do not guarantee that all Lisp data inherrits from DataType.
     """
+    # Let subclasses with __slots__ do without a __dict__.
+    __slots__ = ()
+
+# Lisp numbers are exact.  Integers are native Python ints (or longs,
+# once they outgrow an int), and only a rational that is not an integer
+# is a Fraction.
+INTEGER_TYPES = (int, long)
 
 class Fraction(DataType, fractions.Fraction):
     def __repr__(self):
         if self.denominator == 1:
-            print 'NUM %s' % self.numerator
             return '%s' % self.numerator
         else:
             return '%s/%s' % (self.numerator, self.denominator)
 
+def exact(value):
+    """Put an exact number into its canonical representation.
+
+    Rationals with a denominator of 1 become integers, and other
+    rationals become Fractions.
+    """
+    if type(value) in INTEGER_TYPES:
+        return value
+    if isinstance(value, fractions.Fraction):
+        if value.denominator == 1:
+            return value.numerator
+        if not isinstance(value, Fraction):
+            return Fraction(value)
+    return value
+
 def assert_int(value):
-    assert isinstance(value, int) or value.denominator == 1
-    return int(value)
+    """Get the integer a number stands for.
+
+    Floats from typed vectors are accepted if their value is integral.
+    """
+    if type(value) in INTEGER_TYPES:
+        return value
+    if isinstance(value, fractions.Fraction) and value.denominator == 1:
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    raise ValueError('Expected an integer, not %s.' % (value,))
 
 
 class Symbol(DataType):
-    """A Scheme symbol equivalent."""
+    """A Scheme symbol equivalent.
+
+    Symbols are interned: Symbol(name) always returns the same object
+    for the same name, so symbols compare and hash by identity.
+    """
+    __slots__ = ('value',)
+
+    # Maps each name to its Symbol.
+    _table = {}
+
+    def __new__(cls, value):
+        symbol = cls._table.get(value)
+        if symbol is None:
+            symbol = DataType.__new__(cls)
+            symbol.value = value
+            cls._table[value] = symbol
+        return symbol
+
+    def __repr__(self):
+        return str(self.value)
+
+    def __reduce__(self):
+        # Unpickle to the interned Symbol.
+        return (Symbol, (self.value,))
+
+
+class String(DataType):
+    """A Lisp string.  Its value is a Python byte string."""
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
     def __repr__(self):
-        return str(self.value)
+        # The written representation, which reads back as the same string.
+        return '"%s"' % (self.value.replace('\\', '\\\\')
+                         .replace('"', '\\"').replace('\n', '\\n')
+                         .replace('\t', '\\t'))
+
+    def __eq__(self, other):
+        return isinstance(other, String) and self.value == other.value
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __reduce__(self):
+        return (String, (self.value,))
+
+
+class Char(DataType):
+    """A Lisp character.
+
+    Chars are interned, like Symbols, so they compare by identity.
+    """
+    __slots__ = ('value',)
+
+    # Maps each character to its Char.
+    _table = {}
+
+    # The written names of characters that are not written as themselves.
+    NAMES = {' ': 'space', '\n': 'newline', '\t': 'tab'}
+
+    def __new__(cls, value):
+        char = cls._table.get(value)
+        if char is None:
+            char = DataType.__new__(cls)
+            char.value = value
+            cls._table[value] = char
+        return char
+
+    def __repr__(self):
+        return '#\\%s' % self.NAMES.get(self.value, self.value)
+
+    def __reduce__(self):
+        # Unpickle to the interned Char.
+        return (Char, (self.value,))
 
 
 class LispFunction(DataType):
     """A function defined in Lisp."""
-    def __init__(self, env, arg_names, exprs):
+    def __init__(self, env, arg_names, exprs, name=None):
         self.env = env
         self.arg_names = arg_names
         self.exprs = exprs
+        # The name it was defined with, if any.  For reporting only.
+        self.name = name
+        # The environment.Scope of the function's invocation frames.
+        # Computed the first time it is needed.
+        self.scope = None
+        # The analyzed body, as an execution procedure.  Built by the
+        # analyzer module, and None until then.
+        self.body = None
+        # The body compiled to bytecode.Code, once the vm module needs it.
+        self.code = None
 
     def __repr__(self):
         return "LispFunction[%s -> %s]" % (self.arg_names, self.exprs)
 
-class Pair(namedtuple('Pair', ['car', 'cdr'])):
-    """A Lisp pair, with a car and a cdr."""
+    def __getstate__(self):
+        # Analyzed and compiled bodies are rebuilt when next needed.
+        state = self.__dict__.copy()
+        state['body'] = None
+        state['code'] = None
+        return state
+
+class Pair(DataType):
+    """A Lisp pair, with a car and a cdr.
+
+    Lists are chains of Pairs, ending in null.  Code that walks a list
+    should loop down the cdrs rather than recursing, so long lists cannot
+    overflow the Python stack.
+    """
+    __slots__ = ('car', 'cdr')
+
+    def __init__(self, car, cdr):
+        self.car = car
+        self.cdr = cdr
+
     def __repr__(self):
-        return '(%s . %s)' % self
+        parts = []
+        tail = self
+        while isinstance(tail, Pair):
+            parts.append(str(tail.car))
+            tail = tail.cdr
+        if not is_null(tail):
+            parts.extend(('.', str(tail)))
+        return '(' + ' '.join(parts) + ')'
+
+    def __eq__(self, other):
+        # Pairs are equal when their structures are, element by element.
+        left, right = self, other
+        while isinstance(left, Pair):
+            if not isinstance(right, Pair) or left.car != right.car:
+                return False
+            left, right = left.cdr, right.cdr
+        return left == right
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        # Consistent with __eq__, and immutable since Pairs are.
+        result = 0
+        tail = self
+        while isinstance(tail, Pair):
+            result = hash((result, tail.car))
+            tail = tail.cdr
+        return hash((result, tail))
+
+    def __reduce__(self):
+        # Pickle a chain of Pairs as one flat list, so that pickling a
+        # long list does not recurse.  (Tails shared with other lists are
+        # copied, but Pairs are immutable, so that is unobservable.)
+        elements = []
+        tail = self
+        while isinstance(tail, Pair):
+            elements.append(tail.car)
+            tail = tail.cdr
+        return (make_list, (elements, tail))
+
+
+def make_list(elements, tail=None):
+    """Make a Lisp list of some elements.
+
+    The last Pair's cdr is 'tail', which defaults to null.
+    """
+    result = null if tail is None else tail
+    for element in reversed(list(elements)):
+        result = Pair(element, result)
+    return result
+
+
+def iter_list(lisp_list):
+    """Iterate over the elements of a proper Lisp list."""
+    while isinstance(lisp_list, Pair):
+        yield lisp_list.car
+        lisp_list = lisp_list.cdr
+    if not is_null(lisp_list):
+        raise ValueError('Not a proper list: ends in %s.' % lisp_list)
 
 class Vector(DataType):
     """A collection with O(1) access of any element. """
@@ -63,18 +252,17 @@ class Vector(DataType):
         return cls(backing_list)
 
     def length(self):
-        return Fraction(len(self._elements))
+        return len(self._elements)
+
+    def __iter__(self):
+        return iter(self._elements)
 
     def as_list(self):
-        # TODO(jasonpr): Implement once we've reconciled Python lists
-        # with Lisp lists.
-        raise NotImplementedError
+        return make_list(self._elements)
 
     @classmethod
     def from_list(cls, source_list):
-        # TODO(jasonpr): Implement once we've reconciled Python lists
-        # with Lisp lists.
-        raise NotImplementedError
+        return cls(iter_list(source_list))
 
     def fill(self, fill_value):
         new_backing_list = [fill_value] * len(self._elements)
@@ -91,6 +279,10 @@ class _Boolean(DataType):
     def __repr__(self):
         return '#t' if self._value else '#f'
 
+    def __reduce__(self):
+        # Unpickle to the singletons, which are compared by identity.
+        return (lisp_bool, (self._value,))
+
 _lisp_true = _Boolean(True)
 _lisp_false = _Boolean(False)
 
@@ -108,6 +300,10 @@ class _Null(DataType):
     def __repr__(self):
         return '()'
 
+    def __reduce__(self):
+        # Unpickle to the singleton.
+        return 'null'
+
 null = _Null()
 
 def is_null(data):
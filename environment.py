@@ -1,41 +1,183 @@
+"""Lisp environments.
+
+An Environment maps names to values with a dict, and suits environments
+whose names are not known in advance, like the global environment.
+
+A Frame holds its values in a fixed-size list instead.  The names it
+binds, and the slot each name occupies, are described by a Scope, which
+is computed once when code is analyzed and shared by every Frame built
+for that code.  Analyzed code can then reach a variable by its lexical
+address-- how many frames up, and which slot-- without any name lookups.
+
+Both kinds support lookup by name, so they can be chained together freely.
+"""
+
+# Marks a Frame slot whose variable has not been defined yet.
+unassigned = object()
+
+# Returned by _local when a name is not bound in a single environment.
+_missing = object()
+
+
 class Environment(object):
     """A Lisp environment."""
+    __slots__ = ('_vars', 'parent')
+
     def __init__(self, parent=None):
         self._vars = {}
-        self._parent = parent
+        self.parent = parent
 
     def __getitem__(self, name):
         """Lookup the object for a name in this environment.
 
-        Recurses up to the root environment, and raises a KeyError
+        Searches up to the root environment, and raises a KeyError
         if the name is not found anywhere.
         """
-        try:
-            return self._vars[name]
-        except KeyError:
-            if not self._parent:
-                raise
-            return self._parent[name]
+        return _lookup(self, name)
 
     def __setitem__(self, name, value):
         """Give a value to a name in this environment."""
         self._vars[name] = value
 
+    def _local(self, name):
+        """Get a name's value in this environment alone, or _missing."""
+        return self._vars.get(name, _missing)
+
+    def _redefine_local(self, name, new_value):
+        """Rebind a name in this environment alone.
+
+        Returns the original value, or _missing if the name is not bound.
+        """
+        original = self._vars.get(name, _missing)
+        if original is not _missing:
+            self._vars[name] = new_value
+        return original
+
     def redefine(self, name, new_value):
         """Give a new value to a pre-existing name.
 
-        If the name is not yet set in this environment, recurse upwards.
+        If the name is not yet set in this environment, search upwards.
         Raise a KeyError if the name is not found anywhere.
         """
-        if name in self._vars:
-            original = self._vars[name]
-            self._vars[name] = new_value
-            return original
-        elif not self._parent:
-            raise KeyError
-        else:
-            return self._parent.redefine(name, new_value)
+        return _redefine(self, name, new_value)
 
     def child(self):
         """Create an Environment whose parent is this Environment."""
         return Environment(parent=self)
+
+
+class Scope(object):
+    """The names bound by a Frame, in slot order.
+
+    The first 'bound' names get their values when the Frame is created,
+    like a function's arguments.  The rest start out unassigned, and
+    are given values by 'define'.
+    """
+    # Whether a closure may capture a Frame with this Scope, and use it
+    # after its code is done.  Unless we know otherwise, it may.
+    captured = True
+
+    def __init__(self, names, bound=None):
+        unique_names = []
+        for name in names:
+            if name not in unique_names:
+                unique_names.append(name)
+        self.names = tuple(unique_names)
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+        if bound is None:
+            bound = len(self.names)
+        self.padding = [unassigned] * (len(self.names) - bound)
+
+    def __repr__(self):
+        return 'Scope%s' % (self.names,)
+
+
+class Frame(object):
+    """A compact Lisp environment, with values in slots.
+
+    'values' must have one slot per name in 'scope'.  Names missing from
+    the scope may still be defined, but they go in a slower overflow dict.
+    """
+    __slots__ = ('values', 'scope', 'parent', '_overflow')
+
+    def __init__(self, scope, values, parent):
+        self.values = values
+        self.scope = scope
+        self.parent = parent
+        self._overflow = None
+
+    def __getitem__(self, name):
+        """Lookup the object for a name, as Environment does."""
+        return _lookup(self, name)
+
+    def __setitem__(self, name, value):
+        """Give a value to a name in this frame."""
+        index = self.scope.index.get(name)
+        if index is not None:
+            self.values[index] = value
+        else:
+            if self._overflow is None:
+                self._overflow = {}
+            self._overflow[name] = value
+
+    def _local(self, name):
+        """Get a name's value in this frame alone, or _missing."""
+        index = self.scope.index.get(name)
+        if index is not None:
+            value = self.values[index]
+            return _missing if value is unassigned else value
+        elif self._overflow:
+            return self._overflow.get(name, _missing)
+        else:
+            return _missing
+
+    def _redefine_local(self, name, new_value):
+        """Rebind a name in this frame alone, as Environment does."""
+        original = self._local(name)
+        if original is not _missing:
+            self[name] = new_value
+        return original
+
+    def redefine(self, name, new_value):
+        """Give a new value to a pre-existing name, as Environment does."""
+        return _redefine(self, name, new_value)
+
+    def rebind(self, scope, values, parent):
+        """Reuse this frame for another invocation.
+
+        Only safe when nothing else refers to the frame.  Returns its old
+        values, which the caller may recycle.
+        """
+        old_values = self.values
+        self.values = values
+        self.scope = scope
+        self.parent = parent
+        self._overflow = None
+        return old_values
+
+    def child(self):
+        """Create an Environment whose parent is this Frame."""
+        return Environment(parent=self)
+
+
+def _lookup(env, name):
+    """Find a name's value, searching from env up to the root."""
+    while env is not None:
+        value = env._local(name)
+        if value is not _missing:
+            return value
+        env = env.parent
+    raise KeyError(name)
+
+
+def _redefine(env, name, new_value):
+    """Rebind a name, searching from env up to the root.
+
+    Returns the original value.
+    """
+    while env is not None:
+        original = env._redefine_local(name, new_value)
+        if original is not _missing:
+            return original
+        env = env.parent
+    raise KeyError(name)
@@ -0,0 +1,90 @@
+"""Lisp's equivalence predicates, and a hash consistent with equal?."""
+
+import itertools
+
+import datatypes
+import typedvector
+
+
+def is_number(value):
+    return (type(value) in datatypes.INTEGER_TYPES or
+            isinstance(value, (datatypes.Fraction, float)))
+
+
+def eqv(left, right):
+    """Whether two values are the same object, or the same number.
+
+    Exact and inexact numbers are never eqv?, even if they are equal.
+    """
+    if left is right:
+        return True
+    return (is_number(left) and is_number(right) and
+            isinstance(left, float) == isinstance(right, float) and
+            left == right)
+
+
+def equal(left, right):
+    """Whether two values have the same structure, and eqv? leaves.
+
+    Pairs and vectors are compared element by element, using an
+    explicit stack rather than recursion.
+    """
+    pending = [(left, right)]
+    while pending:
+        left, right = pending.pop()
+        if eqv(left, right):
+            continue
+        if isinstance(left, datatypes.Pair):
+            if not isinstance(right, datatypes.Pair):
+                return False
+            pending.append((left.cdr, right.cdr))
+            pending.append((left.car, right.car))
+        elif typedvector.is_vector(left):
+            if (type(left) is not type(right) or
+                left.length() != right.length() or
+                getattr(left, 'element_type', None) !=
+                getattr(right, 'element_type', None)):
+                return False
+            pending.extend(itertools.izip(left, right))
+        elif isinstance(left, datatypes.String):
+            if left != right:
+                return False
+        else:
+            return False
+    return True
+
+
+def eqv_key(value):
+    """Get a dict key for a value, under which eqv? values collide.
+
+    Numbers are keyed by value and exactness, and everything else by
+    identity.
+    """
+    if is_number(value):
+        return (isinstance(value, float), value)
+    return id(value)
+
+
+def equal_hash(value):
+    """Hash a value, so that equal? values have equal hashes.
+
+    Walks Pairs and vectors with an explicit stack, like equal.
+    """
+    result = 0
+    pending = [value]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, datatypes.Pair):
+            pending.append(value.cdr)
+            pending.append(value.car)
+            part = 'pair'
+        elif typedvector.is_vector(value):
+            pending.extend(value)
+            part = (type(value).__name__,
+                    getattr(value, 'element_type', None), value.length())
+        elif isinstance(value, datatypes.String):
+            part = value.value
+        else:
+            part = eqv_key(value)
+        result = hash((result, part))
+    return result
@@ -1,30 +1,22 @@
 """Formats Lisp data for display to a human."""
+
 import datatypes
 
 def lisp_format(value):
-    """Format a Lisp value for display to a human."""
-    # Until we reconcile Lisp lists with Python lists, we use a
-    # special case to format Python lists.
-    # TODO(jasonpr): Remove this special case.
-    if isinstance(value, list):
-        return '(' + ' '.join(lisp_format(elt) for elt in value) + ')'
+    """Format a Lisp value for display to a human.
 
-    # Do naked formatting, then wrap with parentheses if needed.
-    fmt = '(%s)' if isinstance(value, datatypes.Pair) else '%s'
-    return fmt % _naked_format(value)
+    Lisp data know how to display themselves: Pairs, for instance, print
+    as lists where they can.  Strings and characters are written as they
+    would appear in code.
+    """
+    return '%s' % value
 
-def _naked_format(value):
-    """Format a Lisp value, but without grouping with outer parentheses.
+def lisp_display(value):
+    """Format a Lisp value as the 'display' builtin shows it.
 
-    This is corecursive with lisp_format, and correctly displays lists.
+    Like lisp_format, except that a string or character is shown as its
+    raw text.
     """
-    if not isinstance(value, datatypes.Pair):
-        return value
-
-    if datatypes.is_null(value.cdr):
-        return '%s' % lisp_format(value.car)
-    else:
-        car = lisp_format(value.car)
-        cdr = _naked_format(value.cdr)
-        fmt = '%s %s' if isinstance(value.cdr, datatypes.Pair) else '%s . %s'
-        return fmt % (car, cdr)
+    if isinstance(value, (datatypes.String, datatypes.Char)):
+        return value.value
+    return lisp_format(value)
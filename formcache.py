@@ -0,0 +1,123 @@
+"""An on-disk cache of parse trees, like Python's __pycache__.
+
+Parsing a file gives a list of parse trees, which we pickle into a
+__jlispcache__ directory beside the file.  Each cache file records the
+hash of the source it was parsed from, and where each top-level tree
+began, for error messages.  Its name records the parse tree format and
+the Python version, so a stale or foreign cache file is simply ignored
+and rewritten.
+
+Cache files are written to a temporary file and renamed into place, so
+concurrent runs never see a partially written cache.  Any cache file
+that cannot be read is treated as missing.
+"""
+
+import cPickle
+import errno
+import hashlib
+import os
+import sys
+import tempfile
+
+import lexer
+import parser
+
+CACHE_DIR_NAME = '__jlispcache__'
+
+
+def load_trees(path, source_map=None):
+    """Return the list of parse trees for a Lisp source file.
+
+    Uses the cache if it is up to date, and updates it otherwise.  The
+    cache keeps the positions of the top-level trees, which are recorded
+    in source_map, if one is given.
+    """
+    with open(path) as source_file:
+        source = source_file.read()
+    source_hash = hashlib.sha1(source).hexdigest()
+
+    cache_path = _cache_path(path)
+    cached = _read_cache(cache_path, source_hash)
+    if cached is None:
+        parsed_map = parser.SourceMap(path)
+        trees = parse_source(source, parsed_map)
+        positions = [parsed_map.position(tree) for tree in trees]
+        _write_cache(cache_path, source_hash, trees, positions)
+    else:
+        trees, positions = cached
+    if source_map is not None:
+        for tree, position in zip(trees, positions):
+            source_map.record(tree, position)
+    return trees
+
+
+def parse_source(source, source_map=None):
+    """Lex and parse some Lisp text into a list of parse trees.
+
+    If a SourceMap is given, the positions of top-level trees are
+    recorded in it.
+    """
+    tokens = lexer.TokenSupply(lexer.lisp_tokens(
+        source.splitlines(True), positions=source_map is not None))
+    return list(parser.parse_trees(tokens, source_map))
+
+
+def _cache_path(path):
+    """Get the path of a source file's cache file."""
+    directory, file_name = os.path.split(os.path.abspath(path))
+    cache_name = '%s.tree%d-py%d%d.pickle' % (
+        file_name, parser.TREE_FORMAT_VERSION,
+        sys.version_info[0], sys.version_info[1])
+    return os.path.join(directory, CACHE_DIR_NAME, cache_name)
+
+
+def _read_cache(cache_path, source_hash):
+    """Read cached trees and their positions, as a pair.
+
+    Returns None if the cache file is missing or stale.
+    """
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            cached_hash, trees, positions = cPickle.load(cache_file)
+    except (IOError, EOFError, ValueError, TypeError, cPickle.PickleError,
+            AttributeError, ImportError, IndexError, RuntimeError):
+        return None
+    if cached_hash != source_hash:
+        return None
+    return trees, positions
+
+
+def _write_cache(cache_path, source_hash, trees, positions):
+    """Atomically write trees and their positions to a cache file.
+
+    Failures are ignored: the cache is only an optimization, and the
+    source directory may not be writable.
+    """
+    directory = os.path.dirname(cache_path)
+    try:
+        os.mkdir(directory)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            return
+
+    try:
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    except OSError:
+        return
+    renamed = False
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            cPickle.dump((source_hash, trees, positions), temp_file,
+                         cPickle.HIGHEST_PROTOCOL)
+        # Renaming is atomic, so readers see the old file or the new one.
+        os.rename(temp_path, cache_path)
+        renamed = True
+    except (IOError, OSError, cPickle.PickleError, TypeError, RuntimeError):
+        # Pickling a deeply nested tree exceeds the recursion limit.
+        pass
+    finally:
+        if not renamed:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
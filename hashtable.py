@@ -0,0 +1,141 @@
+"""Mutable hash tables, for keyed lookup in constant time.
+
+A table compares its keys with eq? or equal?.  An eq table keys numbers
+by value, as eqv? does, since equal numbers need not be the same object;
+any other key is found only by itself.  An equal table finds keys with
+the same structure, hashing Pairs, vectors and strings by their
+contents.  A key must not be mutated while it is in an equal table.
+
+Tables are Python dicts underneath.  Each maps a key's dict key to a
+(key, value) pair.
+"""
+
+import datatypes
+import equality
+import interpreter
+
+# The kinds of tables, by the name of their equivalence predicate.
+KINDS = ('eq', 'equal')
+
+
+class _EqualKey(object):
+    """Wraps a Lisp value, to hash and compare it as equal? does."""
+    __slots__ = ('value', '_hash')
+
+    def __init__(self, value):
+        self.value = value
+        self._hash = equality.equal_hash(value)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return equality.equal(self.value, other.value)
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class HashTable(datatypes.DataType):
+    """A mutable map from keys to values."""
+    def __init__(self, kind='equal'):
+        assert kind in KINDS
+        self.kind = kind
+        self._dict_key = equality.eqv_key if kind == 'eq' else _EqualKey
+        self._entries = {}
+
+    def get(self, key, default):
+        entry = self._entries.get(self._dict_key(key))
+        return default if entry is None else entry[1]
+
+    def __contains__(self, key):
+        return self._dict_key(key) in self._entries
+
+    def set(self, key, value):
+        self._entries[self._dict_key(key)] = (key, value)
+
+    def delete(self, key):
+        self._entries.pop(self._dict_key(key), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def items(self):
+        """Get a list of (key, value) pairs."""
+        return self._entries.values()
+
+    def __repr__(self):
+        return '#<hash-table %s %d>' % (self.kind, len(self._entries))
+
+    def __reduce__(self):
+        # Eq tables key objects by identity, so the dict is rebuilt.
+        return (_restore, (self.kind, self.items()))
+
+
+def _restore(kind, items):
+    table = HashTable(kind)
+    for key, value in items:
+        table.set(key, value)
+    return table
+
+
+def _assert_table(candidate):
+    assert isinstance(candidate, HashTable)
+    return candidate
+
+
+# Builtins.
+def make_hash_table(kind=datatypes.Symbol('equal')):
+    assert isinstance(kind, datatypes.Symbol)
+    return HashTable(kind.value)
+
+
+def hash_ref(table, key, *default):
+    """Look up a key, returning the default if it is missing."""
+    table = _assert_table(table)
+    if default:
+        default, = default
+        return table.get(key, default)
+    if key not in table:
+        raise KeyError('No hash table entry for %s.' % (key,))
+    return table.get(key, None)
+
+
+def hash_set(table, key, value):
+    _assert_table(table).set(key, value)
+
+
+def hash_delete(table, key):
+    _assert_table(table).delete(key)
+
+
+def hash_has_key(table, key):
+    return datatypes.lisp_bool(key in _assert_table(table))
+
+
+def hash_count(table):
+    return len(_assert_table(table))
+
+
+def hash_keys(table):
+    return datatypes.make_list(key for key, _ in _assert_table(table).items())
+
+
+def hash_values(table):
+    return datatypes.make_list(
+        value for _, value in _assert_table(table).items())
+
+
+def hash_to_list(table):
+    """Get a table's entries, as an association list."""
+    return datatypes.make_list(datatypes.Pair(key, value) for key, value
+                               in _assert_table(table).items())
+
+
+def hash_for_each(table, function):
+    """Call a function with each key and value.
+
+    The function may change the table: it sees the entries as they were.
+    """
+    for key, value in _assert_table(table).items():
+        interpreter.apply(function, [key, value])
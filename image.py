@@ -0,0 +1,92 @@
+"""Snapshots of fully initialized environments, saved as image files.
+
+An image is a pickle of an environment and everything reachable from
+it: LispFunctions with their environment chains, Symbols, Pairs, Vectors
+and so on.  Builtins from pyfuncs are stored by name, and are bound to
+the current process's builtins when the image is loaded.  Analyzed and
+compiled function bodies are not stored; they are rebuilt when first
+needed.
+"""
+
+import cPickle
+import sys
+
+import environment
+import pyfuncs
+
+# The version of the image format.  Bump this whenever a change to the
+# datatypes or environments changes what is pickled.
+IMAGE_FORMAT_VERSION = 5
+
+
+def dump(env, image_file):
+    """Write an environment to an open image file."""
+    pickler = make_pickler(image_file)
+    pickler.dump(_header())
+    pickler.dump(env)
+
+
+def load(image_file):
+    """Read an environment from an open image file.
+
+    Raises a ValueError if the image was written by an incompatible
+    version of the interpreter.
+    """
+    unpickler = make_unpickler(image_file)
+    header = unpickler.load()
+    if header != _header():
+        raise ValueError('Incompatible image: %s, expected %s.' %
+                         (header, _header()))
+    return unpickler.load()
+
+
+def make_pickler(output_file, extra_id=None):
+    """Make a Pickler that stores builtins by name, for make_unpickler.
+
+    'extra_id' is an optional function, which may return a string
+    persistent id to store some other object as.  It is called with
+    every object which is not a builtin, and returns None for objects
+    to pickle normally.
+    """
+    builtin_names = dict((id(function), name)
+                         for name, function in pyfuncs.functions.items())
+
+    def persistent_id(obj):
+        if obj is environment.unassigned:
+            return 'unassigned'
+        name = builtin_names.get(id(obj))
+        if name is not None:
+            return 'builtin:' + name
+        if extra_id:
+            return extra_id(obj)
+        return None
+
+    pickler = cPickle.Pickler(output_file, cPickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = persistent_id
+    return pickler
+
+
+def make_unpickler(input_file, extra_objects=None):
+    """Make an Unpickler for data written by a make_pickler Pickler.
+
+    'extra_objects' optionally maps extra persistent ids back to objects.
+    """
+    def persistent_load(persistent_id):
+        if persistent_id == 'unassigned':
+            return environment.unassigned
+        kind, _, name = persistent_id.partition(':')
+        if kind == 'builtin' and name in pyfuncs.functions:
+            return pyfuncs.functions[name]
+        if extra_objects and persistent_id in extra_objects:
+            return extra_objects[persistent_id]
+        raise cPickle.UnpicklingError(
+            'Unknown builtin `%s` in image.' % persistent_id)
+
+    unpickler = cPickle.Unpickler(input_file)
+    unpickler.persistent_load = persistent_load
+    return unpickler
+
+
+def _header():
+    """Describe what wrote an image."""
+    return ('jlisp-image', IMAGE_FORMAT_VERSION, sys.version_info[:2])
@@ -1,18 +1,88 @@
 """The interpreter, including the eval-apply magic.
 
-Implements proper tail recursion using _DelayedCalls.
+Implements proper tail recursion using _DelayedCalls.  A call to a
+LispFunction is carried out by _call, which runs the calls its body makes
+in tail position itself, in a loop.  When the caller's frame cannot have
+been captured by a closure, the callee reuses it, so tail-recursive loops
+do not allocate a frame per iteration.
 """
 
 import string
+import time
 
+import analyzer
+import cek
 import datatypes
-
-def execute(ast, env):
+import environment
+import lexical
+import vm
+
+# The available evaluation engines.  'walk' is the tree-walking evaluator
+# in this module, 'analyze' compiles each tree into Python closures before
+# running it (see analyzer.py), 'vm' compiles each tree to bytecode for a
+# virtual machine (see bytecode.py and vm.py), and 'cek' walks the tree
+# on an explicit continuation stack, so deep recursion cannot overflow
+# Python's stack (see cek.py).
+ENGINES = ('walk', 'analyze', 'vm', 'cek')
+DEFAULT_ENGINE = 'analyze'
+
+# Whether tail calls may reuse their caller's frame (see _call).  Only
+# turned off to measure what it saves.
+REUSE_FRAMES = True
+
+# The engine running the current top-level expression, which also runs
+# the Lisp functions that builtins call (see apply).
+_engine = DEFAULT_ENGINE
+
+def execute(ast, env, engine=DEFAULT_ENGINE):
     """The simple public interface to the evaluation system.
 
     Evaluates an expression in a base environment and returns the result.
+    The 'engine' argument selects one of the ENGINES.
+    """
+    global _engine
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine `%s`.' % engine)
+    outer_engine, _engine = _engine, engine
+    try:
+        if engine == 'walk':
+            return _eval(ast, env)
+        elif engine == 'analyze':
+            return analyzer.execute(ast, env)
+        elif engine == 'vm':
+            return vm.execute(ast, env)
+        else:
+            return cek.execute(ast, env)
+    finally:
+        _engine = outer_engine
+
+
+def apply(function, inputs):
+    """Apply a function to evaluated inputs, from Python code.
+
+    Builtins that take Lisp functions, like map, call them with this, so
+    that they run in the same engine as the code that called the
+    builtin.  Under the cek engine, the callback's own recursion is then
+    not limited by Python's stack.
     """
-    return _eval(ast, env)
+    if not isinstance(function, datatypes.LispFunction):
+        return function(*inputs)
+    if _engine == 'walk':
+        return _call(function, _invocation_frame(function, inputs))
+    elif _engine == 'analyze':
+        return analyzer.apply(function, inputs)
+    elif _engine == 'vm':
+        return vm.apply(function, inputs)
+    else:
+        return cek.apply(function, inputs)
+
+
+def _invocation_frame(function, inputs):
+    """Make the frame for a call of a LispFunction with evaluated inputs."""
+    assert len(inputs) == len(function.arg_names)
+    scope = function_scope(function)
+    return environment.Frame(scope, list(inputs) + scope.padding,
+                             function.env)
 
 
 def _eval(expr, env, force=True):
@@ -24,12 +94,102 @@ def _eval(expr, env, force=True):
     returning.
     """
     value  = _eval_no_force(expr, env)
-    if force:
-        while isinstance(value, _DelayedCall):
-            value = _eval_begin(value.function.exprs, value.invocation_env)
+    if force and isinstance(value, _DelayedCall):
+        value = _call(value.function, value.invocation_env)
     return value
 
 
+def _call(function, frame):
+    """Evaluate a LispFunction's body, in a frame for its invocation.
+
+    A call in the body's tail position is not returned as a _DelayedCall:
+    we loop around instead, with the callee in place of the caller.  If no
+    closure can have captured the caller's frame, the callee reuses it,
+    and its old values are recycled for the next call's arguments.
+    """
+    spare_values = []
+    while True:
+        expr = _tail_expression(function.exprs, frame)
+        if not _is_application(expr):
+            value = _eval_no_force(expr, frame)
+            if not isinstance(value, _DelayedCall):
+                return value
+            function, frame = value.function, value.invocation_env
+            continue
+
+        callee = _eval(expr[0], frame)
+        if not isinstance(callee, datatypes.LispFunction):
+            # It's a builtin Python function.
+            return callee(*[_eval(arg, frame) for arg in expr[1:]])
+        assert len(expr) - 1 == len(callee.arg_names)
+        scope = function_scope(callee)
+        if REUSE_FRAMES and not frame.scope.captured:
+            values = _eval_arguments(expr, frame, spare_values, scope)
+            spare_values = frame.rebind(scope, values, callee.env)
+        else:
+            inputs = [_eval(arg, frame) for arg in expr[1:]]
+            frame = environment.Frame(scope, inputs + scope.padding,
+                                      callee.env)
+        function = callee
+
+
+def _tail_expression(expressions, env):
+    """Evaluate a body up to the expression in its tail position.
+
+    Follows tail positions into 'if' and 'begin' expressions, and returns
+    the first tail expression that is neither.
+    """
+    expr = _eval_leading(expressions, 0, env)
+    while isinstance(expr, list) and expr:
+        directive = expr[0]
+        if directive == 'if':
+            assert len(expr) == 4
+            if _is_truthy(_eval(expr[1], env)):
+                expr = expr[2]
+            else:
+                expr = expr[3]
+        elif directive == 'begin' and len(expr) > 1:
+            expr = _eval_leading(expr, 1, env)
+        else:
+            break
+    return expr
+
+
+def _eval_leading(expressions, start, env):
+    """Evaluate all but the last of expressions[start:], and return it.
+
+    Loops by index, so the expressions are not copied.
+    """
+    last = len(expressions) - 1
+    while start < last:
+        _eval(expressions[start], env)
+        start += 1
+    return expressions[last]
+
+
+def _is_application(expr):
+    """Whether an expression is a function call."""
+    if not isinstance(expr, list) or not expr:
+        return False
+    directive = expr[0]
+    return not (isinstance(directive, str) and directive in evaluators)
+
+
+def _eval_arguments(expr, env, values, scope):
+    """Evaluate a call's arguments into a list of frame values.
+
+    The list is filled in place, if it has a slot for each of the scope's
+    names already.  Slots past the arguments are marked unassigned.
+    """
+    if len(values) != len(scope.names):
+        values = [environment.unassigned] * len(scope.names)
+    for index in xrange(1, len(expr)):
+        values[index - 1] = _eval(expr[index], env)
+    if scope.padding:
+        values[len(expr) - 1:] = scope.padding
+    return values
+
+
 def _eval_no_force(expr, env):
     """Evaluate an expression in an environment.
 
@@ -62,40 +222,40 @@ def _eval_list(expr, env):
 
     directive, data = expr[0], expr[1:]
     if isinstance(directive, str) and directive in evaluators:
-        evaluator = evaluators[directive]
+        return evaluators[directive](data, env)
     else:
         # It must be a function.  Apply it.
-        function = _eval(directive, env)
-        evaluator = Applier(function)
-    return evaluator(data, env)
+        return _apply(_eval(directive, env), data, env)
 
 
-class Applier(object):
+def _apply(function, lisp_args, env):
     """Apply a function.
 
-    When an Applier object is called, with some Lisp arguments and an
-    environment, the args are first evaluated in that environment. Then,
-    they are passed to the function itself.  If the function is a
-    LispFunction, the application involves evaluating the function's body.
+    The args are first evaluated in env.  Then, they are passed to the
+    function itself.  If the function is a LispFunction, the application
+    involves evaluating the function's body.
     """
-    def __init__(self, function):
-        self._function = function
-
-    def __call__(self, lisp_args, env):
-        """Evaluate the arguments and apply the function."""
-        inputs = [_eval(arg, env) for arg in lisp_args]
-        if isinstance(self._function, datatypes.LispFunction):
-            # It's a LispFunction.
-            assert len(inputs) == len(self._function.arg_names)
-            invocation_env = self._function.env.child()
-            for name, value in zip(self._function.arg_names, inputs):
-                invocation_env[name] = value
-            # Return a delayed call, and let the calling context determine
-            # whether it must be resolved immediately.
-            return _DelayedCall(self._function, invocation_env)
-        else:
-            # It's a builtin Python function.
-            return self._function(*inputs)
+    inputs = [_eval(arg, env) for arg in lisp_args]
+    if isinstance(function, datatypes.LispFunction):
+        # It's a LispFunction.
+        assert len(inputs) == len(function.arg_names)
+        scope = function_scope(function)
+        invocation_env = environment.Frame(
+            scope, inputs + scope.padding, function.env)
+        # Return a delayed call, and let the calling context determine
+        # whether it must be resolved immediately.
+        return _DelayedCall(function, invocation_env)
+    else:
+        # It's a builtin Python function.
+        return function(*inputs)
+
+
+def function_scope(function):
+    """Get the environment.Scope for a LispFunction's invocations."""
+    if function.scope is None:
+        function.scope = lexical.function_scope(function.arg_names,
+                                                function.exprs)
+    return function.scope
 
 
 # Evaluators.
@@ -124,14 +284,23 @@ def _eval_define(data, env):
 
 def _eval_define_variable(name, expr, env):
     """Helper function for defining a variable with a value."""
-    env[name] = _eval(expr, env)
+    value = _eval(expr, env)
+    if is_lambda(expr):
+        value.name = name
+    env[name] = value
 
 
 def _eval_define_function(definition_spec, implementation, env):
     """Helper function for defining a function."""
     assert definition_spec
     func_name, arg_names = definition_spec[0], definition_spec[1:]
-    env[func_name] = datatypes.LispFunction(env, arg_names, implementation)
+    env[func_name] = datatypes.LispFunction(env, arg_names, implementation,
+                                            func_name)
+
+
+def is_lambda(expr):
+    """Whether an expression is a 'lambda' expression."""
+    return isinstance(expr, list) and bool(expr) and expr[0] == 'lambda'
 
 
 def _eval_lambda(data, env):
@@ -152,13 +321,10 @@ def _eval_begin(expressions, env):
 
     The resulting value is the last expression's value.
     """
-    for expression in expressions[:-1]:
-        result = _eval(expression, env)
-
     if expressions:
         # The last one may be in a tail context, so we do not force
         # it.
-        return _eval(expressions[-1], env, force=False)
+        return _eval(_eval_leading(expressions, 0, env), env, force=False)
     else:
         # An empty begin has no effect and returns nothing.
         return None
@@ -168,27 +334,48 @@ def _eval_let(data, enclosing_env):
     assert data
     bindings, exprs = data[0], data[1:]
 
-    # Setup the new environment.
-    new_env = enclosing_env.child()
+    # Setup the new environment.  Any names defined in the body go in
+    # the frame's overflow.
+    names, values = [], []
     for binding in bindings:
         assert len(binding) == 2
         name, expr = binding
         # Evaluate the expression in the enclosing environment,  and
         # bind it into the new one.
-        new_env[name] = _eval(expr, enclosing_env)
+        names.append(name)
+        values.append(_eval(expr, enclosing_env))
+    new_env = environment.Frame(environment.Scope(names), values,
+                                enclosing_env)
 
     # Evaluate the body expressions in the new environment,
     # as though they were enclosed in a `begin` statement.
     return _eval_begin(exprs, new_env)
 
 def _eval_quote(data, env):
+    # The parser already converted the quoted tree to Lisp data.
     assert len(data) == 1
-    quoted_syntax_tree = data[0]
-    if isinstance(quoted_syntax_tree, list):
-        # TODO(jasonpr): Use a Lisp list.
-        return [_eval_quote([subtree], env) for subtree in quoted_syntax_tree]
-    else:
-        return datatypes.Symbol(quoted_syntax_tree)
+    return data[0]
+
+
+def _eval_time(data, env):
+    """Evaluate a 'time' expression, reporting how long it took."""
+    assert len(data) == 1
+    start = start_timer()
+    value = _eval(data[0], env)
+    report_time(start)
+    return value
+
+
+def start_timer():
+    """Start timing a 'time' expression."""
+    return time.time(), time.clock()
+
+
+def report_time(start):
+    """Print the time since start_timer() was called."""
+    start_real, start_cpu = start
+    print 'cpu time: %.3f ms, real time: %.3f ms' % (
+        (time.clock() - start_cpu) * 1000, (time.time() - start_real) * 1000)
 
 
 evaluators = {
@@ -199,6 +386,7 @@ evaluators = {
     'begin': _eval_begin,
     'let': _eval_let,
     'quote': _eval_quote,
+    'time': _eval_time,
 }
 
 
@@ -9,38 +9,151 @@ matchers = (
     (re.compile(r'\('), tokens.OpenParen),
     (re.compile(r'\)'), tokens.CloseParen),
     (re.compile(_IDENTIFIER_REGEX), tokens.Identifier),
-    (re.compile(r'(\+|-)?[0-9]+'), tokens.Integer),
+    (re.compile(r'(?:\+|-)?[0-9]+'), tokens.Integer),
     (re.compile(r'\s+'), tokens.Whitespace),
     (re.compile(r"'"), tokens.Quote),
     (re.compile(r'`'), tokens.BackQuote),
-    (re.compile(r'#\[a-zA-Z]'), tokens.CharLiteral),
+    (re.compile(r'#\\(?:[a-zA-Z]+|\S)'), tokens.CharLiteral),
     (re.compile(r'#[tfTF]'), tokens.BooleanLiteral),
     (re.compile(r'#\('), tokens.OpenVector),
-    (re.compile(r'"([^"\\]|\\"|\\\\)*"'), tokens.String),
-    (re.compile(r';.*$'), tokens.Comment),
+    (re.compile(r'"(?:[^"\\]|\\.)*"'), tokens.String),
+    (re.compile(r';[^\n]*'), tokens.Comment),
 )
 
+# All of the matchers, as alternatives of one regex.  Like the matchers,
+# earlier alternatives take precedence.  Each alternative is a group,
+# and a match's lastindex tells which one matched.
+_master_regex = re.compile('|'.join('(%s)' % matcher.pattern
+                                    for matcher, _ in matchers))
+_token_types = (None,) + tuple(token_type for _, token_type in matchers)
+# For each group, whether its tokens are meaningful to the parser.
+_parseable = (None,) + tuple(token_type('').is_parseable()
+                             for _, token_type in matchers)
+
+# The body of a string literal: everything up to its closing quote.
+_string_body = re.compile(r'(?:[^"\\]|\\.)*')
+
+
+class _PendingString(object):
+    """The text of an unterminated string literal, gathered chunk by chunk.
+
+    Only each new chunk is searched for the closing quote, so that a
+    string spanning many lines is not rescanned from its start for each.
+    """
+    def __init__(self, text):
+        assert text.startswith('"')
+        self._pieces = [text]
+        # The unsearched end of the text: empty, or a backslash whose
+        # escaped character has yet to arrive.  None if the body ended at
+        # something no string can contain, so the string can never close.
+        self._tail = None
+        self._search(text, 1)
+
+    def _search(self, text, start):
+        """Search text from start, and return whether the string closed."""
+        end = _string_body.match(text, start).end()
+        if end < len(text) and text[end] == '"':
+            return True
+        self._tail = text[end:] if len(text) - end < 2 else None
+        return False
+
+    def add(self, chunk):
+        """Add a chunk of text, and return whether the string has closed."""
+        self._pieces.append(chunk)
+        if self._tail is None:
+            return False
+        return self._search(self._tail + chunk, 0)
+
+    def text(self):
+        return ''.join(self._pieces)
+
+
 def first_token(lisp_line):
     """Return the first token from a line of Lisp."""
-    for matcher, token_type in matchers:
-        match = matcher.match(lisp_line)
-        if match:
-            return token_type(match.group())
+    match = _master_regex.match(lisp_line)
+    if match:
+        return _token_types[match.lastindex](match.group())
     # If we get here, there's no valid token.
     raise ValueError('No valid token found: "%s".' % lisp_line.strip())
 
 def line_tokens(lisp_line):
     """Yield all tokens from a line of Lisp."""
-    while lisp_line:
-        token = first_token(lisp_line)
-        if token.is_parseable():
-            yield token
-        lisp_line = lisp_line[len(token.text):]
+    return lisp_tokens([lisp_line])
 
-def lisp_tokens(lisp_lines):
-    for line in lisp_lines:
-        for token in line_tokens(line):
-            yield token
+def lisp_tokens(lisp_lines, positions=False):
+    """Yield all parseable tokens from an iterable of Lisp text.
+
+    The text is usually split into lines, but may be split anywhere
+    between tokens.  A string literal that spans lines is scanned once the
+    line that completes it has arrived.
+
+    Scanning walks the text with a position offset, never copying it.  The
+    lines of an unterminated string are gathered, and scanned together
+    once the string closes.
+
+    Args:
+        lisp_lines: An iterable of Lisp text.
+        positions: Whether to set each token's position to the (line,
+            column) it starts at, both counted from 1.
+    """
+    match = _master_regex.match
+    token_types, parseable = _token_types, _parseable
+    unscanned = ''
+    # The current line number, the offset in the text at which it starts
+    # (negative if it started in an earlier chunk), how far the text has
+    # been searched for newlines, and the offset of the next newline, or
+    # of the end of the text if there is none.  Tokens before the next
+    # newline are on the current line, so need no search.
+    line, line_start, counted = 1, 0, 0
+    pending = None
+    for chunk in lisp_lines:
+        if pending is not None:
+            if not pending.add(chunk):
+                continue
+            text, pending = pending.text(), None
+        else:
+            text = chunk
+        position, length = 0, len(text)
+        if positions:
+            next_newline = text.find('\n')
+            if next_newline < 0:
+                next_newline = length
+        while position < length:
+            found = match(text, position)
+            if not found:
+                break
+            position = found.end()
+            group = found.lastindex
+            if parseable[group]:
+                token = token_types[group](found.group())
+                if positions:
+                    start = found.start()
+                    if start > next_newline:
+                        line += text.count('\n', counted, start)
+                        line_start = text.rindex('\n', counted, start) + 1
+                        next_newline = text.find('\n', start)
+                        if next_newline < 0:
+                            next_newline = length
+                    counted = start
+                    token.position = (line, start - line_start + 1)
+                yield token
+        unscanned = text[position:]
+        # Only an unterminated string could be completed by more input.
+        if unscanned and not unscanned.startswith('"'):
+            break
+        pending = _PendingString(unscanned) if unscanned else None
+        if positions:
+            newlines = text.count('\n', counted, position)
+            if newlines:
+                line += newlines
+                line_start = text.rindex('\n', counted, position) + 1
+            line_start -= position
+            counted = 0
+
+    if pending is not None:
+        unscanned = pending.text()
+    if unscanned:
+        raise ValueError('No valid token found: "%s".' % unscanned.strip())
 
 class TokenSupply(object):
     """A peeking iterator of tokens.
@@ -81,6 +194,19 @@ class TokenSupply(object):
         self._peeked_value = None
         return result
 
+    def __iter__(self):
+        """Iterate over the remaining tokens.
+
+        This is faster than calling next() repeatedly, for a consumer
+        that takes every token.
+        """
+        token = self.next()
+        if token is not None:
+            yield token
+        for token in self._tokenizer:
+            if token is not None:
+                yield token
+
     def peek(self):
         """Return the next token, without advancing.
 
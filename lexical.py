@@ -0,0 +1,94 @@
+"""Lexical addressing: which Frame slot each variable reference uses.
+
+Functions and 'let' expressions create Frames.  Their Scopes hold the
+names they bind directly, plus every name that a 'define' in their body
+may add.  Knowing the chain of Scopes that encloses an expression, a
+variable reference can be resolved to a (depth, index) address before
+the code ever runs.
+"""
+
+import environment
+
+
+def function_scope(arg_names, body_exprs):
+    """Make the Scope for invocations of a function."""
+    names = list(arg_names)
+    for expr in body_exprs:
+        _collect_defines(expr, names)
+    scope = environment.Scope(names, bound=len(arg_names))
+    scope.captured = any(_creates_functions(expr) for expr in body_exprs)
+    return scope
+
+
+def let_scope(bindings, body_exprs):
+    """Make the Scope for a 'let' expression's body."""
+    names = [binding[0] for binding in bindings]
+    for expr in body_exprs:
+        _collect_defines(expr, names)
+    return environment.Scope(names, bound=len(bindings))
+
+
+def resolve(name, scopes):
+    """Find the lexical address of a variable.
+
+    Args:
+        name: The variable's name.
+        scopes: The enclosing Scopes, innermost first.
+
+    Returns (depth, index) if one of the scopes binds the name, or None
+    if it is free, and must be found by name beyond the outermost scope.
+    """
+    for depth, scope in enumerate(scopes):
+        index = scope.index.get(name)
+        if index is not None:
+            return depth, index
+    return None
+
+
+def _collect_defines(expr, names):
+    """Append names that 'define' may bind in the current scope.
+
+    Descends into every subexpression that is evaluated in the current
+    scope, but not into function bodies, 'let' bodies or quotations.
+    """
+    if not isinstance(expr, list) or not expr:
+        return
+
+    directive, data = expr[0], expr[1:]
+    subexprs = expr
+    if directive == 'quote' or directive == 'lambda':
+        return
+    elif directive == 'define' and data:
+        defined = data[0]
+        if isinstance(defined, list):
+            # A function definition.  Only its name is bound here.
+            if defined:
+                names.append(defined[0])
+            return
+        names.append(defined)
+        subexprs = data[1:]
+    elif directive == 'let' and data:
+        # Only the bound expressions are evaluated in this scope.
+        subexprs = [binding[1] for binding in data[0] if len(binding) == 2]
+
+    for subexpr in subexprs:
+        _collect_defines(subexpr, names)
+
+
+def _creates_functions(expr):
+    """Whether evaluating an expression may create a function."""
+    pending = [expr]
+    while pending:
+        expr = pending.pop()
+        if not isinstance(expr, list) or not expr:
+            continue
+        directive = expr[0]
+        if directive == 'quote':
+            continue
+        elif directive == 'lambda':
+            return True
+        elif (directive == 'define' and len(expr) > 1 and
+              isinstance(expr[1], list)):
+            return True
+        pending.extend(expr)
+    return False
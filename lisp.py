@@ -2,35 +2,104 @@
 
 """The main driver for the Lisp system."""
 
+import argparse
 import sys
 
+import bytecode
+import cek
 import environment
 import formatter
+import formcache
+import image
 import interpreter
 import lexer
+import optimizer
 import parser
+import profiler
 import pyfuncs
+import server
+import tasks
 
 
-def _execute_file(code_file, env, print_results=False):
+def _execute_file(code_file, env, source_name=None, **options):
     """Execute some lisp.
 
     Args:
        code_file: An iterator over lines of Lisp text.
        env: The base environment.
-       print_results: Whether to print the value of each top-level expression.
+       source_name: What to call the text in error messages.
+       options: Keyword arguments for _execute_trees.
     """
+    source_map = parser.SourceMap(source_name)
+    tokens = lexer.TokenSupply(lexer.lisp_tokens(code_file, positions=True))
+    _execute_trees(parser.parse_trees(tokens, source_map), env,
+                   source_map=source_map, **options)
+
+def _execute_path(path, env, use_cache=True, **options):
+    """Execute a file of lisp, given its path.
 
-    tokens = lexer.TokenSupply(lexer.lisp_tokens(code_file))
-    # Are there useful ways to clean up a parse tree before we start
-    # calling it an AST?
-    # TODO(jasonpr): Investigate.
-    for ast in parser.parse_trees(tokens):
-        evaluation = interpreter.execute(ast, env)
+    Args:
+       path: The path of a Lisp source file.
+       env: The base environment.
+       use_cache: Whether to use the formcache module's on-disk cache of
+           parse trees.
+       options: Keyword arguments for _execute_trees.
+    """
+    if use_cache:
+        source_map = parser.SourceMap(path)
+        _execute_trees(formcache.load_trees(path, source_map), env,
+                       source_map=source_map, **options)
+    elif options.get('optimize'):
+        # The optimizer needs to see the whole program first.
+        source_map = parser.SourceMap(path)
+        with open(path) as source_file:
+            trees = formcache.parse_source(source_file.read(), source_map)
+        _execute_trees(trees, env, source_map=source_map, **options)
+    else:
+        with open(path) as source_file:
+            _execute_file(source_file, env, path, **options)
+
+def _execute_trees(trees, env, print_results=False,
+                   engine=interpreter.DEFAULT_ENGINE, disassemble=False,
+                   optimize=0, dump_optimized=False, source_map=None):
+    """Execute a sequence of parse trees.
+
+    Args:
+       trees: An iterable of parse trees.  If it is a list, it is the whole
+           program.
+       env: The base environment.
+       print_results: Whether to print the value of each top-level expression.
+       engine: Which of interpreter.ENGINES evaluates the code.
+       disassemble: Whether to print each top-level expression's bytecode
+           before executing it.
+       optimize: The optimizer.LEVELS level to optimize the trees at.
+       dump_optimized: Whether to print each optimized tree before
+           executing it.
+       source_map: A parser.SourceMap of where the trees began, to say
+           which expression failed, if one does.
+    """
+    tree_optimizer = optimizer.Optimizer(env, optimize)
+    if isinstance(trees, list):
+        tree_optimizer.note_trees(trees)
+    for tree in trees:
+        # Clean up the parse tree before we call it an AST.
+        ast = tree_optimizer.optimize(tree)
+        if dump_optimized:
+            print tree_optimizer.format_tree(ast)
+        if disassemble:
+            print bytecode.disassemble(bytecode.compile_toplevel(ast))
+        try:
+            evaluation = interpreter.execute(ast, env, engine)
+        except Exception:
+            location = source_map and source_map.location(tree)
+            if location:
+                print >> sys.stderr, 'Error in the expression at %s:' % (
+                    location)
+            raise
         if print_results and evaluation is not None:
             print formatter.lisp_format(evaluation)
 
-def _base_env():
+def _base_env(engine=interpreter.DEFAULT_ENGINE, use_cache=True):
     """Make a base environment.
 
     Contains functions implemented in Python, and functions defined
@@ -45,26 +114,132 @@ def _base_env():
     # Provide some functions, written in Lisp.
     BASE_LIB_FILENAMES = ['lib/builtin.lisp']
     for lib_filename in BASE_LIB_FILENAMES:
-        with open(lib_filename) as lib_file:
-            _execute_file(lib_file, env)
+        _execute_path(lib_filename, env, use_cache, engine=engine)
 
     return env
 
-def _line_reader():
-    """Read and yield lines of Lisp text."""
+def _line_reader(tree_parser):
+    """Read and yield lines of Lisp text.
+
+    The prompt shows whether the parser is partway through an
+    expression, which the line will continue.
+    """
     while True:
-        yield raw_input('jlisp > ')
+        prompt = '   ...> ' if tree_parser.pending() else 'jlisp > '
+        # Put back the newline, which separates tokens on adjacent lines.
+        yield raw_input(prompt) + '\n'
+
+def _repl(env, **options):
+    """Read, evaluate and print expressions, until the input ends.
+
+    The parser keeps its place in an unfinished expression, so an
+    expression can span lines, each parsed once as it arrives.
+    """
+    tree_parser = parser.Parser()
+    tokens = lexer.TokenSupply(lexer.lisp_tokens(_line_reader(tree_parser),
+                                                 positions=True))
+    _execute_trees(tree_parser.trees(tokens), env, print_results=True,
+                   **options)
+
+def _arg_parser():
+    """Make the parser for command line arguments."""
+    arg_parser = argparse.ArgumentParser(description='Run jlisp.')
+    arg_parser.add_argument('file_name', nargs='?',
+                            help='A Lisp script.  If omitted, run a REPL.')
+    arg_parser.add_argument('--engine', choices=interpreter.ENGINES,
+                            default=interpreter.DEFAULT_ENGINE,
+                            help='The evaluation engine.')
+    arg_parser.add_argument('--max-depth', type=int,
+                            help='With the cek engine, the most expressions '
+                            'that may wait on values at once, such as '
+                            'pending non-tail calls.')
+    arg_parser.add_argument('--disassemble', action='store_true',
+                            help='Print the bytecode for each top-level '
+                            'expression before executing it.')
+    arg_parser.add_argument('-O', dest='optimize', type=int,
+                            choices=optimizer.LEVELS, default=0,
+                            help='The optimization level.  1 simplifies '
+                            'the code, and 2 also uses builtins directly.')
+    arg_parser.add_argument('--dump-optimized', action='store_true',
+                            help='Print each top-level expression after '
+                            'optimizing it.')
+    arg_parser.add_argument('--no-cache', dest='use_cache',
+                            action='store_false',
+                            help='Do not read or write cached parse trees.')
+    arg_parser.add_argument('--image', metavar='PATH',
+                            help='Load the base environment from an image '
+                            'file, instead of building it.')
+    arg_parser.add_argument('--dump-image', metavar='PATH',
+                            help='Write the base environment to an image '
+                            'file, then exit.')
+    arg_parser.add_argument('--serve', metavar='PATH',
+                            help='Serve requests to run scripts on a Unix '
+                            'socket (see client.py), instead of running one.')
+    arg_parser.add_argument('--workers', type=int, default=4,
+                            help='With --serve, how many requests may run '
+                            'at once.')
+    arg_parser.add_argument('--timeout', type=int, default=30,
+                            help='With --serve, how many seconds a request '
+                            'may run.')
+    arg_parser.add_argument('--profile', action='store_true',
+                            help='Print a report of the time spent in each '
+                            'function to stderr.')
+    arg_parser.add_argument('--profile-collapsed', metavar='PATH',
+                            help='Profile, and write collapsed stacks for '
+                            'flame graph tools to a file.')
+    return arg_parser
 
 def main(argv):
     """Execute a Lisp script if provided, otherwise run a REPL."""
-    base_env = _base_env()
-
-    if len(argv) >= 2:
-        file_name = argv[1]
-        with open(file_name) as source_file:
-            _execute_file(source_file, base_env, print_results=True)
+    args = _arg_parser().parse_args(argv[1:])
+    cek.max_depth = args.max_depth
+    if args.image:
+        with open(args.image, 'rb') as image_file:
+            base_env = image.load(image_file)
     else:
-        _execute_file(_line_reader(), base_env, print_results=True)
+        base_env = _base_env(args.engine, args.use_cache)
+
+    if args.dump_image:
+        with open(args.dump_image, 'wb') as image_file:
+            image.dump(base_env, image_file)
+        return
+
+    if args.serve:
+        server.serve(args.serve, base_env, args.workers, args.timeout,
+                     engine=args.engine, optimize=args.optimize,
+                     use_cache=args.use_cache)
+        return
+
+    profiling = args.profile or args.profile_collapsed
+    if profiling:
+        if args.engine not in profiler.PROFILED_ENGINES:
+            sys.exit('Profiling needs one of these engines: %s.' %
+                     ', '.join(profiler.PROFILED_ENGINES))
+        lisp_profiler = profiler.Profiler()
+        lisp_profiler.enable()
+
+    try:
+        if args.file_name:
+            _execute_path(args.file_name, base_env, args.use_cache,
+                          print_results=True, engine=args.engine,
+                          disassemble=args.disassemble,
+                          optimize=args.optimize,
+                          dump_optimized=args.dump_optimized)
+            # Let any spawned tasks finish.
+            tasks.run_until_idle()
+        else:
+            _repl(base_env, engine=args.engine, disassemble=args.disassemble,
+                  optimize=args.optimize, dump_optimized=args.dump_optimized)
+    except cek.DepthExceeded as error:
+        sys.exit('Error: %s' % error)
+    finally:
+        if profiling:
+            lisp_profiler.disable()
+            if args.profile:
+                print >> sys.stderr, lisp_profiler.report()
+            if args.profile_collapsed:
+                with open(args.profile_collapsed, 'w') as collapsed_file:
+                    lisp_profiler.write_collapsed(collapsed_file)
 
 if __name__ == '__main__':
     main(sys.argv)
@@ -0,0 +1,158 @@
+"""Memoized functions, which cache their results by argument values.
+
+A MemoizedFunction wraps a LispFunction (or a builtin).  Calls with
+arguments equal to an earlier call's return the cached result.
+Arguments are compared as equal? compares them: numbers by value and
+exactness, so 3 and 3.0 are cached apart, Pairs, vectors and strings by
+their contents, and everything else by identity.  An argument must not
+be mutated while its call is cached.
+
+The cache evicts its least recently used entries to stay within an
+optional number of entries, and an optional estimate of the memory its
+keys and values use.
+"""
+
+import collections
+import sys
+
+import datatypes
+import equality
+import interpreter
+
+
+class _ArgumentsKey(object):
+    """Wraps a call's arguments, to hash and compare them as equal? does."""
+    __slots__ = ('inputs', '_hash')
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self._hash = hash(tuple(equality.equal_hash(value)
+                                for value in inputs))
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return (len(self.inputs) == len(other.inputs) and
+                all(equality.equal(mine, theirs) for mine, theirs
+                    in zip(self.inputs, other.inputs)))
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class MemoizedFunction(object):
+    """A function that caches its results, with LRU eviction."""
+    def __init__(self, function, max_entries=None, max_bytes=None):
+        self.function = function
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Maps the _ArgumentsKey of each call to its (result, estimated
+        # size) pair, least recently used first.
+        self._cache = collections.OrderedDict()
+        self._bytes = 0
+
+    def __call__(self, *inputs):
+        key = _ArgumentsKey(inputs)
+        try:
+            entry = self._cache.pop(key)
+        except KeyError:
+            pass
+        else:
+            # Move the entry to the most recently used end.
+            self._cache[key] = entry
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        result = interpreter.apply(self.function, inputs)
+        # The call may have filled the cache with this entry already.
+        if key not in self._cache:
+            size = (estimate_size(inputs) + estimate_size(result)
+                    if self.max_bytes is not None else 0)
+            self._cache[key] = (result, size)
+            self._bytes += size
+            self._evict()
+        return result
+
+    def _evict(self):
+        """Drop least recently used entries until within the limits."""
+        while self._cache and (
+                (self.max_entries is not None and
+                 len(self._cache) > self.max_entries) or
+                (self.max_bytes is not None and
+                 self._bytes > self.max_bytes)):
+            _, (_, size) = self._cache.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Empty the cache, keeping the statistics."""
+        self._cache.clear()
+        self._bytes = 0
+
+    def stats(self):
+        """Get the cache statistics, as a Lisp association list."""
+        return datatypes.make_list(
+            datatypes.Pair(datatypes.Symbol(name), value) for name, value in (
+                ('hits', self.hits),
+                ('misses', self.misses),
+                ('evictions', self.evictions),
+                ('entries', len(self._cache)),
+                ('bytes', self._bytes)))
+
+    def __repr__(self):
+        return 'Memoized[%s]' % self.function
+
+
+def estimate_size(value):
+    """Estimate the bytes used by a Lisp value and the data it holds.
+
+    Functions are not followed, and shared structure is counted once per
+    reference.
+    """
+    total = 0
+    pending = [value]
+    while pending:
+        value = pending.pop()
+        total += sys.getsizeof(value)
+        if isinstance(value, datatypes.Pair):
+            pending.append(value.car)
+            pending.append(value.cdr)
+        elif isinstance(value, (tuple, datatypes.Vector)):
+            pending.extend(value)
+    return total
+
+
+def memoize(function, max_entries=datatypes.lisp_bool(False),
+            max_bytes=datatypes.lisp_bool(False)):
+    """Memoize a function.  The Lisp builtin 'memoize'.
+
+    A limit of #f means no limit.
+    """
+    return MemoizedFunction(function, _limit(max_entries),
+                            _limit(max_bytes))
+
+
+def _limit(value):
+    if value is datatypes.lisp_bool(False):
+        return None
+    return datatypes.assert_int(value)
+
+
+def _assert_memoized(candidate):
+    assert isinstance(candidate, MemoizedFunction)
+    return candidate
+
+
+def memo_stats(function):
+    """The Lisp builtin 'memo-stats'."""
+    return _assert_memoized(function).stats()
+
+
+def memo_clear(function):
+    """The Lisp builtin 'memo-clear!'."""
+    _assert_memoized(function).clear()
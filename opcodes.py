@@ -0,0 +1,30 @@
+"""Opcodes for the bytecode compiled by bytecode.py and run by vm.py."""
+
+# Opcodes.  'Pushes' and 'pops' refer to the VM's value stack.
+CONST = 0          # Push constants[arg].
+LOAD_LOCAL = 1     # Push slot arg of the current frame.
+LOAD_DEREF = 2     # Push slot arg[1] of the frame arg[0] levels up.
+LOAD_FREE = 3      # Skip arg[0] frames, then push the value named arg[1].
+DEFINE_SLOT = 4    # Pop into slot arg[1], arg[0] frames up.  Push None.
+DEFINE_FREE = 5    # Skip arg[0] frames, pop into name arg[1].  Push None.
+SET_SLOT = 6       # Like DEFINE_SLOT, but push the original value.
+SET_FREE = 7       # Like DEFINE_FREE, but push the original value.
+POP = 8            # Discard the top of the stack.
+JUMP = 9           # Continue at instruction arg.
+JUMP_IF_FALSE = 10 # Pop, and continue at instruction arg if it was #f.
+MAKE_FUNCTION = 11 # Push a LispFunction for the template constants[arg].
+CALL = 12          # Pop arg inputs and a function, and push the result.
+TAIL_CALL = 13     # Like CALL, but the result is this activation's result.
+RETURN = 14        # Pop the result, and resume the caller.
+LET = 15           # Pop arg[1] values into a frame for Scope
+                   # constants[arg[0]].
+END_LET = 16       # Leave the current frame for its parent.
+TIME_START = 17    # Push a timer.
+TIME_END = 18      # Pop a value and a timer, report the time, push the value.
+
+OPCODE_NAMES = (
+    'CONST', 'LOAD_LOCAL', 'LOAD_DEREF', 'LOAD_FREE', 'DEFINE_SLOT',
+    'DEFINE_FREE', 'SET_SLOT', 'SET_FREE', 'POP', 'JUMP', 'JUMP_IF_FALSE',
+    'MAKE_FUNCTION', 'CALL', 'TAIL_CALL', 'RETURN', 'LET', 'END_LET',
+    'TIME_START', 'TIME_END',
+)
@@ -0,0 +1,276 @@
+"""Optimizes parse trees before they are evaluated.
+
+Level 1 makes structural simplifications, which never change what a
+program does:
+- An 'if' whose condition is a literal becomes the branch it selects.
+- Nested 'begin's are flattened, and a 'begin' of one expression becomes
+  that expression.
+- A 'let' with no bindings, whose body defines nothing, becomes a 'begin'.
+
+Level 2 also uses the builtins from pyfuncs directly.  A reference to a
+builtin in operator position is replaced by the builtin itself, which
+evaluates to itself, and a pure builtin applied to literals is replaced
+by its result.  This is only done where the name refers to the builtin
+for sure: no enclosing function or 'let' binds it, and the program
+never defines it globally or set!s it, anywhere.  At the REPL, the
+program is the code entered so far, so later redefinitions of a builtin
+do not affect code that used it.
+
+Trees are optimized after they are cached (see formcache.py), so cached
+trees do not depend on the optimization level.
+"""
+
+import datatypes
+import lexical
+import pyfuncs
+
+LEVELS = (0, 1, 2)
+
+# Builtins without side effects, which may run at optimization time.
+_PURE_BUILTINS = ('+', '-', '*', '/', '<', '>', '<=', '>=', 'eq?', 'eqv?',
+                  'equal?')
+
+# The names of the special forms, which are not variables.
+_SPECIAL_FORMS = ('if', 'define', 'lambda', 'set!', 'begin', 'let', 'quote',
+                  'time')
+
+
+class Optimizer(object):
+    """Optimizes the trees of one program."""
+    def __init__(self, env, level):
+        # The global environment the program runs in.
+        self._env = env
+        self.level = level
+        # Names the program may bind globally.
+        self._bound_names = set()
+        self._builtin_names = dict((id(function), name) for name, function
+                                   in pyfuncs.functions.items())
+
+    def note_trees(self, trees):
+        """Note the names that some of the program's trees bind.
+
+        Every tree must be noted before any tree is optimized, for
+        builtins to be used safely.  Trees are noted by optimize, too.
+        """
+        for tree in trees:
+            _collect_bound_names(tree, self._bound_names)
+
+    def optimize(self, tree):
+        """Return an optimized version of a tree."""
+        if self.level == 0:
+            return tree
+        self.note_trees([tree])
+        return self._optimize(tree, frozenset())
+
+    def _optimize(self, expr, local_names):
+        """Optimize an expression, given the local names in its scope."""
+        if not isinstance(expr, list) or not expr:
+            return expr
+        directive, data = expr[0], expr[1:]
+        if isinstance(directive, str) and directive in _SPECIAL_FORMS:
+            return _special_forms[directive](self, data, local_names)
+        return self._optimize_application(expr, local_names)
+
+    def _optimize_body(self, exprs, local_names):
+        """Optimize the expressions of a body, as for a 'begin'."""
+        return _flatten([self._optimize(expr, local_names)
+                         for expr in exprs])
+
+    def _optimize_application(self, expr, local_names):
+        expr = [self._optimize(subexpr, local_names) for subexpr in expr]
+        if self.level < 2:
+            return expr
+        operator = expr[0]
+        builtin = self._builtin(operator, local_names)
+        if builtin is None:
+            return expr
+        expr[0] = builtin
+        if operator in _PURE_BUILTINS and all(
+                _is_literal(operand) for operand in expr[1:]):
+            try:
+                value = builtin(*[_literal_value(operand)
+                                  for operand in expr[1:]])
+            except (ArithmeticError, TypeError, ValueError):
+                # Leave the error for run time.
+                return expr
+            if _is_atom_literal(value):
+                return value
+        return expr
+
+    def _builtin(self, name, local_names):
+        """Get the builtin a name always refers to, or None."""
+        if (not isinstance(name, str) or name in local_names or
+            name in self._bound_names):
+            return None
+        function = pyfuncs.functions.get(name)
+        if function is None:
+            return None
+        try:
+            if self._env[name] is not function:
+                return None
+        except KeyError:
+            return None
+        return function
+
+    def _optimize_if(self, data, local_names):
+        data = [self._optimize(expr, local_names) for expr in data]
+        if len(data) == 3 and _is_literal(data[0]):
+            if _literal_value(data[0]) is datatypes.lisp_bool(False):
+                return data[2]
+            return data[1]
+        return ['if'] + data
+
+    def _optimize_define(self, data, local_names):
+        if data and isinstance(data[0], list):
+            # A function definition.
+            spec, body = data[0], data[1:]
+            return ['define', spec] + self._optimize_function(
+                spec[1:], body, local_names)
+        return ['define'] + [self._optimize(expr, local_names)
+                             for expr in data]
+
+    def _optimize_lambda(self, data, local_names):
+        if not data:
+            return ['lambda'] + data
+        return ['lambda', data[0]] + self._optimize_function(
+            data[0], data[1:], local_names)
+
+    def _optimize_function(self, arg_names, body, local_names):
+        """Optimize a function body."""
+        scope = lexical.function_scope(arg_names, body)
+        return self._optimize_body(body, local_names | set(scope.names))
+
+    def _optimize_set(self, data, local_names):
+        return ['set!'] + [self._optimize(expr, local_names)
+                           for expr in data]
+
+    def _optimize_begin(self, data, local_names):
+        body = self._optimize_body(data, local_names)
+        if len(body) == 1:
+            return body[0]
+        return ['begin'] + body
+
+    def _optimize_let(self, data, local_names):
+        if not data:
+            return ['let'] + data
+        bindings, body = data[0], data[1:]
+        scope = lexical.let_scope(bindings, body)
+        if not scope.names:
+            # Without bindings or definitions, the scope is not needed.
+            return self._optimize_begin(body, local_names)
+        bindings = [binding[:1] + [self._optimize(expr, local_names)
+                                   for expr in binding[1:]]
+                    for binding in bindings]
+        return ['let', bindings] + self._optimize_body(
+            body, local_names | set(scope.names))
+
+    def _optimize_quote(self, data, local_names):
+        return ['quote'] + data
+
+    def _optimize_time(self, data, local_names):
+        return ['time'] + [self._optimize(expr, local_names)
+                           for expr in data]
+
+    def format_tree(self, tree):
+        """Format an optimized tree for display, as Lisp code."""
+        if isinstance(tree, list):
+            if len(tree) == 2 and tree[0] == 'quote':
+                return "'%s" % (tree[1],)
+            return '(%s)' % ' '.join(self.format_tree(expr)
+                                     for expr in tree)
+        name = self._builtin_names.get(id(tree))
+        if name is not None:
+            return '#<builtin %s>' % name
+        return '%s' % (tree,)
+
+
+_special_forms = {
+    'if': Optimizer._optimize_if,
+    'define': Optimizer._optimize_define,
+    'lambda': Optimizer._optimize_lambda,
+    'set!': Optimizer._optimize_set,
+    'begin': Optimizer._optimize_begin,
+    'let': Optimizer._optimize_let,
+    'quote': Optimizer._optimize_quote,
+    'time': Optimizer._optimize_time,
+}
+
+
+def _flatten(exprs):
+    """Splice the contents of 'begin' expressions into a sequence.
+
+    An empty 'begin' is kept at the end, where it gives the sequence
+    its (lack of a) value.
+    """
+    result = []
+    for position, expr in enumerate(exprs):
+        if _is_begin(expr) and (len(expr) > 1 or position < len(exprs) - 1):
+            result.extend(expr[1:])
+        else:
+            result.append(expr)
+    return result
+
+
+def _is_begin(expr):
+    return isinstance(expr, list) and bool(expr) and expr[0] == 'begin'
+
+
+def _is_literal(expr):
+    """Whether an expression always evaluates to the same datum."""
+    if isinstance(expr, list):
+        return not expr or (expr[0] == 'quote' and len(expr) == 2)
+    return _is_atom_literal(expr)
+
+
+def _is_atom_literal(value):
+    """Whether a value may appear in a tree as its own literal."""
+    return (type(value) in datatypes.INTEGER_TYPES or
+            isinstance(value, datatypes.Fraction) or
+            value is datatypes.lisp_bool(True) or
+            value is datatypes.lisp_bool(False))
+
+
+def _literal_value(expr):
+    """Get the datum a literal expression evaluates to."""
+    if isinstance(expr, list):
+        return expr[1] if expr else datatypes.null
+    return expr
+
+
+def _collect_bound_names(expr, names):
+    """Add the names an expression may bind globally to a set.
+
+    These are the names it defines outside of any function or 'let'
+    body, and every name it set!s.  (Other bindings are local, and the
+    optimizer follows their scopes.)
+    """
+    # Pairs of an expression, and whether it is in the global scope.
+    pending = [(expr, True)]
+    while pending:
+        expr, is_global = pending.pop()
+        if not isinstance(expr, list) or not expr:
+            continue
+        directive, data = expr[0], expr[1:]
+        if directive == 'quote':
+            continue
+        elif directive == 'set!' and data:
+            names.add(data[0])
+        elif directive == 'define' and data:
+            target = data[0]
+            if isinstance(target, list):
+                # A function definition.
+                if is_global and target:
+                    names.add(target[0])
+                pending.extend((body_expr, False) for body_expr in data[1:])
+                continue
+            if is_global:
+                names.add(target)
+        elif directive == 'lambda':
+            pending.extend((body_expr, False) for body_expr in data[1:])
+            continue
+        elif directive == 'let' and data and isinstance(data[0], list):
+            pending.extend((binding[1], is_global) for binding in data[0]
+                           if isinstance(binding, list) and len(binding) == 2)
+            pending.extend((body_expr, False) for body_expr in data[1:])
+            continue
+        pending.extend((subexpr, is_global) for subexpr in data)
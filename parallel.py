@@ -0,0 +1,214 @@
+"""A parallel map, which spreads function calls over worker processes.
+
+Worker processes are started once, the first time they are needed, and
+reused.  Each one builds its own base environment when it starts, and
+that warm environment serves as the global environment for the
+functions it runs.
+
+A function is sent to the workers as a pickle, like an image (see
+image.py): builtins are sent by name, and the function's closure is
+copied.  The global environment is not copied.  Instead, we send the
+values of just the globals that the function's code, and the code of
+the functions it reaches, could refer to.  Elements are sent in chunks,
+and results come back in order.
+
+Functions run in a worker cannot change the caller's globals, so the
+mapped function should be pure.
+"""
+
+import cStringIO
+import itertools
+import multiprocessing
+import os
+
+import datatypes
+import image
+import interpreter
+import typedvector
+
+# The pool of worker processes, once started.
+_pool = None
+_pool_size = None
+
+# Identifies each function sent to the workers.
+_payload_counter = itertools.count()
+
+# In a worker process: its global environment, and the most recently
+# received function, as a (payload id, function) pair.
+_worker_env = None
+_worker_function = (None, None)
+
+# The persistent id of the global environment, in pickles.
+_GLOBALS_ID = 'globals'
+
+
+def start(processes=None):
+    """Start the worker pool, with one process per CPU by default."""
+    global _pool, _pool_size
+    shutdown()
+    _pool_size = processes or multiprocessing.cpu_count()
+    _pool = multiprocessing.Pool(_pool_size, initializer=_start_worker)
+
+
+def shutdown():
+    """Stop the worker pool, if it is running."""
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+
+
+def parallel_map(function, sequence, chunk_size=None):
+    """Apply a function to each element of a list or vector, in parallel.
+
+    The Lisp builtin 'parallel-map'.  Returns a new list or vector of the
+    results, in order.
+    """
+    if typedvector.is_vector(sequence):
+        elements = list(sequence)
+    else:
+        elements = list(datatypes.iter_list(sequence))
+
+    if _worker_env is not None:
+        # Worker processes cannot have workers of their own.
+        results = [interpreter.apply(function, [element])
+                   for element in elements]
+    else:
+        results = _map_in_workers(function, elements, chunk_size)
+
+    if isinstance(sequence, typedvector.TypedVector):
+        return typedvector.TypedVector.from_values(sequence.element_type,
+                                                   results)
+    elif isinstance(sequence, datatypes.Vector):
+        return datatypes.Vector(results)
+    return datatypes.make_list(results)
+
+
+def _map_in_workers(function, elements, chunk_size):
+    """Apply a function to each element in the worker pool."""
+    if not elements:
+        return []
+    if _pool is None:
+        start()
+    if chunk_size is None:
+        # A few chunks per worker balances the load.
+        chunk_size = -(-len(elements) // (_pool_size * 4))
+    chunk_size = datatypes.assert_int(chunk_size)
+
+    global_env = _global_env(function)
+    globals_id = _globals_id(global_env)
+    extra_objects = {_GLOBALS_ID: global_env}
+    payload_id = '%d:%d' % (os.getpid(), next(_payload_counter))
+    payload = _dumps((function, _referenced_globals(function, global_env)),
+                     globals_id)
+    tasks = ((payload_id, payload,
+              _dumps(elements[start:start + chunk_size], globals_id))
+             for start in xrange(0, len(elements), chunk_size))
+
+    results = []
+    for chunk_results in _pool.imap(_run_chunk, tasks):
+        results.extend(_loads(chunk_results, extra_objects))
+    return results
+
+
+def _start_worker():
+    """Initialize a worker process, with a warm base environment."""
+    global _worker_env
+    # Imported here, since lisp imports pyfuncs, which imports us.
+    import lisp
+    _worker_env = lisp._base_env()
+
+
+def _run_chunk(task):
+    """In a worker, apply the function to a chunk of elements."""
+    global _worker_function
+    payload_id, payload, chunk = task
+    extra_objects = {_GLOBALS_ID: _worker_env}
+    if _worker_function[0] != payload_id:
+        function, bindings = _loads(payload, extra_objects)
+        for name, value in bindings:
+            _worker_env[name] = value
+        _worker_function = (payload_id, function)
+    function = _worker_function[1]
+
+    results = [interpreter.apply(function, [element])
+               for element in _loads(chunk, extra_objects)]
+    return _dumps(results, _globals_id(_worker_env))
+
+
+def _globals_id(global_env):
+    """Make a persistent id function that stores a global environment."""
+    return lambda obj: _GLOBALS_ID if obj is global_env else None
+
+
+def _dumps(obj, extra_id):
+    output = cStringIO.StringIO()
+    image.make_pickler(output, extra_id).dump(obj)
+    return output.getvalue()
+
+
+def _loads(data, extra_objects):
+    return image.make_unpickler(cStringIO.StringIO(data),
+                                extra_objects).load()
+
+
+def _global_env(function):
+    """Get the root of a function's environment chain, if it has one."""
+    if not isinstance(function, datatypes.LispFunction):
+        return None
+    env = function.env
+    while env.parent is not None:
+        env = env.parent
+    return env
+
+
+def _referenced_globals(function, global_env):
+    """Get (name, value) pairs for the globals a function may refer to.
+
+    Any identifier in the code of the function, or of a function reached
+    from it through its closure or the globals it refers to, counts.
+    """
+    if global_env is None:
+        return []
+    globals_id = _globals_id(global_env)
+    bindings = {}
+    # Values whose functions have not been scanned yet.
+    pending = [function]
+    seen = set()
+    while pending:
+        # Pickling the pending values finds the functions they reach.
+        reached = []
+        def note_function(obj):
+            if isinstance(obj, datatypes.LispFunction):
+                if id(obj) not in seen:
+                    seen.add(id(obj))
+                    reached.append(obj)
+            return globals_id(obj)
+        image.make_pickler(cStringIO.StringIO(),
+                           note_function).dump(pending)
+
+        pending = []
+        for reached_function in reached:
+            for name in _identifiers(reached_function.exprs):
+                if name in bindings:
+                    continue
+                try:
+                    value = global_env[name]
+                except KeyError:
+                    # A special form, a local, or not defined yet.
+                    continue
+                bindings[name] = value
+                pending.append(value)
+    return bindings.items()
+
+
+def _identifiers(exprs):
+    """Yield each identifier in some parse trees."""
+    pending = list(exprs)
+    while pending:
+        expr = pending.pop()
+        if isinstance(expr, list):
+            pending.extend(expr)
+        elif isinstance(expr, str):
+            yield expr
@@ -1,54 +1,105 @@
-import datatypes
-import tokens
+"""Parses tokens into trees, which the engines evaluate.
 
+A list becomes a Python list of its elements' trees, an identifier
+becomes its text (a str), and other literals become the data they
+denote.  Nested lists are parsed with an explicit stack, so deeply
+nested input cannot overflow the Python stack.
 
-def _parse_list(token_supply):
-    """Parse a list, returning a parse tree.
+Where each top-level tree began in the source can be recorded in a
+SourceMap, a side table that leaves the trees themselves as small as
+ever.
+"""
 
-    A list is an OpenParen, followed by zero or more expressions,
-    completed by a CloseParen.
-    """
-    paren = token_supply.next()
-    assert isinstance(paren, tokens.OpenParen)
+import re
 
-    result = []
-    while not isinstance(token_supply.peek(), tokens.CloseParen):
-        result.append(_parse(token_supply))
-    # Move past the closing parenthesis.
-    token_supply.discard_peeked_value()
-    return result
+import datatypes
+import tokens
 
+# The version of the parse tree format.  Bump this whenever a change to
+# the parser changes the trees it produces, or what is cached with them,
+# so that trees cached on disk by the formcache module are not reused.
+TREE_FORMAT_VERSION = 4
 
-def _parse_identifier(token_supply):
-    """Parse a non-list, returning an object."""
-    identifier = token_supply.next()
-    assert isinstance(identifier, tokens.Identifier)
+
+def quoted_datum(tree):
+    """Convert a quoted parse tree into the Lisp data it denotes.
+
+    Lists become chains of Pairs, identifiers become (interned) Symbols,
+    and other literals denote themselves.  Nested lists are converted
+    using an explicit stack, so deep nesting cannot overflow the Python
+    stack.
+    """
+    if not isinstance(tree, list):
+        return _quoted_atom(tree)
+    # Each entry is a list being converted, and the data converted from
+    # its elements so far.
+    stack = [(tree, [])]
+    while True:
+        subtree, converted = stack[-1]
+        while len(converted) < len(subtree):
+            element = subtree[len(converted)]
+            if isinstance(element, list):
+                break
+            converted.append(_quoted_atom(element))
+        else:
+            stack.pop()
+            datum = datatypes.make_list(converted)
+            if not stack:
+                return datum
+            stack[-1][1].append(datum)
+            continue
+        stack.append((element, []))
+
+
+def _quoted_atom(tree):
+    if isinstance(tree, str):
+        return datatypes.Symbol(tree)
+    return tree
+
+
+# What each escape sequence in a string literal stands for.  Other
+# escaped characters stand for themselves.
+_STRING_ESCAPES = {'n': '\n', 't': '\t'}
+
+
+def _parse_identifier(identifier):
     return identifier.text
 
 
-def _parse_integer(token_supply):
+def _parse_integer(int_token):
     """Parse an integer.
 
-    Returns a fraction, because all rational numbers are represented
-    as fractions.
+    Returns a native int, which is how exact integers are represented.
     """
-    int_token = token_supply.next()
-    assert isinstance(int_token, tokens.Integer)
-    return datatypes.Fraction(int(int_token.text))
+    return int(int_token.text)
+
 
+def _parse_string(string_token):
+    """Parse a string literal."""
+    return datatypes.String(re.sub(
+        r'\\(.)',
+        lambda match: _STRING_ESCAPES.get(match.group(1), match.group(1)),
+        string_token.text[1:-1]))
 
-def _parse_quotation(token_supply):
-    """Parse a quotation."""
-    quote_token = token_supply.next()
-    assert isinstance(quote_token, tokens.Quote)
-    quoted_syntax = _parse(token_supply)
-    return ['quote', quoted_syntax]
 
+# The characters that character literals name, like #\space.
+_CHAR_NAMES = dict((name, char)
+                   for char, name in datatypes.Char.NAMES.items())
 
-def _parse_boolean(token_supply):
+
+def _parse_char(char_token):
+    """Parse a character literal."""
+    text = char_token.text[2:]
+    if len(text) == 1:
+        return datatypes.Char(text)
+    try:
+        return datatypes.Char(_CHAR_NAMES[text.lower()])
+    except KeyError:
+        raise ValueError('Unknown character `%s`.' % char_token.text)
+
+
+def _parse_boolean(boolean_token):
     """Parse a boolean literal."""
-    boolean_token = token_supply.next()
-    assert isinstance(boolean_token, tokens.BooleanLiteral)
     text = boolean_token.text.lower()
     if text == '#t':
         return datatypes.lisp_bool(True)
@@ -58,33 +109,136 @@ def _parse_boolean(token_supply):
         raise ValueError('Unexpected boolean literal `%s`.' % text)
 
 
-# Which handler to invoke when a token is encountered in a top-level
-# parse context.
-_handlers = (
-    (tokens.OpenParen, _parse_list),
-    (tokens.Identifier, _parse_identifier),
-    (tokens.Integer, _parse_integer),
-    (tokens.Quote, _parse_quotation),
-    (tokens.BooleanLiteral, _parse_boolean),
-)
-
-def _parse(token_supply):
-    """The top-level expression parser."""
-    token = token_supply.peek()
-    if not token:
-        # That's the end!
-        return None
-
-    for token_type, handler in _handlers:
-        if isinstance(token, token_type):
-            return handler(token_supply)
-    else:
-        raise TypeError('Unexpected token type for %s.' % token)
+# How to parse each kind of token that makes a whole tree by itself.
+_atom_parsers = {
+    tokens.Identifier: _parse_identifier,
+    tokens.Integer: _parse_integer,
+    tokens.BooleanLiteral: _parse_boolean,
+    tokens.String: _parse_string,
+    tokens.CharLiteral: _parse_char,
+}
 
 
-def parse_trees(token_supply):
-    """Yields parse trees from an iterable of tokens."""
-    ast = _parse(token_supply)
-    while ast is not None:
-        yield ast
-        ast = _parse(token_supply)
+class SourceMap(object):
+    """A side table of where top-level parse trees began.
+
+    Only trees that are lists are recorded.  They are looked up by
+    identity, so a map is good only for the very trees it was filled in
+    for.
+    """
+    def __init__(self, file_name):
+        self.file_name = file_name
+        # Maps the id of each top-level list to its (line, column).
+        self._positions = {}
+        # The lists, which are kept alive so that their ids are not
+        # reused.
+        self._trees = []
+
+    def record(self, tree, position):
+        if position is not None:
+            self._positions[id(tree)] = position
+            self._trees.append(tree)
+
+    def position(self, tree):
+        """Get the (line, column) where a tree began, or None."""
+        return self._positions.get(id(tree))
+
+    def location(self, tree):
+        """Describe where a tree began, or return None if unknown."""
+        position = self.position(tree)
+        if position is None:
+            return None
+        return format_location(self.file_name, position)
+
+
+def format_location(file_name, position):
+    """Describe a (line, column) position, like 'file.lisp:3:7'."""
+    return '%s:%d:%d' % ((file_name or '<input>',) + position)
+
+
+class Parser(object):
+    """Parses trees from tokens, keeping its place between them.
+
+    The state of a partly parsed tree lives in the Parser, not on the
+    Python stack, so input can arrive a piece at a time: a REPL can ask
+    whether a tree is pending, and prompt for more of it.
+    """
+    def __init__(self, source_map=None):
+        self.source_map = source_map
+        # The lists being parsed, innermost last, and the Quote tokens of
+        # quotations waiting for the datum they quote.
+        self._stack = []
+        # Where the tree being parsed began.
+        self._start = None
+
+    def pending(self):
+        """Whether a tree has been started, but not completed."""
+        return bool(self._stack)
+
+    def trees(self, token_supply):
+        """Yield parse trees, as each is completed, from a TokenSupply."""
+        stack = self._stack
+        source_map = self.source_map
+        atom_parsers = _atom_parsers
+        for token in token_supply:
+            token_type = type(token)
+            parse = atom_parsers.get(token_type)
+            if parse is not None:
+                tree = parse(token)
+            elif token_type is tokens.OpenParen:
+                if not stack:
+                    self._start = token.position
+                stack.append([])
+                continue
+            elif token_type is tokens.CloseParen:
+                if not stack or type(stack[-1]) is not list:
+                    raise ValueError('Unexpected `)`%s.' %
+                                     self._where(token.position))
+                tree = stack.pop()
+                if len(tree) == 2 and tree[0] == 'quote':
+                    # Written out, a quotation is converted just as with
+                    # a Quote.
+                    tree[1] = quoted_datum(tree[1])
+            elif token_type is tokens.Quote:
+                if not stack:
+                    self._start = token.position
+                stack.append(token)
+                continue
+            else:
+                raise TypeError('Unexpected token type for %s%s.' %
+                                (token, self._where(token.position)))
+
+            # The tree is complete.  The quoted tree is converted to the
+            # Lisp data it denotes right away, so evaluating the
+            # quotation need not build anything.
+            while stack and type(stack[-1]) is not list:
+                stack.pop()
+                tree = ['quote', quoted_datum(tree)]
+            if stack:
+                stack[-1].append(tree)
+            else:
+                if source_map is not None and type(tree) is list:
+                    source_map.record(tree, self._start)
+                yield tree
+
+        if stack:
+            raise ValueError('Unexpected end of input, in the expression '
+                             'begun%s.' % self._where(self._start))
+
+    def _where(self, position):
+        """Describe where a position is, for error messages."""
+        if position is None:
+            return ''
+        file_name = self.source_map.file_name if self.source_map else None
+        return ' at %s' % format_location(file_name, position)
+
+
+def parse_trees(token_supply, source_map=None):
+    """Yields parse trees from a TokenSupply.
+
+    Args:
+        token_supply: The TokenSupply to parse.
+        source_map: A SourceMap to record the positions of top-level
+            trees in.  The lexer must have been asked to track positions.
+    """
+    return Parser(source_map).trees(token_supply)
@@ -0,0 +1,309 @@
+"""Persistent maps, which are never changed, only extended.
+
+(pmap-assoc map key value) returns a new map, and leaves the old one as
+it was, so that a closure can hold on to a snapshot of some state while
+the code that made it goes on to newer versions.  The versions share
+structure: a map is a hash array mapped trie, a tree with 32 branches
+per node, chosen by five bits of the key's hash at a time.  An update
+copies only the nodes on the path to its key, O(log32 n) of them, and
+shares the rest with the map it came from.
+
+Keys are compared as equal? compares them.  A key must not be mutated
+while it is in a map.
+"""
+
+import datatypes
+import equality
+import interpreter
+
+# The number of hash bits each level of the trie consumes.
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = 0xffffffff
+
+
+def _hash(key):
+    return equality.equal_hash(key) & _HASH_MASK
+
+
+def _bit(key_hash, shift):
+    return 1 << ((key_hash >> shift) & _MASK)
+
+
+def _index(bitmap, bit):
+    """Find a branch's place in a node's array, by counting lower bits."""
+    return bin(bitmap & (bit - 1)).count('1')
+
+
+class _Leaf(object):
+    """An entry of a map."""
+    __slots__ = ('key_hash', 'key', 'value')
+
+    def __init__(self, key_hash, key, value):
+        self.key_hash = key_hash
+        self.key = key
+        self.value = value
+
+    def matches(self, key_hash, key):
+        return self.key_hash == key_hash and equality.equal(self.key, key)
+
+
+class _BitmapNode(object):
+    """A node, with a bit set in its bitmap for each branch it has.
+
+    Its array holds the branches, in order, each either a _Leaf or a
+    node.
+    """
+    __slots__ = ('bitmap', 'array')
+
+    def __init__(self, bitmap, array):
+        self.bitmap = bitmap
+        self.array = array
+
+    def find(self, shift, key_hash, key):
+        bit = _bit(key_hash, shift)
+        if not self.bitmap & bit:
+            return None
+        child = self.array[_index(self.bitmap, bit)]
+        if isinstance(child, _Leaf):
+            return child if child.matches(key_hash, key) else None
+        return child.find(shift + _BITS, key_hash, key)
+
+    def assoc(self, shift, leaf):
+        """Get a node with a leaf added.  Returns (node, whether added)."""
+        bit = _bit(leaf.key_hash, shift)
+        index = _index(self.bitmap, bit)
+        if not self.bitmap & bit:
+            return (_BitmapNode(self.bitmap | bit, self.array[:index] +
+                                (leaf,) + self.array[index:]), True)
+        child = self.array[index]
+        if isinstance(child, _Leaf):
+            if child.matches(leaf.key_hash, leaf.key):
+                if child.value is leaf.value:
+                    return self, False
+                new_child, added = leaf, False
+            else:
+                new_child, added = _merge(shift + _BITS, child, leaf), True
+        else:
+            new_child, added = child.assoc(shift + _BITS, leaf)
+            if new_child is child:
+                return self, False
+        return self._replace(index, new_child), added
+
+    def dissoc(self, shift, key_hash, key):
+        """Get this node without a key.
+
+        Returns the node itself if the key is missing, or None if no
+        branches are left.  A node left with a lone leaf is replaced by
+        the leaf, so that a map's shape depends only on its keys.
+        """
+        bit = _bit(key_hash, shift)
+        if not self.bitmap & bit:
+            return self
+        index = _index(self.bitmap, bit)
+        child = self.array[index]
+        if isinstance(child, _Leaf):
+            if not child.matches(key_hash, key):
+                return self
+            new_child = None
+        else:
+            new_child = child.dissoc(shift + _BITS, key_hash, key)
+            if new_child is child:
+                return self
+        if new_child is not None:
+            if len(self.array) == 1 and isinstance(new_child, _Leaf):
+                return new_child
+            return self._replace(index, new_child)
+        array = self.array[:index] + self.array[index + 1:]
+        if not array:
+            return None
+        if len(array) == 1 and isinstance(array[0], _Leaf):
+            return array[0]
+        return _BitmapNode(self.bitmap ^ bit, array)
+
+    def _replace(self, index, child):
+        return _BitmapNode(self.bitmap, self.array[:index] + (child,) +
+                           self.array[index + 1:])
+
+
+class _CollisionNode(object):
+    """A node for leaves whose keys have the same full hash."""
+    __slots__ = ('key_hash', 'array')
+
+    def __init__(self, key_hash, array):
+        self.key_hash = key_hash
+        self.array = array
+
+    def find(self, shift, key_hash, key):
+        for leaf in self.array:
+            if leaf.matches(key_hash, key):
+                return leaf
+        return None
+
+    def assoc(self, shift, leaf):
+        if leaf.key_hash != self.key_hash:
+            # Branch off, above this node.
+            node = _BitmapNode(_bit(self.key_hash, shift), (self,))
+            return node.assoc(shift, leaf)
+        for index, old in enumerate(self.array):
+            if old.matches(leaf.key_hash, leaf.key):
+                if old.value is leaf.value:
+                    return self, False
+                return (_CollisionNode(self.key_hash, self.array[:index] +
+                                       (leaf,) + self.array[index + 1:]),
+                        False)
+        return _CollisionNode(self.key_hash, self.array + (leaf,)), True
+
+    def dissoc(self, shift, key_hash, key):
+        for index, leaf in enumerate(self.array):
+            if leaf.matches(key_hash, key):
+                array = self.array[:index] + self.array[index + 1:]
+                if len(array) == 1:
+                    return array[0]
+                return _CollisionNode(self.key_hash, array)
+        return self
+
+
+def _merge(shift, first, second):
+    """Make a node holding two leaves with different keys."""
+    if first.key_hash == second.key_hash:
+        return _CollisionNode(first.key_hash, (first, second))
+    first_bit = _bit(first.key_hash, shift)
+    second_bit = _bit(second.key_hash, shift)
+    if first_bit == second_bit:
+        return _BitmapNode(first_bit, (_merge(shift + _BITS, first, second),))
+    array = (first, second) if first_bit < second_bit else (second, first)
+    return _BitmapNode(first_bit | second_bit, array)
+
+
+def _leaves(node):
+    """Yield the leaves under a node, using an explicit stack."""
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, _Leaf):
+            yield node
+        else:
+            pending.extend(reversed(node.array))
+
+
+class PMap(datatypes.DataType):
+    """An immutable map from keys to values."""
+    __slots__ = ('_root', '_count')
+
+    def __init__(self, root=None, count=0):
+        self._root = root
+        self._count = count
+
+    def get(self, key, default):
+        if self._root is None:
+            return default
+        leaf = self._root.find(0, _hash(key), key)
+        return default if leaf is None else leaf.value
+
+    def __contains__(self, key):
+        return (self._root is not None and
+                self._root.find(0, _hash(key), key) is not None)
+
+    def assoc(self, key, value):
+        """Get a map with a key bound to a value."""
+        leaf = _Leaf(_hash(key), key, value)
+        if self._root is None:
+            return PMap(_BitmapNode(_bit(leaf.key_hash, 0), (leaf,)), 1)
+        root, added = self._root.assoc(0, leaf)
+        if root is self._root:
+            return self
+        return PMap(root, self._count + 1 if added else self._count)
+
+    def dissoc(self, key):
+        """Get a map without a key."""
+        if self._root is None:
+            return self
+        key_hash = _hash(key)
+        root = self._root.dissoc(0, key_hash, key)
+        if root is self._root:
+            return self
+        if isinstance(root, _Leaf):
+            root = _BitmapNode(_bit(root.key_hash, 0), (root,))
+        return PMap(root, self._count - 1)
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        """Iterate over (key, value) pairs."""
+        if self._root is None:
+            return
+        for leaf in _leaves(self._root):
+            yield leaf.key, leaf.value
+
+    def __repr__(self):
+        return '#<pmap %d>' % self._count
+
+    def __reduce__(self):
+        # Hashes of Symbols are their addresses, so the trie is rebuilt.
+        # Maps that shared structure no longer do, once unpickled.
+        return (_from_items, (list(self.items()),))
+
+
+def _from_items(items):
+    result = empty
+    for key, value in items:
+        result = result.assoc(key, value)
+    return result
+
+empty = PMap()
+
+
+def _assert_pmap(candidate):
+    assert isinstance(candidate, PMap)
+    return candidate
+
+
+# Builtins.
+def make_pmap(*keys_and_values):
+    """Make a map from alternating keys and values."""
+    if len(keys_and_values) % 2:
+        raise ValueError('pmap needs a value for each key.')
+    return _from_items(zip(keys_and_values[::2], keys_and_values[1::2]))
+
+
+def pmap_get(pmap, key, *default):
+    """Look up a key, returning the default if it is missing."""
+    pmap = _assert_pmap(pmap)
+    if default:
+        default, = default
+        return pmap.get(key, default)
+    if key not in pmap:
+        raise KeyError('No pmap entry for %s.' % (key,))
+    return pmap.get(key, None)
+
+
+def pmap_assoc(pmap, key, value):
+    return _assert_pmap(pmap).assoc(key, value)
+
+
+def pmap_dissoc(pmap, key):
+    return _assert_pmap(pmap).dissoc(key)
+
+
+def pmap_has_key(pmap, key):
+    return datatypes.lisp_bool(key in _assert_pmap(pmap))
+
+
+def pmap_count(pmap):
+    return len(_assert_pmap(pmap))
+
+
+def pmap_fold(function, initial, pmap):
+    """Fold over the entries, calling (function key value result)."""
+    result = initial
+    for key, value in _assert_pmap(pmap).items():
+        result = interpreter.apply(function, [key, value, result])
+    return result
+
+
+def pmap_to_list(pmap):
+    """Get a map's entries, as an association list."""
+    return datatypes.make_list(datatypes.Pair(key, value)
+                               for key, value in _assert_pmap(pmap).items())
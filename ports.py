@@ -0,0 +1,317 @@
+"""Ports, for reading and writing files, and lazy Streams of their lines.
+
+Input ports read through a buffer, a chunk at a time, so a file of any
+size can be read in constant memory, a line or a character at a time.
+(file-lines path) gives a Stream of a file's lines, which fold and the
+stream builtins consume as they go, so that pipelines over huge files
+never hold more than a line of them.
+
+Output ports buffer what is written, and write it out a chunk at a time.
+Without a port, write, display and newline go to standard output.
+
+(read port) reads the next datum written in a port's text, as the reader
+module makes it, and (file-data path) gives a Stream of the data in a
+file, so a large data file can be processed a record at a time, never
+evaluating it as code.  (load-data path) gives a list of them all.
+
+String ports read from a string, or collect what is written into one.
+An output string port is a string builder: it appends to a growing
+buffer, in amortized constant time, so building a long string a piece at
+a time takes linear time.
+"""
+
+import gc
+import io
+import sys
+
+import datatypes
+import formatter
+import interpreter
+import reader
+
+# The size of the buffers of file ports, in bytes.
+CHUNK_SIZE = 1 << 16
+
+
+class _Eof(datatypes.DataType):
+    """The object reads return at the end of a file."""
+    def __repr__(self):
+        return '#<eof>'
+
+    def __reduce__(self):
+        # Unpickle to the singleton.
+        return 'eof'
+
+eof = _Eof()
+
+
+class InputPort(datatypes.DataType):
+    """A port to read from.
+
+    It reads from a binary file object, which a name describes.
+    """
+    def __init__(self, source_file, name):
+        self.name = name
+        self._file = source_file
+        # The data read from the file, once read is first used.
+        self._data = None
+
+    def read_line(self):
+        """Read a String up to the end of the line, or eof."""
+        line = self._file.readline()
+        if not line:
+            return eof
+        if line.endswith('\n'):
+            line = line[:-2] if line.endswith('\r\n') else line[:-1]
+        return datatypes.String(line)
+
+    def read_char(self):
+        """Read a Char, or eof."""
+        char = self._file.read(1)
+        if not char:
+            return eof
+        return datatypes.Char(char)
+
+    def read_datum(self):
+        """Read the datum of the next expression, or eof.
+
+        The file is read a line at a time, so a line read_datum has
+        started on is lost to read_line and read_char.
+        """
+        if self._data is None:
+            self._data = reader.read_data(self._file)
+        return next(self._data, eof)
+
+    def close(self):
+        self._file.close()
+
+    def __repr__(self):
+        return '#<input-port %s>' % self.name
+
+
+class OutputPort(datatypes.DataType):
+    """A port to write to.
+
+    It writes to a binary file object, which a name describes.
+    """
+    def __init__(self, target_file, name):
+        self.name = name
+        self._file = target_file
+
+    def write(self, text):
+        self._file.write(text)
+
+    def contents(self):
+        """Get what was written to a string port, as a String."""
+        assert isinstance(self._file, io.BytesIO)
+        return datatypes.String(self._file.getvalue())
+
+    def close(self):
+        self._file.close()
+
+    def __repr__(self):
+        return '#<output-port %s>' % self.name
+
+
+class Stream(datatypes.DataType):
+    """A lazy sequence, whose elements are made as they are taken.
+
+    A Stream can be consumed only once.
+    """
+    def __init__(self, elements):
+        self._elements = iter(elements)
+
+    def __iter__(self):
+        return self._elements
+
+    def __repr__(self):
+        return '#<stream>'
+
+
+def elements(sequence):
+    """Iterate over a Stream, or the elements of a proper list."""
+    if isinstance(sequence, Stream):
+        return iter(sequence)
+    return datatypes.iter_list(sequence)
+
+
+def _path(path):
+    assert isinstance(path, datatypes.String)
+    return path.value
+
+
+def _assert_input_port(candidate):
+    assert isinstance(candidate, InputPort)
+    return candidate
+
+
+def _output(port, text):
+    """Write text to an output port, or to standard output."""
+    if port is None:
+        sys.stdout.write(text)
+    else:
+        assert isinstance(port, OutputPort)
+        port.write(text)
+
+
+def _data(port):
+    """Yield the data of an input port, closing it at the end."""
+    try:
+        while True:
+            datum = port.read_datum()
+            if datum is eof:
+                return
+            yield datum
+    finally:
+        port.close()
+
+
+def _lines(port):
+    """Yield the lines of an input port, closing it at the end."""
+    try:
+        while True:
+            line = port.read_line()
+            if line is eof:
+                return
+            yield line
+    finally:
+        port.close()
+
+
+# Builtins.
+def open_input_file(path):
+    path = _path(path)
+    return InputPort(io.open(path, 'rb', buffering=CHUNK_SIZE), path)
+
+
+def open_output_file(path):
+    path = _path(path)
+    return OutputPort(io.open(path, 'wb', buffering=CHUNK_SIZE), path)
+
+
+def open_input_string(string):
+    assert isinstance(string, datatypes.String)
+    return InputPort(io.BytesIO(string.value), 'string')
+
+
+def open_output_string():
+    return OutputPort(io.BytesIO(), 'string')
+
+
+def get_output_string(port):
+    assert isinstance(port, OutputPort)
+    return port.contents()
+
+
+def close_port(port):
+    assert isinstance(port, (InputPort, OutputPort))
+    port.close()
+
+
+def read_line(port):
+    return _assert_input_port(port).read_line()
+
+
+def read_char(port):
+    return _assert_input_port(port).read_char()
+
+
+def read(port=None):
+    """Read a datum from an input port, or from standard input."""
+    if port is None:
+        port = _standard_input()
+    return _assert_input_port(port).read_datum()
+
+
+# The port for standard input, made when first needed.
+_stdin_port = None
+
+def _standard_input():
+    global _stdin_port
+    if _stdin_port is None:
+        _stdin_port = InputPort(sys.stdin, 'stdin')
+    return _stdin_port
+
+
+def is_eof(value):
+    return datatypes.lisp_bool(value is eof)
+
+
+def write(value, port=None):
+    """Write a value as it would appear in code."""
+    _output(port, formatter.lisp_format(value))
+
+
+def display(value, port=None):
+    """Write a value, with strings and characters as their raw text."""
+    _output(port, formatter.lisp_display(value))
+
+
+def newline(port=None):
+    _output(port, '\n')
+
+
+def call_with_input_file(path, function):
+    """Call a function with an input port, then close the port."""
+    port = open_input_file(path)
+    try:
+        return interpreter.apply(function, [port])
+    finally:
+        port.close()
+
+
+def call_with_output_file(path, function):
+    """Call a function with an output port, then close the port."""
+    port = open_output_file(path)
+    try:
+        return interpreter.apply(function, [port])
+    finally:
+        port.close()
+
+
+def file_lines(path):
+    """Make a Stream of the lines of a file."""
+    return Stream(_lines(open_input_file(path)))
+
+
+def file_data(path):
+    """Make a Stream of the data in a file, read as they are taken."""
+    return Stream(_data(open_input_file(path)))
+
+
+def load_data(path):
+    """Read all the data in a file, into a list.
+
+    Each datum's Pair is linked onto the end of the list as it is read,
+    so the data are never gathered in a Python list first.
+    """
+    # The data hold no reference cycles, so the cycle collector would
+    # only scan the growing data over and over.
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        # The list's first Pair will be the cdr of this header.
+        header = last = datatypes.Pair(None, datatypes.null)
+        for datum in _data(open_input_file(path)):
+            pair = datatypes.Pair(datum, datatypes.null)
+            last.cdr = pair
+            last = pair
+        return header.cdr
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def stream_map(function, stream):
+    return Stream(interpreter.apply(function, [element])
+                  for element in elements(stream))
+
+
+def stream_filter(predicate, stream):
+    return Stream(element for element in elements(stream)
+                  if interpreter._is_truthy(
+                      interpreter.apply(predicate, [element])))
+
+
+def stream_to_list(stream):
+    return datatypes.make_list(elements(stream))
@@ -0,0 +1,218 @@
+"""Profiles Lisp programs: call counts and times for each function.
+
+Profiling works by temporarily replacing the functions through which the
+'walk' and 'analyze' engines apply functions and resolve _DelayedCalls
+with instrumented versions.  That includes interpreter.apply, through
+which builtins like map call Lisp functions under the 'walk' engine.  When no Profiler is enabled, the originals
+are in place, so profiling costs nothing.
+
+For each LispFunction (reported by its defined name) and builtin, we
+count calls, separating tail calls from non-tail calls, and measure
+inclusive time and self time.  A tail call ends the calling function's
+activation, and starts the callee's in its place.
+"""
+
+import time
+
+import analyzer
+import datatypes
+import interpreter
+import pyfuncs
+
+PROFILED_ENGINES = ('walk', 'analyze')
+
+
+def _run_walk_body(call):
+    """Evaluate the body of a _DelayedCall's function, as 'walk' does."""
+    return interpreter._eval_begin(call.function.exprs, call.invocation_env)
+
+
+class _Stats(object):
+    """The statistics for one function."""
+    def __init__(self):
+        self.calls = 0
+        self.tail_calls = 0
+        self.inclusive_time = 0.0
+        self.self_time = 0.0
+        # How many activations of the function are on the stack.  Only
+        # the outermost one adds to inclusive_time.
+        self.active = 0
+
+
+class Profiler(object):
+    """Collects statistics about function calls while enabled."""
+    def __init__(self):
+        self.stats = {}
+        # Collapsed stacks: a tuple of names, outermost first, maps to
+        # the self time spent with exactly that stack.
+        self.stacks = {}
+        # The activations in progress, as [name, start time, time spent
+        # in callees] lists.
+        self._activations = []
+        self._originals = None
+        self._builtin_names = dict(
+            (id(function), name)
+            for name, function in pyfuncs.functions.items())
+
+    def enable(self):
+        """Install the instrumented functions."""
+        assert self._originals is None
+        self._originals = (interpreter._eval, interpreter._apply,
+                           interpreter.apply, analyzer._force,
+                           analyzer._apply)
+        interpreter._eval = self._make_walk_eval()
+        interpreter._apply = self._make_walk_apply(interpreter._apply)
+        interpreter.apply = self._make_callback_apply(interpreter.apply)
+        analyzer._force = self._make_analyze_force()
+        analyzer._apply = self._make_analyze_apply(analyzer._apply)
+
+    def disable(self):
+        """Restore the original functions."""
+        (interpreter._eval, interpreter._apply, interpreter.apply,
+         analyzer._force, analyzer._apply) = self._originals
+        self._originals = None
+
+    def _enter(self, name, tail=False):
+        """Record the start of an activation."""
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = _Stats()
+        if tail:
+            stats.tail_calls += 1
+        else:
+            stats.calls += 1
+        stats.active += 1
+        self._activations.append([name, time.time(), 0.0])
+
+    def _exit(self):
+        """Record the end of the innermost activation."""
+        name, start, callee_time = self._activations.pop()
+        elapsed = time.time() - start
+        stats = self.stats[name]
+        stats.active -= 1
+        if not stats.active:
+            stats.inclusive_time += elapsed
+        stats.self_time += elapsed - callee_time
+        stack = tuple(activation[0] for activation in self._activations)
+        stack += (name,)
+        self.stacks[stack] = (self.stacks.get(stack, 0.0) +
+                              elapsed - callee_time)
+        if self._activations:
+            self._activations[-1][2] += elapsed
+
+    def _tail_call(self, name):
+        """Replace the innermost activation with a tail call's."""
+        self._exit()
+        self._enter(name, tail=True)
+
+    def _resolve(self, value, run_body):
+        """Force a _DelayedCall, recording each call it makes.
+
+        The first call is the one whose value was delayed.  Each further
+        one is a tail call made by the previous function's body.
+        """
+        self._enter(self._function_name(value.function))
+        try:
+            while True:
+                value = run_body(value)
+                if not isinstance(value, interpreter._DelayedCall):
+                    return value
+                self._tail_call(self._function_name(value.function))
+        finally:
+            self._exit()
+
+    def _time_builtin(self, function, inputs):
+        """Call a builtin, recording the call."""
+        self._enter(self._function_name(function))
+        try:
+            return function(*inputs)
+        finally:
+            self._exit()
+
+    def _make_walk_eval(self):
+        """Instrument interpreter._eval."""
+        run_body = _run_walk_body
+
+        def profiled_eval(expr, env, force=True):
+            value = interpreter._eval_no_force(expr, env)
+            if force and isinstance(value, interpreter._DelayedCall):
+                value = self._resolve(value, run_body)
+            return value
+        return profiled_eval
+
+    def _make_walk_apply(self, original_apply):
+        """Instrument interpreter._apply."""
+        def profiled_apply(function, lisp_args, env):
+            if isinstance(function, datatypes.LispFunction):
+                return original_apply(function, lisp_args, env)
+            inputs = [interpreter._eval(arg, env) for arg in lisp_args]
+            return self._time_builtin(function, inputs)
+        return profiled_apply
+
+    def _make_callback_apply(self, original_apply):
+        """Instrument interpreter.apply, for the walk engine.
+
+        The analyze engine's calls go through analyzer._apply, which is
+        instrumented already.
+        """
+        def profiled_apply(function, inputs):
+            if interpreter._engine != 'walk':
+                return original_apply(function, inputs)
+            if not isinstance(function, datatypes.LispFunction):
+                return self._time_builtin(function, inputs)
+            call = interpreter._DelayedCall(
+                function, interpreter._invocation_frame(function, inputs))
+            return self._resolve(call, _run_walk_body)
+        return profiled_apply
+
+    def _make_analyze_force(self):
+        """Instrument analyzer._force."""
+        def run_body(call):
+            body = analyzer._function_body(call.function)
+            return body(call.invocation_env)
+
+        def profiled_force(value):
+            if isinstance(value, interpreter._DelayedCall):
+                value = self._resolve(value, run_body)
+            return value
+        return profiled_force
+
+    def _make_analyze_apply(self, original_apply):
+        """Instrument analyzer._apply."""
+        def profiled_apply(function, inputs, tail):
+            if isinstance(function, datatypes.LispFunction):
+                return original_apply(function, inputs, tail)
+            return self._time_builtin(function, inputs)
+        return profiled_apply
+
+    def _function_name(self, function):
+        """Get a name to report a function by."""
+        if isinstance(function, datatypes.LispFunction):
+            return function.name or '<lambda>'
+        name = self._builtin_names.get(id(function))
+        if name is None:
+            name = getattr(function, '__name__', repr(function))
+        return name
+
+    def report(self, sort_by='self_time'):
+        """Format a table of statistics, sorted with the largest first."""
+        lines = ['%-30s %10s %10s %14s %12s' % (
+            'function', 'calls', 'tail calls', 'inclusive (s)', 'self (s)')]
+        ordered = sorted(self.stats.items(),
+                         key=lambda item: getattr(item[1], sort_by),
+                         reverse=True)
+        for name, stats in ordered:
+            lines.append('%-30s %10d %10d %14.6f %12.6f' % (
+                name, stats.calls, stats.tail_calls, stats.inclusive_time,
+                stats.self_time))
+        return '\n'.join(lines)
+
+    def write_collapsed(self, output_file):
+        """Write collapsed stacks, for flame graph tools.
+
+        Each line is a semicolon-separated stack, outermost first, and the
+        microseconds of self time spent in it.
+        """
+        for stack, seconds in sorted(self.stacks.items()):
+            output_file.write('%s %d\n' % (';'.join(stack),
+                                           int(seconds * 1e6)))
@@ -1,11 +1,21 @@
 """Base functions to be called on Lisp data, implemented in Python."""
 
+import itertools
 import operator
 
 import datatypes
+import equality
+import hashtable
+import interpreter
+import memo
+import parallel
+import pmap
+import ports
+import tasks
+import typedvector
 
 def _add(*args):
-    return sum(args)
+    return datatypes.exact(sum(args))
 
 def _sub(first, *rest):
     # Single-argument _sub is additive inversion.
@@ -13,24 +23,35 @@ def _sub(first, *rest):
     if not rest:
         return -first
 
-    return first - sum(rest)
+    return datatypes.exact(first - sum(rest))
 
 def _mul(*args):
-    return reduce(operator.mul, args, 1)
+    return datatypes.exact(reduce(operator.mul, args, 1))
 
 def _div(numerator, *denominators):
-    # TODO(jasonpr): Use fractions, not floating point?
-
     # Single-argument _div is multiplicative inversion.
     # For example, (/ 5) is 1/5.
     if not denominators:
-        return 1 / numerator
+        return _divide(1, numerator)
 
     result = numerator
     for denom in denominators:
-        result /= denom
+        result = _divide(result, denom)
     return result
 
+def _divide(numerator, denominator):
+    """Divide two numbers, exactly unless either is inexact."""
+    if isinstance(numerator, float) or isinstance(denominator, float):
+        # Inexact in, inexact out, as with the other arithmetic.
+        return float(numerator) / denominator
+    if (type(numerator) in datatypes.INTEGER_TYPES and
+        type(denominator) in datatypes.INTEGER_TYPES):
+        # Stay with integers when the division is exact.
+        if numerator % denominator == 0:
+            return numerator // denominator
+        return datatypes.Fraction(numerator, denominator)
+    return datatypes.exact(datatypes.Fraction(numerator) / denominator)
+
 def _car(pair):
     assert isinstance(pair, datatypes.Pair)
     return pair.car
@@ -43,11 +64,121 @@ def _cons(car, cdr):
     return datatypes.Pair(car, cdr)
 
 def _list(*elements):
+    return datatypes.make_list(elements)
+
+# The list functions below loop down lists, rather than recursing, so
+# they handle lists of any length in linear time.
+def _length(lisp_list):
+    count = 0
+    for _ in datatypes.iter_list(lisp_list):
+        count += 1
+    return count
+
+def _append(*lists):
+    if not lists:
+        return datatypes.null
+    # The last list is shared, not copied, as in Scheme.
+    result = lists[-1]
+    for lisp_list in reversed(lists[:-1]):
+        result = datatypes.make_list(datatypes.iter_list(lisp_list), result)
+    return result
+
+def _reverse(lisp_list):
     result = datatypes.null
-    for element in reversed(elements):
-        result = _cons(element, result)
+    for element in datatypes.iter_list(lisp_list):
+        result = datatypes.Pair(element, result)
     return result
 
+def _map(function, *lists):
+    # Like SRFI 1's map, stop at the end of the shortest list.
+    assert lists
+    iterators = [datatypes.iter_list(lisp_list) for lisp_list in lists]
+    return datatypes.make_list([interpreter.apply(function, inputs)
+                                for inputs in itertools.izip(*iterators)])
+
+def _filter(predicate, lisp_list):
+    return datatypes.make_list(
+        [element for element in datatypes.iter_list(lisp_list)
+         if interpreter._is_truthy(interpreter.apply(predicate, [element]))])
+
+def _fold(function, initial, sequence):
+    # As in SRFI 1, (fold f init (list a b)) is (f b (f a init)).  Folding
+    # over a Stream consumes it as it goes.
+    result = initial
+    for element in ports.elements(sequence):
+        result = interpreter.apply(function, [element, result])
+    return result
+
+def _list_ref(lisp_list, num):
+    num = datatypes.assert_int(num)
+    if num >= 0:
+        for index, element in enumerate(datatypes.iter_list(lisp_list)):
+            if index == num:
+                return element
+    raise IndexError('Index %s out of range.' % num)
+
+def _associator(matches):
+    """Make a builtin that finds the first pair in an alist whose car
+    matches a key, or returns #f."""
+    def associate(key, alist):
+        for pair in datatypes.iter_list(alist):
+            assert isinstance(pair, datatypes.Pair)
+            if matches(key, pair.car):
+                return pair
+        return datatypes.lisp_bool(False)
+    return associate
+
+# Strings are immutable, so they are shared freely, never copied.
+def _string_value(candidate):
+    assert isinstance(candidate, datatypes.String)
+    return candidate.value
+
+def _string_append(*strings):
+    return datatypes.String(''.join(_string_value(string)
+                                    for string in strings))
+
+def _substring(string, start, end=None):
+    text = _string_value(string)
+    start = datatypes.assert_int(start)
+    end = len(text) if end is None else datatypes.assert_int(end)
+    if not 0 <= start <= end <= len(text):
+        raise IndexError('Substring from %s to %s out of range.' %
+                         (start, end))
+    if end - start == len(text):
+        return string
+    return datatypes.String(text[start:end])
+
+def _string_ref(string, num):
+    return datatypes.Char(_string_value(string)[datatypes.assert_int(num)])
+
+def _string_split(string, separator=None):
+    # Without a separator, split on runs of whitespace.
+    if separator is not None:
+        assert isinstance(separator, (datatypes.String, datatypes.Char))
+        separator = separator.value
+    return datatypes.make_list(
+        datatypes.String(part)
+        for part in _string_value(string).split(separator))
+
+def _string_equal(first, *rest):
+    text = _string_value(first)
+    return datatypes.lisp_bool(all(_string_value(string) == text
+                                   for string in rest))
+
+def _number_to_string(number):
+    assert equality.is_number(number)
+    return datatypes.String('%s' % number)
+
+def _string_to_number(string):
+    try:
+        return datatypes.exact(datatypes.Fraction(_string_value(string)))
+    except (ValueError, ZeroDivisionError):
+        return datatypes.lisp_bool(False)
+
+def _symbol_to_string(symbol):
+    assert isinstance(symbol, datatypes.Symbol)
+    return datatypes.String(symbol.value)
+
 def _gt(left, right):
     return datatypes.lisp_bool(left > right)
 
@@ -65,25 +196,35 @@ def _print(*args):
         print arg
 
 def _is_vector(candidate):
-    return datatypes.lisp_bool(isinstance(candidate, datatypes.Vector))
+    return datatypes.lisp_bool(typedvector.is_vector(candidate))
 
 # TODO(jasonpr): Figure out a good way to get rid of these
 # intermediate functions that check the type and call a method.
 def _vector_length(vector):
-    assert isinstance(vector, datatypes.Vector)
-    return datatypes.Fraction(vector.length())
+    return typedvector.assert_vector(vector).length()
 
 def _vector_ref(vector, num):
-    assert isinstance(vector, datatypes.Vector)
-    return vector.get(num)
+    return typedvector.assert_vector(vector).get(num)
 
 def _vector_set(vector, num, value):
-    assert isinstance(vector, datatypes.Vector)
-    vector.set(num, value)
+    typedvector.assert_vector(vector).set(num, value)
 
 def _vector_fill(vector, fill_value):
-    assert isinstance(vector, datatypes.Vector)
-    vector.fill(fill_value)
+    typedvector.assert_vector(vector).fill(fill_value)
+
+def _is_typed_vector(element_type):
+    def is_typed_vector(candidate):
+        return datatypes.lisp_bool(
+            isinstance(candidate, typedvector.TypedVector) and
+            candidate.element_type is element_type)
+    return is_typed_vector
+
+def _vector_slice(vector, start, stop):
+    assert isinstance(vector, typedvector.TypedVector)
+    return vector.slice(start, stop)
+
+def _vector_map(function, vector):
+    return typedvector.vector_map(interpreter.apply, function, vector)
 
 functions = {
     '+': _add,
@@ -91,9 +232,38 @@ functions = {
     '*': _mul,
     '/': _div,
     'list': _list,
+    'length': _length,
+    'append': _append,
+    'reverse': _reverse,
+    'map': _map,
+    'filter': _filter,
+    'fold': _fold,
+    'list-ref': _list_ref,
+    'assq': _associator(lambda left, right: left is right),
+    'assv': _associator(equality.eqv),
+    'assoc': _associator(equality.equal),
     'cons': _cons,
     'car': _car,
     'cdr': _cdr,
+    'string?': lambda candidate: datatypes.lisp_bool(
+        isinstance(candidate, datatypes.String)),
+    'char?': lambda candidate: datatypes.lisp_bool(
+        isinstance(candidate, datatypes.Char)),
+    'string-length': lambda string: len(_string_value(string)),
+    'string-ref': _string_ref,
+    'substring': _substring,
+    'string-append': _string_append,
+    'string-split': _string_split,
+    'string=?': _string_equal,
+    'string->symbol': lambda string: datatypes.Symbol(_string_value(string)),
+    'symbol->string': _symbol_to_string,
+    'number->string': _number_to_string,
+    'string->number': _string_to_number,
+    'eq?': lambda left, right: datatypes.lisp_bool(left is right),
+    'eqv?': lambda left, right: datatypes.lisp_bool(
+        equality.eqv(left, right)),
+    'equal?': lambda left, right: datatypes.lisp_bool(
+        equality.equal(left, right)),
     '>': _gt,
     '<': _lt,
     '>=': _ge,
@@ -106,4 +276,85 @@ functions = {
     'vector-ref': _vector_ref,
     'vector-set!': _vector_set,
     'vector-fill!': _vector_fill,
+    'list->vector': datatypes.Vector.from_list,
+    'vector->list': lambda vector: typedvector.assert_vector(vector).as_list(),
+    'f64vector': lambda *contents: typedvector.TypedVector.from_values(
+        typedvector.FLOAT64, contents),
+    's64vector': lambda *contents: typedvector.TypedVector.from_values(
+        typedvector.INT64, contents),
+    'make-f64vector': lambda *args: typedvector.TypedVector.make(
+        typedvector.FLOAT64, *args),
+    'make-s64vector': lambda *args: typedvector.TypedVector.make(
+        typedvector.INT64, *args),
+    'f64vector?': _is_typed_vector(typedvector.FLOAT64),
+    's64vector?': _is_typed_vector(typedvector.INT64),
+    'vector->f64vector': lambda vector: typedvector.to_typed(
+        typedvector.FLOAT64, vector),
+    'vector->s64vector': lambda vector: typedvector.to_typed(
+        typedvector.INT64, vector),
+    'typed-vector->vector': typedvector.to_vector,
+    'vector-slice': _vector_slice,
+    'vector-map': _vector_map,
+    'vector-sum': typedvector.vector_sum,
+    'vector-dot': typedvector.vector_dot,
+    'vector+': lambda left, right: typedvector.elementwise(
+        operator.add, left, right),
+    'vector*': lambda left, right: typedvector.elementwise(
+        operator.mul, left, right),
+    'parallel-map': parallel.parallel_map,
+    'spawn': tasks.spawn,
+    'channel': tasks.make_channel,
+    'send!': tasks.send,
+    'recv': tasks.recv,
+    'join': tasks.join,
+    'sleep': tasks.sleep,
+    'yield': tasks.yield_,
+    'memoize': memo.memoize,
+    'memo-stats': memo.memo_stats,
+    'memo-clear!': memo.memo_clear,
+    'open-input-file': ports.open_input_file,
+    'open-output-file': ports.open_output_file,
+    'open-input-string': ports.open_input_string,
+    'open-output-string': ports.open_output_string,
+    'get-output-string': ports.get_output_string,
+    'close-port': ports.close_port,
+    'close-input-port': ports.close_port,
+    'close-output-port': ports.close_port,
+    'read-line': ports.read_line,
+    'read-char': ports.read_char,
+    'read': ports.read,
+    'eof-object?': ports.is_eof,
+    'write': ports.write,
+    'display': ports.display,
+    'newline': ports.newline,
+    'call-with-input-file': ports.call_with_input_file,
+    'call-with-output-file': ports.call_with_output_file,
+    'file-lines': ports.file_lines,
+    'file-data': ports.file_data,
+    'load-data': ports.load_data,
+    'stream-map': ports.stream_map,
+    'stream-filter': ports.stream_filter,
+    'stream->list': ports.stream_to_list,
+    'make-hash-table': hashtable.make_hash_table,
+    'hash-table?': lambda candidate: datatypes.lisp_bool(
+        isinstance(candidate, hashtable.HashTable)),
+    'hash-ref': hashtable.hash_ref,
+    'hash-set!': hashtable.hash_set,
+    'hash-delete!': hashtable.hash_delete,
+    'hash-has-key?': hashtable.hash_has_key,
+    'hash-count': hashtable.hash_count,
+    'hash-keys': hashtable.hash_keys,
+    'hash-values': hashtable.hash_values,
+    'hash->list': hashtable.hash_to_list,
+    'hash-for-each': hashtable.hash_for_each,
+    'pmap': pmap.make_pmap,
+    'pmap?': lambda candidate: datatypes.lisp_bool(
+        isinstance(candidate, pmap.PMap)),
+    'pmap-get': pmap.pmap_get,
+    'pmap-assoc': pmap.pmap_assoc,
+    'pmap-dissoc': pmap.pmap_dissoc,
+    'pmap-has-key?': pmap.pmap_has_key,
+    'pmap-count': pmap.pmap_count,
+    'pmap-fold': pmap.pmap_fold,
+    'pmap->list': pmap.pmap_to_list,
 }
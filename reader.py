@@ -0,0 +1,147 @@
+"""Reads s-expression text straight into the Lisp data it denotes.
+
+The parser makes trees for the engines to evaluate; the reader makes
+data, just as if the text had been quoted: identifiers become interned
+Symbols, lists become chains of Pairs, #( ) becomes a Vector, and other
+literals denote themselves.  Nothing is evaluated.
+
+Each list's Pairs are made and linked as its elements arrive, with an
+explicit stack of unfinished lists, so no Python list of elements is
+built first, and deep nesting cannot overflow the Python stack.  Data
+are yielded one top-level expression at a time, so a file of data can
+be read in constant memory.
+"""
+
+import re
+
+import datatypes
+import lexer
+import parser
+import tokens
+
+_QUOTE_SYMBOL = datatypes.Symbol('quote')
+
+
+# What the reader does with each group of lexer._master_regex, that is,
+# with each kind of token.
+_SKIP, _SYMBOL, _INTEGER, _OPEN, _CLOSE, _OPEN_VECTOR, _QUOTE, _ATOM = range(8)
+_ACTIONS = {
+    tokens.Whitespace: _SKIP,
+    tokens.Comment: _SKIP,
+    tokens.Identifier: _SYMBOL,
+    tokens.Integer: _INTEGER,
+    tokens.OpenParen: _OPEN,
+    tokens.CloseParen: _CLOSE,
+    tokens.OpenVector: _OPEN_VECTOR,
+    tokens.Quote: _QUOTE,
+}
+# The lexer's regex, after any whitespace, so that whitespace between
+# tokens costs no extra match.
+_regex = re.compile(r'\s*(?:%s)' % lexer._master_regex.pattern)
+_group_actions = (None,) + tuple(
+    _ACTIONS.get(token_type,
+                 _ATOM if token_type in parser._atom_parsers else None)
+    for token_type in lexer._token_types[1:])
+
+
+def _new_list():
+    """Start a list.
+
+    An unfinished list is a header Pair, whose cdr is the first Pair of
+    the list, and whose car is its last Pair, or the header itself while
+    the list is empty.
+    """
+    header = datatypes.Pair(None, datatypes.null)
+    header.car = header
+    return header
+
+
+def read_data(lisp_lines):
+    """Yield the datum of each top-level expression in some Lisp text.
+
+    The text is scanned as lexer.lisp_tokens scans it, but each match is
+    turned into data directly, without making a Token.
+    """
+    match = _regex.match
+    token_types, actions = lexer._token_types, _group_actions
+    Pair, Symbol, null = datatypes.Pair, datatypes.Symbol, datatypes.null
+    # Unfinished lists, as header Pairs, unfinished vectors, as Python
+    # lists of their elements, and the quote Symbol for each quotation
+    # waiting for the datum it quotes.
+    stack = []
+    unscanned = ''
+    # An unterminated string, gathering the chunks that may close it.
+    pending = None
+    for chunk in lisp_lines:
+        if pending is not None:
+            if not pending.add(chunk):
+                continue
+            text, pending = pending.text(), None
+        else:
+            text = chunk
+        position, length = 0, len(text)
+        while position < length:
+            found = match(text, position)
+            if not found:
+                break
+            position = found.end()
+            group = found.lastindex
+            action = actions[group]
+            if action == _SKIP:
+                continue
+            elif action == _SYMBOL:
+                datum = Symbol(found.group(group))
+            elif action == _INTEGER:
+                datum = int(found.group(group))
+            elif action == _OPEN:
+                stack.append(_new_list())
+                continue
+            elif action == _CLOSE:
+                if not stack or stack[-1] is _QUOTE_SYMBOL:
+                    raise ValueError('Unexpected `)`.')
+                unfinished = stack.pop()
+                if type(unfinished) is list:
+                    datum = datatypes.Vector(unfinished)
+                else:
+                    datum = unfinished.cdr
+                    # An empty list's header refers to itself.
+                    unfinished.car = None
+            elif action == _OPEN_VECTOR:
+                stack.append([])
+                continue
+            elif action == _QUOTE:
+                stack.append(_QUOTE_SYMBOL)
+                continue
+            elif action == _ATOM:
+                token_type = token_types[group]
+                datum = parser._atom_parsers[token_type](
+                    token_type(found.group(group)))
+            else:
+                raise TypeError('Unexpected token type for %s.' %
+                                token_types[group](found.group(group)))
+
+            # The datum is complete.
+            while stack and stack[-1] is _QUOTE_SYMBOL:
+                stack.pop()
+                datum = Pair(_QUOTE_SYMBOL, Pair(datum, null))
+            if not stack:
+                yield datum
+            elif type(stack[-1]) is list:
+                stack[-1].append(datum)
+            else:
+                header = stack[-1]
+                last = Pair(datum, null)
+                header.car.cdr = last
+                header.car = last
+        unscanned = text[position:]
+        # Only an unterminated string could be completed by more input.
+        if unscanned and not unscanned.startswith('"'):
+            break
+        pending = lexer._PendingString(unscanned) if unscanned else None
+
+    if pending is not None:
+        unscanned = pending.text()
+    if unscanned:
+        raise ValueError('No valid token found: "%s".' % unscanned.strip())
+    if stack:
+        raise ValueError('Unexpected end of input, in an unfinished datum.')
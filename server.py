@@ -0,0 +1,195 @@
+"""A server that runs Lisp scripts in a warm interpreter.
+
+lisp.py --serve PATH builds the base environment once, then listens on a
+Unix socket.  Each connection is handled by a forked child process,
+which starts with a copy of the warm environment, so a request pays for
+neither Python's startup nor rebuilding the base environment.  The child
+runs the script in a fresh child environment of the base, so that its
+definitions stay its own, and no request can change the base that later
+requests see.
+
+At most 'workers' requests run at once; further connections wait their
+turn.  A request that runs past its timeout is stopped, so a stuck
+script holds its worker only that long.
+
+The protocol: the client sends one line of JSON, an object with either a
+'path' to a script or the script's 'source', then the server streams
+frames back.  Each frame is a kind byte, a 4-byte big-endian length and
+that many bytes of data.  Kinds are STDOUT and STDERR, for output, and
+finally EXIT, whose data is the exit status as decimal text.
+"""
+
+import errno
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+
+# Frame kinds.
+STDOUT = 'o'
+STDERR = 'e'
+EXIT = 'x'
+
+_HEADER = struct.Struct('>cI')
+
+# How many connections may wait for a worker.
+_BACKLOG = 64
+# How often the server checks on its workers while it waits, in seconds.
+_POLL_INTERVAL = 0.05
+# How long past its timeout a request may take to stop itself, before it
+# is killed.
+_KILL_GRACE = 5
+
+
+class _Timeout(Exception):
+    """Raised in a worker when its request runs out of time."""
+
+
+class _FrameWriter(object):
+    """A file-like object that sends what is written as frames."""
+    def __init__(self, connection, kind):
+        self._connection = connection
+        self._kind = kind
+
+    def write(self, data):
+        if data:
+            send_frame(self._connection, self._kind, data)
+
+    def flush(self):
+        pass
+
+
+def send_frame(connection, kind, data):
+    """Send one frame over a socket."""
+    if isinstance(data, unicode):
+        data = data.encode('utf-8')
+    connection.sendall(_HEADER.pack(kind, len(data)) + data)
+
+
+def read_frames(connection):
+    """Yield (kind, data) pairs for the frames read from a socket."""
+    stream = connection.makefile('rb')
+    while True:
+        header = stream.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        kind, length = _HEADER.unpack(header)
+        yield kind, stream.read(length)
+
+
+def serve(socket_path, base_env, workers=4, timeout=30, use_cache=True,
+          **options):
+    """Serve requests on a Unix socket, until interrupted.
+
+    Args:
+        socket_path: Where to make the socket.  Any file already there
+            is replaced.
+        base_env: The warm base environment.
+        workers: How many requests may run at once.
+        timeout: How long a request may run, in seconds.
+        use_cache: Whether scripts given by path may use the formcache
+            module's on-disk cache of parse trees.
+        options: Keyword arguments for lisp._execute_trees.
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(_BACKLOG)
+    # Wake up now and then to stop overdue workers.
+    listener.settimeout(_POLL_INTERVAL)
+    # Maps the process id of each worker to the time it started.
+    children = {}
+    try:
+        while True:
+            _reap(children, timeout)
+            if len(children) >= workers:
+                time.sleep(_POLL_INTERVAL)
+                continue
+            try:
+                connection, _ = listener.accept()
+            except socket.timeout:
+                continue
+            pid = os.fork()
+            if pid == 0:
+                # The worker must never return to this loop.
+                status = 1
+                try:
+                    listener.close()
+                    status = _handle(connection, base_env, timeout,
+                                     use_cache, options)
+                finally:
+                    os._exit(status)
+            connection.close()
+            children[pid] = time.time()
+    finally:
+        listener.close()
+        os.unlink(socket_path)
+
+
+def _reap(children, timeout):
+    """Forget the workers that have finished, and kill overdue ones."""
+    now = time.time()
+    for pid, start in children.items():
+        if now - start > timeout + _KILL_GRACE:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError as error:
+                if error.errno != errno.ESRCH:
+                    raise
+    while children:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+        if not pid:
+            break
+        del children[pid]
+
+
+def _handle(connection, base_env, timeout, use_cache, options):
+    """In a worker process, run one request.  Returns the exit status."""
+    # Imported here, since lisp imports us, and the client only needs
+    # the protocol.
+    import lisp
+    import parallel
+    import tasks
+
+    connection.settimeout(None)
+    sys.stdout = _FrameWriter(connection, STDOUT)
+    sys.stderr = _FrameWriter(connection, STDERR)
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.alarm(timeout)
+    status = 0
+    try:
+        request = json.loads(connection.makefile('rb').readline())
+        env = base_env.child()
+        # The parser expects byte strings, not the unicode JSON gives.
+        if 'path' in request:
+            lisp._execute_path(request['path'].encode('utf-8'), env,
+                               use_cache, print_results=True, **options)
+        else:
+            source = request['source'].encode('utf-8')
+            lisp._execute_file(source.splitlines(True), env,
+                               print_results=True, **options)
+        tasks.run_until_idle()
+    except _Timeout:
+        print >> sys.stderr, 'Error: timed out after %d seconds.' % timeout
+        status = 1
+    except Exception:
+        traceback.print_exc()
+        status = 1
+    signal.alarm(0)
+    parallel.shutdown()
+    try:
+        send_frame(connection, EXIT, str(status))
+        connection.close()
+    except socket.error:
+        # The client went away.
+        pass
+    return status
+
+
+def _raise_timeout(signal_number, frame):
+    raise _Timeout()
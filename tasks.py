@@ -0,0 +1,258 @@
+"""Green threads: cooperative tasks, which communicate over channels.
+
+(spawn thunk) starts a task, which calls the thunk.  Tasks always run
+in the virtual machine (see vm.py), whatever the engine, because its
+activations live on an explicit stack that can be set aside: a task is
+suspended by saving that stack, and resumed by running it again.  A
+task gives up its turn after a time slice of function calls, when it
+yields, or when it waits-- for a message from a channel, for room in a
+full channel, for another task to finish, or for a sleep to end.
+
+Whatever wakes a waiting task hands it the value its call returns, such
+as the message it waited for.
+
+The main program is not a task.  When it waits or yields, it runs
+tasks until its wait is over.  When a script ends, tasks run until they
+have all finished or are waiting for each other.
+
+Sleeping tasks wait on a timer heap, so any number of them can sleep at
+once, without holding up the tasks that can run.
+"""
+
+import collections
+import heapq
+import itertools
+import time
+
+import bytecode
+import datatypes
+import vm
+
+# How many function calls a task may make before it yields, if another
+# task is ready to run.
+TIME_SLICE = 1000
+
+# Returned by a BlockingBuiltin's operation when its caller must wait.
+BLOCKED = object()
+
+# The tasks that are ready to run, in order.
+_runnable = collections.deque()
+# Sleeping waiters, as a heap of (wake time, sequence number, waiter).
+_sleepers = []
+_sleep_order = itertools.count()
+
+
+class Task(datatypes.DataType):
+    """A green thread."""
+    def __init__(self, thunk):
+        self.done = False
+        self.result = None
+        # Waiters for this task to finish.
+        self.joiners = collections.deque()
+        # Whether the task is waiting for something, and whether it is
+        # in the queue of tasks ready to run.
+        self.blocked = False
+        self.ready = False
+        # How many more calls the task may make in its time slice.
+        self.budget = TIME_SLICE
+        # The task's virtual machine state, while it is suspended: its
+        # code, position, environment, value stack and call stack.
+        code = bytecode.compile_function(thunk)
+        self.vm_state = (code, 0, vm._invocation_frame(thunk, code, []),
+                         [], [])
+
+    def wake(self, value):
+        """Make a waiting task ready, and give it its call's value."""
+        self.blocked = False
+        self.vm_state[3].append(value)
+        _make_ready(self)
+
+    def __repr__(self):
+        return '#<task %s>' % ('done' if self.done else 'running')
+
+
+class _MainWaiter(object):
+    """Stands in for the main program, while it waits."""
+    def __init__(self):
+        self.blocked = False
+        self.value = None
+
+    def wake(self, value):
+        self.blocked = False
+        self.value = value
+
+
+class Channel(datatypes.DataType):
+    """A queue of messages between tasks.
+
+    If it has a capacity, senders wait while it is full.  A channel with
+    capacity 0 hands each message straight from a sender to a receiver.
+    """
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.messages = collections.deque()
+        # Waiting receivers, and (waiter, message) pairs for waiting
+        # senders.
+        self.receivers = collections.deque()
+        self.senders = collections.deque()
+
+    def __repr__(self):
+        return '#<channel %d>' % len(self.messages)
+
+
+class BlockingBuiltin(object):
+    """A builtin that may have to wait.
+
+    It wraps an operation, which is given a waiter and the builtin's
+    inputs.  If the operation cannot finish yet, it arranges for the
+    waiter to be woken with the result later, and returns BLOCKED.
+
+    The virtual machine suspends a task that is blocked.  Elsewhere, such
+    as in the main program, calling the builtin runs tasks until it
+    can finish.
+    """
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __call__(self, *inputs):
+        waiter = _MainWaiter()
+        value = self.operation(waiter, *inputs)
+        if value is not BLOCKED:
+            return value
+        while waiter.blocked:
+            if not run_one():
+                raise RuntimeError('Deadlock: waiting, but no task can run.')
+        return waiter.value
+
+
+def run_one():
+    """Run one task until it suspends or finishes.
+
+    If no task is ready, sleep until a sleeper wakes instead.  Returns
+    False if there was nothing to do.
+    """
+    if not _runnable:
+        if not _sleepers:
+            return False
+        delay = _sleepers[0][0] - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        _wake_sleepers()
+        return True
+
+    task = _runnable.popleft()
+    task.ready = False
+    task.budget = TIME_SLICE
+    value = vm.resume(task)
+    _wake_sleepers()
+    if value is vm.SUSPENDED:
+        if not task.blocked:
+            # Its time slice ran out.
+            _make_ready(task)
+    else:
+        task.done = True
+        task.result = value
+        task.vm_state = None
+        while task.joiners:
+            task.joiners.popleft().wake(value)
+    return True
+
+
+def run_until_idle():
+    """Run tasks until all have finished, or wait for each other."""
+    while _runnable or _sleepers:
+        run_one()
+
+
+def others_ready():
+    """Whether any task is ready to run, besides the running ones."""
+    return bool(_runnable)
+
+
+def _make_ready(task):
+    if not task.ready:
+        task.ready = True
+        _runnable.append(task)
+
+
+def _wake_sleepers():
+    """Wake the sleepers whose time has come."""
+    now = time.time()
+    while _sleepers and _sleepers[0][0] <= now:
+        heapq.heappop(_sleepers)[2].wake(None)
+
+
+def _block(waiter, waiters, entry):
+    """Put a waiter in a queue of waiters."""
+    waiter.blocked = True
+    waiters.append(entry)
+    return BLOCKED
+
+
+# The operations of the BlockingBuiltins.
+def _send(waiter, channel, message):
+    assert isinstance(channel, Channel)
+    if channel.receivers:
+        channel.receivers.popleft().wake(message)
+    elif (channel.capacity is None or
+          len(channel.messages) < channel.capacity):
+        channel.messages.append(message)
+    else:
+        return _block(waiter, channel.senders, (waiter, message))
+    return None
+
+
+def _recv(waiter, channel):
+    assert isinstance(channel, Channel)
+    if channel.senders:
+        # Let the first waiting sender's message in.
+        sender, message = channel.senders.popleft()
+        channel.messages.append(message)
+        sender.wake(None)
+    if channel.messages:
+        return channel.messages.popleft()
+    return _block(waiter, channel.receivers, waiter)
+
+
+def _join(waiter, task):
+    assert isinstance(task, Task)
+    if task.done:
+        return task.result
+    return _block(waiter, task.joiners, waiter)
+
+
+def _sleep(waiter, seconds):
+    wake_time = time.time() + float(seconds)
+    waiter.blocked = True
+    heapq.heappush(_sleepers, (wake_time, next(_sleep_order), waiter))
+    return BLOCKED
+
+
+def _yield(waiter):
+    if isinstance(waiter, Task):
+        # Go to the back of the line.
+        waiter.blocked = True
+        waiter.wake(None)
+        return BLOCKED
+    # The main program lets one task run.
+    run_one()
+    return None
+
+
+# Builtins.
+def spawn(thunk):
+    task = Task(thunk)
+    _make_ready(task)
+    return task
+
+
+def make_channel(capacity=datatypes.lisp_bool(False)):
+    if capacity is datatypes.lisp_bool(False):
+        return Channel()
+    return Channel(datatypes.assert_int(capacity))
+
+send = BlockingBuiltin(_send)
+recv = BlockingBuiltin(_recv)
+join = BlockingBuiltin(_join)
+sleep = BlockingBuiltin(_sleep)
+yield_ = BlockingBuiltin(_yield)
@@ -0,0 +1,20 @@
+; Run with --engine cek.  Lisp functions that builtins call back run in
+; the cek engine too, so their recursion is not limited by Python's stack.
+(define (build n acc)
+  (if (< n 1)
+      acc
+    (build (- n 1) (cons n acc))))
+(define (len l)
+  (if (eq? l '())
+      0
+    (+ 1 (len (cdr l)))))
+(define deep (build 20000 '()))
+(len deep)
+(map (lambda (x) (+ x (len deep))) (list 1 2))
+(filter (lambda (x) (< (len deep) x)) (list 1 30000))
+(fold (lambda (x total) (+ total (len deep))) 0 (list 1 2 3))
+(vector-map (lambda (x) (len deep)) (vector 1))
+(define table (make-hash-table))
+(hash-set! table 'deep deep)
+(hash-for-each table (lambda (key value) (set! deep (len value))))
+deep
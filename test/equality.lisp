@@ -0,0 +1,20 @@
+; Interned symbols, and the equivalence predicates.
+(define (same-symbol) 'foo)
+(eq? (same-symbol) (same-symbol))
+(eq? 'foo 'foo)
+(eq? 'foo 'bar)
+(eq? '(1 2) '(1 2))
+(eqv? 2 2)
+(eqv? (/ 1 2) (/ 2 4))
+(eqv? 1 (vector-ref (f64vector 1) 0))
+(eqv? '(1) '(1))
+(equal? '(1 (2 x) 3) (list 1 (list 2 'x) 3))
+(equal? '(1 2) '(1 2 3))
+(equal? (vector 1 '(a)) (vector 1 '(a)))
+(equal? (vector 1) (s64vector 1))
+(equal? (s64vector 1 2) (s64vector 1 2))
+''x
+
+; A written-out quotation is the same as one with a quote mark.
+(eq? (quote ()) '())
+(equal? (quote (a (b))) '(a (b)))
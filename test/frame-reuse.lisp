@@ -0,0 +1,38 @@
+; Tail calls may reuse their caller's frame, unless a closure captured it.
+
+; Each closure keeps its own n.
+(define (make-getters n acc)
+  (if (< n 1)
+      acc
+    (make-getters (- n 1) (cons (lambda () n) acc))))
+(map (lambda (getter) (getter)) (make-getters 3 '()))
+
+; Callees with more arguments and locals than their callers.
+(define (start n)
+  (middle n 0))
+(define (middle n total)
+  (define doubled (+ n n))
+  (if (< n 1)
+      total
+    (begin
+      (print! doubled)
+      (middle (- n 1) (+ total doubled)))))
+(start 3)
+
+; Until a local definition runs, the name still means the global.
+(define x 'global)
+(define (local-x n)
+  (print! x)
+  (define x n)
+  (if (< n 1)
+      x
+    (local-x (- n 1))))
+(local-x 2)
+
+; Tail calls to builtins, and from inside 'let'.
+(define (sum-to n acc)
+  (if (< n 1)
+      (+ acc 0)
+    (let ((next (- n 1)))
+      (sum-to next (+ acc n)))))
+(sum-to 100000 0)
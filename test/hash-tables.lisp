@@ -0,0 +1,50 @@
+(define table (make-hash-table))
+(hash-table? table)
+(hash-set! table 'one 1)
+(hash-set! table "two" 2)
+(hash-set! table (list 1 2 3) 'list)
+(hash-set! table (vector 1 2) 'vector)
+(hash-ref table 'one)
+(hash-ref table (string-append "t" "wo"))
+(hash-ref table (list 1 2 3))
+(hash-ref table (vector 1 2))
+(hash-ref table 'three 'missing)
+(hash-has-key? table "two")
+(hash-count table)
+(hash-set! table 'one 'uno)
+(hash-ref table 'one)
+(hash-delete! table 'one)
+(hash-delete! table 'one)
+(hash-has-key? table 'one)
+(hash-count table)
+
+; Eq tables find numbers by value, and anything else by identity.
+(define by-identity (make-hash-table 'eq))
+(define key (list 'k))
+(hash-set! by-identity key 'found)
+(hash-set! by-identity 10 'ten)
+(define ten-point-oh (vector-ref (f64vector 10) 0))
+(hash-set! by-identity ten-point-oh 'ten-point-oh)
+(hash-ref by-identity key)
+(hash-ref by-identity (list 'k) 'not-found)
+(hash-ref by-identity (+ 5 5))
+(hash-ref by-identity (* ten-point-oh 1))
+
+(define counts (make-hash-table))
+(define (count-word word table)
+  (hash-set! table word (+ 1 (hash-ref table word 0)))
+  table)
+(fold count-word counts '(a b a c b a))
+(hash-ref counts 'a)
+(fold + 0 (hash-values counts))
+(length (hash-keys counts))
+(length (hash->list counts))
+(define total 0)
+(hash-for-each counts (lambda (word n) (set! total (+ total n))))
+total
+
+(define alist (list (cons 'x 1) (cons "y" 2) (cons 3 'three)))
+(assq 'x alist)
+(assv 3 alist)
+(assoc "y" alist)
+(assq 'z alist)
@@ -0,0 +1,28 @@
+(define x 1)
+
+; Until the local definition runs, x still means the global.
+(define (shadow)
+  (print! x)
+  (define x 2)
+  x)
+(shadow)
+(print! x)
+
+(define (make-adder total)
+  (lambda (n)
+    (set! total (+ total n))
+    total))
+(define adder (make-adder 100))
+(adder 1)
+(adder 2)
+
+(let ((p 1))
+  (let ((q 2))
+    (define r 3)
+    (+ p q r)))
+
+(define (parity n)
+  (define (even? n) (if (< n 1) #t (odd? (- n 1))))
+  (define (odd? n) (if (< n 1) #f (even? (- n 1))))
+  (even? n))
+(parity 10)
@@ -0,0 +1,31 @@
+; Quoted data, and the list builtins.
+'(1 2 (3 4) #t foo)
+'()
+'x
+(define xs (list 1 2 3 4 5))
+(length xs)
+(length '())
+(append xs '(6 7) '() '(8))
+(append)
+(append '(1) 2)
+(reverse xs)
+(map square xs)
+(map + xs '(10 20 30))
+(filter (lambda (x) (> x 2)) xs)
+(fold + 0 xs)
+(fold cons '() xs)
+(list-ref xs 3)
+(list->vector xs)
+(vector->list (vector 1 '(2 3) 4))
+(vector->list (s64vector 1 2))
+(cons 1 (cons 2 3))
+(print! (list 1 2))
+(define (count-up n acc)
+  (if (> n 0)
+      (count-up (- n 1) (cons n acc))
+    acc))
+(define long (count-up 100000 '()))
+(length long)
+(list-ref (reverse long) 0)
+(fold + 0 (map square long))
+(length (append long long))
@@ -0,0 +1,43 @@
+; Memoized functions, with LRU eviction.
+(define fib
+  (memoize
+   (lambda (n)
+     (if (< n 2)
+         n
+       (+ (fib (- n 1)) (fib (- n 2)))))))
+(fib 60)
+(memo-stats fib)
+
+; Paths through a grid, with at most 50 cached entries.
+(define (paths x y)
+  (if (if (> x 0) (> y 0) #f)
+      (+ (paths (- x 1) y) (paths x (- y 1)))
+    1))
+(define paths (memoize paths 50))
+(paths 16 16)
+(memo-stats paths)
+
+; Arguments are compared by value, even for lists and symbols.
+(define count-calls 0)
+(define describe
+  (memoize (lambda (thing)
+             (set! count-calls (+ count-calls 1))
+             (length thing))
+           #f 100000))
+(describe '(a b (c d)))
+(describe (list 'a 'b (list 'c 'd)))
+count-calls
+(memo-clear! describe)
+(describe '(a b (c d)))
+count-calls
+(memo-stats describe)
+
+; Exact and inexact arguments are cached apart.
+(define mhalf (memoize (lambda (n) (/ n 2))))
+(define three (vector-ref (f64vector 3) 0))
+(mhalf 3)
+(mhalf three)
+(define mid (memoize (lambda (pair) pair)))
+(mid (list 3 'a))
+(mid (list three 'a))
+(memo-stats mid)
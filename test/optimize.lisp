@@ -0,0 +1,34 @@
+; Code the optimizer changes.  The results must not depend on -O.
+(* 3 3)
+(+ 1 (* 2 3) (- 4))
+(/ 1 3)
+(if (< 1 2) 'yes 'no)
+(if #f 'yes 'no)
+(if '() 'null-is-true 'no)
+(begin 1 (begin 2 (begin 3 4)))
+(begin 1 (begin))
+(let () 1 2 3)
+(let () (define local 5) local)
+(define (f x) (begin (+ x 1)))
+(f 1)
+
+; Shadowed builtins are not used directly.
+(define (g -) (- 10 1))
+(g +)
+(let ((* +)) (* 2 3))
+(define (h x)
+  (define < >)
+  (if (< x 0) 'positive 'not-positive))
+(h 5)
+
+; A builtin that the program redefines is never used directly, even
+; in code that runs before the redefinition.
+(define (early) (max 1 2))
+(define (max a b) (if (> a b) a b))
+(early)
+(define (sub-early) (- 5 3))
+(sub-early)
+(define saved-minus -)
+(begin (set! - +) 'swapped)
+(sub-early)
+(begin (set! - saved-minus) 'restored)
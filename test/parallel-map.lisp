@@ -0,0 +1,13 @@
+; Mapping in worker processes.
+(define offset 100)
+(define (score x) (+ offset (square x)))
+(parallel-map score (list 1 2 3 4 5))
+(parallel-map (lambda (x) (* x 2)) (vector 1 2 3))
+(parallel-map (lambda (x) (* x 2)) (s64vector 1 2 3))
+(parallel-map car '((a 1) (b 2)))
+(define (adder n) (lambda (x) (+ x n)))
+(parallel-map (adder 10) '(1 2 3) 1)
+(map (lambda (f) (f 1)) (parallel-map (lambda (x) (lambda (y) (+ x y))) '(1 2)))
+(define offset 1000)
+(parallel-map score '(1 2))
+(parallel-map score '())
@@ -0,0 +1,51 @@
+(define empty (pmap))
+(define one (pmap-assoc empty 'a 1))
+(define two (pmap-assoc one "b" 2))
+(define three (pmap-assoc two (list 1 2) 'list))
+(pmap? three)
+(pmap-count empty)
+(pmap-count three)
+(pmap-get three 'a)
+(pmap-get three (string-append "" "b"))
+(pmap-get three (list 1 2))
+(pmap-get one "b" 'missing)
+(pmap-has-key? two "b")
+(pmap-has-key? one "b")
+
+; Older versions are left as they were.
+(define changed (pmap-assoc three 'a 'changed))
+(pmap-get changed 'a)
+(pmap-get three 'a)
+(define smaller (pmap-dissoc three 'a))
+(pmap-count smaller)
+(pmap-has-key? smaller 'a)
+(pmap-count three)
+(pmap-count (pmap-dissoc three 'absent))
+(pmap-count (pmap-dissoc (pmap-dissoc smaller "b") (list 1 2)))
+
+(define squares (pmap 1 1 2 4 3 9 4 16))
+(pmap-fold (lambda (key value total) (+ total value)) 0 squares)
+(pmap-fold (lambda (key value count) (+ count 1)) 0 squares)
+(length (pmap->list squares))
+
+; A closure holds on to a snapshot of the state it was made with.
+(define (counter state)
+  (lambda (message)
+    (if (eq? message 'get)
+        state
+      (counter (pmap-assoc state message
+                           (+ 1 (pmap-get state message 0)))))))
+(define start (counter (pmap)))
+(define later ((start 'x) 'x))
+(pmap-get (later 'get) 'x)
+(pmap-count (start 'get))
+
+(define (fill map n)
+  (if (< n 1)
+      map
+    (fill (pmap-assoc map n (* n n)) (- n 1))))
+(define big (fill (pmap) 2000))
+(pmap-count big)
+(pmap-get big 1234)
+(pmap-get (pmap-assoc big 1234 'replaced) 1234)
+(pmap-get big 1234)
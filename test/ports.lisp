@@ -0,0 +1,35 @@
+; Write a file, then read it back in several ways.
+(define path "/tmp/jlisp-ports-test.txt")
+
+(call-with-output-file path
+  (lambda (port)
+    (display "first line" port)
+    (newline port)
+    (write "a \"quoted\" string" port)
+    (newline port)
+    (display 42 port)
+    (newline port)
+    (display '(1 2 3) port)))
+
+(define port (open-input-file path))
+(read-line port)
+(read-char port)
+(read-char port)
+(read-line port)
+(read-line port)
+(read-line port)
+(eof-object? (read-line port))
+(close-port port)
+
+; Streams are read lazily, a line at a time.
+(fold (lambda (line count) (+ count 1)) 0 (file-lines path))
+(stream->list
+  (stream-map (lambda (line) (list 'matched line))
+    (stream-filter (lambda (line) (equal? line "42"))
+      (file-lines path))))
+
+; Without a port, output goes to standard output.
+(display "plain text, then a newline")
+(newline)
+(write #t)
+(newline)
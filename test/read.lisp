@@ -0,0 +1,39 @@
+; Data written out can be read back, without being evaluated.
+(define path "/tmp/jlisp-read-test.txt")
+
+(call-with-output-file path
+  (lambda (port)
+    (write '(record 1 "one" #t (tags a b)) port)
+    (newline port)
+    (display "(record 2 \"two\" #f ()) #(1 (2 3) \"four\")" port)
+    (newline port)
+    (display "'quoted (nested (deeply (inside))) symbol -7 #\\x" port)))
+
+(define port (open-input-file path))
+(define first (read port))
+first
+(car first)
+(eq? (car first) 'record)
+(string? (list-ref first 2))
+(read port)
+(define vec (read port))
+(vector? vec)
+(vector-length vec)
+(vector-ref vec 1)
+(read port)
+(read port)
+(read port)
+(read port)
+(read port)
+(eof-object? (read port))
+(close-port port)
+
+(length (load-data path))
+(fold (lambda (datum count) (+ count 1)) 0 (file-data path))
+(stream->list
+  (stream-filter vector? (file-data path)))
+
+(define string-port (open-input-string "(a (b c)) extra"))
+(read string-port)
+(read string-port)
+(eof-object? (read string-port))
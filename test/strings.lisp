@@ -0,0 +1,42 @@
+(define greeting "Hello, world")
+greeting
+(string? greeting)
+(string-length greeting)
+(string-ref greeting 4)
+(substring greeting 7)
+(substring greeting 0 5)
+(eq? (substring greeting 0 12) greeting)
+(string-append "one" ", " "two" "" ", three")
+(string-split "  several   words here ")
+(string-split "a,b,,c" #\,)
+(string-split "key: value: more" ": ")
+(string=? "abc" (string-append "a" "bc") "abc")
+(string->symbol "sym")
+(eq? (string->symbol "sym") 'sym)
+(symbol->string 'sym)
+(number->string 42)
+(number->string (/ 1 3))
+(string->number "-17")
+(string->number "2/6")
+(string->number "forty")
+(equal? "same" "same")
+(eq? #\a (string-ref "abc" 0))
+(list #\a #\space #\newline #\( #\Z)
+"tab\tand \"quotes\" and \\"
+
+; A string builder.
+(define (report port n)
+  (if (< n 1)
+      (get-output-string port)
+    (begin
+      (display "line " port)
+      (write n port)
+      (newline port)
+      (report port (- n 1)))))
+(display (report (open-output-string) 3))
+
+(define input (open-input-string "first\nsecond"))
+(read-line input)
+(read-char input)
+(read-line input)
+(eof-object? (read-line input))
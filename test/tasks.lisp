@@ -0,0 +1,65 @@
+; Green threads and channels.
+(define results (channel))
+(define (producer name n out)
+  (lambda ()
+    (define (loop i)
+      (if (< i n)
+          (begin
+           (send! out (list name i))
+           (yield)
+           (loop (+ i 1)))
+        'done))
+    (loop 0)))
+(define a (spawn (producer 'a 3 results)))
+(define b (spawn (producer 'b 3 results)))
+(recv results)
+(recv results)
+(recv results)
+(recv results)
+(join a)
+(join b)
+(recv results)
+(recv results)
+
+; A pipeline of stages, through channels of capacity 1.
+(define (stage f in out)
+  (spawn (lambda ()
+           (define (loop)
+             (send! out (f (recv in)))
+             (loop))
+           (loop))))
+(define source (channel 1))
+(define middle (channel 1))
+(define sink (channel 1))
+(define square-stage (stage square source middle))
+(define add-stage (stage (lambda (x) (+ x 1)) middle sink))
+(define feeder
+  (spawn (lambda ()
+           (map (lambda (x) (send! source x)) '(1 2 3 4))
+           'fed)))
+(list (recv sink) (recv sink) (recv sink) (recv sink))
+(join feeder)
+
+; Time slices: a long loop does not starve the others.
+(define (count-to n)
+  (lambda ()
+    (define (loop i)
+      (if (< i n) (loop (+ i 1)) n))
+    (loop 0)))
+(define order (channel))
+(define slow (spawn (lambda () ((count-to 20000)) (send! order (quote slow)))))
+(define fast (spawn (lambda () (send! order (quote fast)))))
+(recv order)
+(recv order)
+
+; Sleepers wait together.
+(define naps (channel))
+(define (napper seconds)
+  (spawn (lambda () (sleep seconds) (send! naps seconds))))
+(define nap-3 (napper (/ 3 10)))
+(define nap-1 (napper (/ 1 10)))
+(define nap-2 (napper (/ 2 10)))
+(list (recv naps) (recv naps) (recv naps))
+
+; Tasks left running finish after the script.
+(define late (spawn (lambda () (print! 'finished-late))))
@@ -0,0 +1,41 @@
+; Typed float64 and int64 vectors, and bulk vector operations.
+(define a (f64vector 1 2 3 4))
+(define b (s64vector 10 20 30 40))
+a
+b
+(vector-sum a)
+(vector-sum b)
+(vector-dot a b)
+(vector+ a b)
+(vector* b 2)
+(vector+ (vector 1 2) (vector (/ 1 2) 3))
+(define s (vector-slice b 1 3))
+s
+(vector-set! s 0 99)
+b
+(vector-length s)
+(vector-map (lambda (x) (* x x)) b)
+(vector-map (lambda (x) (/ x 2)) (vector 1 2))
+(typed-vector->vector a)
+(vector->s64vector (vector 1 2 3))
+(make-f64vector 3 (/ 1 4))
+(f64vector? a)
+(s64vector? a)
+(vector? a)
+(define z (make-s64vector 4))
+(vector-fill! (vector-slice z 2 4) 7)
+z
+(vector-sum (vector 1 (/ 1 2)))
+
+; Integral floats from f64vectors serve as integers.
+(define floats (vector->f64vector (vector 1 3 10)))
+(vector-ref (vector 'zero 'one) (vector-ref floats 0))
+(vector->s64vector floats)
+(s64vector (vector-ref floats 1) (vector-ref floats 2))
+
+; Dividing with an inexact number gives an inexact result.
+(define three (vector-ref (f64vector 3) 0))
+(/ three 10)
+(/ 1 (* three 10))
+(/ 6 three)
+(/ 6 3)
@@ -1,5 +1,9 @@
 class Token(object):
     """A basic, building-block element of the langauge."""
+    # Where the token starts, as a (line, column) pair, if the lexer was
+    # asked to track positions.
+    position = None
+
     def __init__(self, text):
         self.text = text
 
@@ -42,7 +46,7 @@ class BackQuote(Token):
     """A single backquote (i.e. backtick)."""
 
 class CharLiteral(Token):
-    """A character literal, like #\a."""
+    """A character literal, like #\a or #\space."""
 
 class BooleanLiteral(Token):
     """A boolean literal, like #f."""
@@ -0,0 +1,277 @@
+"""Homogeneous numeric vectors, and bulk operations on vectors.
+
+A TypedVector holds only float64 numbers, or only int64 numbers, in
+compact array.array storage.  When NumPy is installed, float64 vectors
+are stored in NumPy arrays instead, and bulk operations on them run in
+NumPy.  int64 vectors always use array.array: NumPy's int64 arithmetic
+silently wraps on overflow, but Lisp integers are exact, so sums and
+products of int64 elements are computed with Python integers.
+
+A TypedVector may be a view of part of another one's storage, so slicing
+never copies elements.
+
+The bulk operations here also accept ordinary datatypes.Vectors, whose
+elements are exact numbers.
+"""
+
+import array
+import operator
+
+import datatypes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ElementType(object):
+    """The type of a TypedVector's elements."""
+    def __init__(self, name, typecode, coerce, use_numpy):
+        # The name used in Lisp, as in 'f64vector'.
+        self.name = name
+        # The array.array typecode.
+        self.typecode = typecode
+        # Converts a Lisp number to an element, or raises an error.
+        self.coerce = coerce
+        # Whether storage is a NumPy array.
+        self.use_numpy = use_numpy
+
+    def new_storage(self, values):
+        """Make storage holding some already-coerced values."""
+        if self.use_numpy:
+            return numpy.array(values, dtype=numpy.float64)
+        return array.array(self.typecode, values)
+
+    def __repr__(self):
+        return self.name
+
+
+def _coerce_int64(value):
+    value = datatypes.assert_int(value)
+    if not -2 ** 63 <= value < 2 ** 63:
+        raise OverflowError('%s does not fit in an int64.' % value)
+    return value
+
+FLOAT64 = ElementType('f64', 'd', float, numpy is not None)
+# Typecode 'l' is a 64-bit C long on the platforms we run on.
+INT64 = ElementType('s64', 'l', _coerce_int64, False)
+
+
+class TypedVector(datatypes.DataType):
+    """A vector whose elements are all float64s or all int64s.
+
+    It shows elements start to stop of its storage.
+    """
+    def __init__(self, element_type, storage, start=0, stop=None):
+        self.element_type = element_type
+        self._storage = storage
+        self._start = start
+        self._stop = len(storage) if stop is None else stop
+
+    @classmethod
+    def from_values(cls, element_type, values):
+        """Make a TypedVector holding some Lisp numbers."""
+        coerce = element_type.coerce
+        return cls(element_type,
+                   element_type.new_storage([coerce(value)
+                                             for value in values]))
+
+    @classmethod
+    def make(cls, element_type, length, fill_value=0):
+        fill_value = element_type.coerce(fill_value)
+        length = datatypes.assert_int(length)
+        if element_type.use_numpy:
+            return cls(element_type, numpy.full(length, fill_value))
+        return cls(element_type,
+                   array.array(element_type.typecode, [fill_value]) * length)
+
+    def _index(self, num):
+        """Get the storage index of an element."""
+        num = datatypes.assert_int(num)
+        if not 0 <= num < self._stop - self._start:
+            raise IndexError('Index %s out of range.' % num)
+        return self._start + num
+
+    def get(self, num):
+        value = self._storage[self._index(num)]
+        # Do not leak NumPy scalars into Lisp.
+        return float(value) if self.element_type is FLOAT64 else value
+
+    def set(self, num, value):
+        self._storage[self._index(num)] = self.element_type.coerce(value)
+
+    def length(self):
+        return self._stop - self._start
+
+    def fill(self, fill_value):
+        fill_value = self.element_type.coerce(fill_value)
+        if self.element_type.use_numpy:
+            self._storage[self._start:self._stop] = fill_value
+        else:
+            self._storage[self._start:self._stop] = array.array(
+                self.element_type.typecode, [fill_value]) * self.length()
+
+    def slice(self, start, stop):
+        """Make a view of some of the elements, sharing their storage."""
+        start, stop = datatypes.assert_int(start), datatypes.assert_int(stop)
+        if not 0 <= start <= stop <= self.length():
+            raise IndexError('Slice %s to %s out of range.' % (start, stop))
+        return TypedVector(self.element_type, self._storage,
+                           self._start + start, self._start + stop)
+
+    def elements(self):
+        """Get the elements, as a sequence of Python numbers.
+
+        With NumPy storage, this is a NumPy view.  Otherwise, it is the
+        storage itself, or a copy of just the viewed elements.
+        """
+        if (self.element_type.use_numpy or
+            (self._start, self._stop) != (0, len(self._storage))):
+            return self._storage[self._start:self._stop]
+        return self._storage
+
+    def as_list(self):
+        return datatypes.make_list(self)
+
+    def __iter__(self):
+        for index in xrange(self._start, self._stop):
+            yield self.get(index - self._start)
+
+    def __repr__(self):
+        fmt = repr if self.element_type is FLOAT64 else str
+        return '#%s(%s)' % (self.element_type.name,
+                            ' '.join(fmt(element) for element in self))
+
+
+def is_vector(candidate):
+    """Whether something is an ordinary or typed vector."""
+    return isinstance(candidate, (datatypes.Vector, TypedVector))
+
+
+def assert_vector(candidate):
+    assert is_vector(candidate)
+    return candidate
+
+
+def to_typed(element_type, vector):
+    """Copy a vector into a new TypedVector."""
+    return TypedVector.from_values(element_type, assert_vector(vector))
+
+
+def to_vector(vector):
+    """Copy a vector into a new ordinary Vector."""
+    return datatypes.Vector(assert_vector(vector))
+
+
+def vector_sum(vector):
+    """Add up all of a vector's elements."""
+    if isinstance(vector, TypedVector):
+        if vector.element_type.use_numpy:
+            return float(vector.elements().sum())
+        return sum(vector.elements())
+    return datatypes.exact(sum(assert_vector(vector)))
+
+
+def vector_dot(left, right):
+    """Compute the dot product of two equally long vectors."""
+    _assert_same_length(left, right)
+    if _both_numpy(left, right):
+        return float(numpy.dot(left.elements(), right.elements()))
+    products = map(operator.mul, _elements(left), _elements(right))
+    if isinstance(left, TypedVector) or isinstance(right, TypedVector):
+        return sum(products)
+    return datatypes.exact(sum(products))
+
+
+def elementwise(operation, left, right):
+    """Apply an arithmetic operator to two vectors, element by element.
+
+    Either argument may also be a number, which is combined with every
+    element of the other.  The result is a float64 vector if either input
+    has floats, an int64 vector if either is typed, and otherwise an
+    ordinary vector.
+    """
+    if not is_vector(left) and not is_vector(right):
+        raise TypeError('Expected a vector: %s, %s.' % (left, right))
+    element_type = _result_type(left, right)
+
+    if element_type is None:
+        # Ordinary vectors hold exact numbers.
+        values = map(operation, *_broadcast(left, right))
+        return datatypes.Vector(datatypes.exact(value) for value in values)
+
+    if element_type.use_numpy:
+        # NumPy would broadcast a length-1 vector; the array path doesn't.
+        if is_vector(left) and is_vector(right):
+            _assert_same_length(left, right)
+        result = operation(_numpy_operand(left), _numpy_operand(right))
+        return TypedVector(element_type, numpy.asarray(result,
+                                                       dtype=numpy.float64))
+    return TypedVector.from_values(element_type,
+                                   map(operation, *_broadcast(left, right)))
+
+
+def vector_map(apply_function, function, vector):
+    """Apply a function to each element, collecting results in a new vector.
+
+    The new vector has the same kind as the original.
+    """
+    results = [apply_function(function, [element])
+               for element in assert_vector(vector)]
+    if isinstance(vector, TypedVector):
+        return TypedVector.from_values(vector.element_type, results)
+    return datatypes.Vector(results)
+
+
+def _elements(vector):
+    if isinstance(vector, TypedVector):
+        return vector.elements()
+    return list(vector)
+
+
+def _assert_same_length(left, right):
+    assert_vector(left)
+    assert_vector(right)
+    if left.length() != right.length():
+        raise ValueError('Vector lengths differ: %s and %s.' %
+                         (left.length(), right.length()))
+
+
+def _both_numpy(left, right):
+    return (isinstance(left, TypedVector) and left.element_type.use_numpy and
+            isinstance(right, TypedVector) and right.element_type.use_numpy)
+
+
+def _result_type(left, right):
+    """Get the element type of an elementwise operation's result."""
+    types = set()
+    for operand in (left, right):
+        if isinstance(operand, TypedVector):
+            types.add(operand.element_type)
+        elif isinstance(operand, float):
+            types.add(FLOAT64)
+    if FLOAT64 in types:
+        return FLOAT64
+    elif INT64 in types:
+        return INT64
+    return None
+
+
+def _broadcast(left, right):
+    """Get equally long element sequences for two operands."""
+    if is_vector(left) and is_vector(right):
+        _assert_same_length(left, right)
+        return _elements(left), _elements(right)
+    elif is_vector(left):
+        return _elements(left), [right] * left.length()
+    else:
+        return [left] * right.length(), _elements(right)
+
+
+def _numpy_operand(operand):
+    if isinstance(operand, TypedVector):
+        return numpy.asarray(operand.elements(), dtype=numpy.float64)
+    elif is_vector(operand):
+        return numpy.array([float(element) for element in operand])
+    return float(operand)
@@ -0,0 +1,221 @@
+"""A stack-based virtual machine, which runs code compiled by bytecode.py.
+
+Calls between LispFunctions do not recurse in Python.  Each activation's
+state-- its code, the position within it and its environment-- lives on
+an explicit call stack, and one dispatch loop runs every instruction.
+A TAIL_CALL replaces the current activation rather than stacking one,
+so tail recursion runs in constant space.
+"""
+
+import bytecode
+import datatypes
+import environment
+import interpreter
+import tasks
+
+# Bound to locals in the dispatch loop, for speed.
+from opcodes import (CONST, LOAD_LOCAL, LOAD_DEREF, LOAD_FREE, DEFINE_SLOT,
+                     DEFINE_FREE, SET_SLOT, SET_FREE, POP, JUMP,
+                     JUMP_IF_FALSE, MAKE_FUNCTION, CALL, TAIL_CALL, RETURN,
+                     LET, END_LET, TIME_START, TIME_END)
+
+# Returned by resume when a task is suspended.
+SUSPENDED = object()
+
+
+def execute(ast, env):
+    """Compile an expression, then run it in an environment."""
+    return run(bytecode.compile_toplevel(ast), env)
+
+
+def apply(function, inputs):
+    """Apply a function to evaluated inputs, running Lisp code in the VM."""
+    if not isinstance(function, datatypes.LispFunction):
+        return function(*inputs)
+    code = bytecode.compile_function(function)
+    return run(code, _invocation_frame(function, code, list(inputs)))
+
+
+def _invocation_frame(function, code, inputs):
+    """Make the frame for a call to a LispFunction."""
+    assert len(inputs) == len(function.arg_names)
+    scope = code.scope
+    if scope.padding:
+        inputs.extend(scope.padding)
+    return environment.Frame(scope, inputs, function.env)
+
+
+def run(code, env):
+    """Run some Code in an environment, and return its result."""
+    return _run(code, 0, env, [], [], None)
+
+
+def resume(task):
+    """Run a tasks.Task until it finishes, or is suspended.
+
+    Returns the task's result, or SUSPENDED.  The task's vm_state holds
+    where to continue from, and is updated when the task is suspended.
+    """
+    code, pc, env, stack, calls = task.vm_state
+    return _run(code, pc, env, stack, calls, task)
+
+
+def _run(code, pc, env, stack, calls, task):
+    """Run code from a position, with a value stack and call stack.
+
+    'calls' holds the suspended activations, as (code, pc, env) triples.
+    If 'task' is not None, we are running that tasks.Task, which may be
+    suspended: see resume.
+    """
+    instructions, constants = code.instructions, code.constants
+    push, pop = stack.append, stack.pop
+    lisp_false = datatypes.lisp_bool(False)
+    unassigned = environment.unassigned
+    LispFunction = datatypes.LispFunction
+    Frame = environment.Frame
+    BlockingBuiltin = tasks.BlockingBuiltin
+
+    while True:
+        opcode, arg = instructions[pc]
+        pc += 1
+
+        if opcode == LOAD_LOCAL:
+            value = env.values[arg]
+            if value is unassigned:
+                # Not defined yet, so it still refers to an outer binding.
+                value = env.parent[env.scope.names[arg]]
+            push(value)
+
+        elif opcode == CONST:
+            push(constants[arg])
+
+        elif opcode == LOAD_FREE:
+            frame = env
+            for _ in xrange(arg[0]):
+                frame = frame.parent
+            push(frame[arg[1]])
+
+        elif opcode == CALL or opcode == TAIL_CALL:
+            if task is not None:
+                task.budget -= 1
+                if task.budget <= 0 and tasks.others_ready():
+                    # Continue with this call when resumed.
+                    task.vm_state = (code, pc - 1, env, stack, calls)
+                    return SUSPENDED
+            if arg:
+                inputs = stack[-arg:]
+                del stack[-arg:]
+            else:
+                inputs = []
+            function = pop()
+            if isinstance(function, LispFunction):
+                callee = function.code
+                if callee is None:
+                    callee = bytecode.compile_function(function)
+                if opcode == CALL:
+                    calls.append((code, pc, env))
+                assert len(inputs) == len(function.arg_names)
+                scope = callee.scope
+                if scope.padding:
+                    inputs.extend(scope.padding)
+                env = Frame(scope, inputs, function.env)
+                code = callee
+                instructions, constants = code.instructions, code.constants
+                pc = 0
+            elif task is not None and function.__class__ is BlockingBuiltin:
+                # Save our state first: the operation may wake the task.
+                task.vm_state = (code, pc, env, stack, calls)
+                value = function.operation(task, *inputs)
+                if value is tasks.BLOCKED:
+                    # Whatever wakes the task pushes the call's value.
+                    return SUSPENDED
+                push(value)
+            else:
+                # It's a builtin Python function.  After a TAIL_CALL, the
+                # next instruction to run is a RETURN.
+                push(function(*inputs))
+
+        elif opcode == JUMP_IF_FALSE:
+            if pop() == lisp_false:
+                pc = arg
+
+        elif opcode == RETURN:
+            if not calls:
+                return pop()
+            code, pc, env = calls.pop()
+            instructions, constants = code.instructions, code.constants
+
+        elif opcode == JUMP:
+            pc = arg
+
+        elif opcode == POP:
+            pop()
+
+        elif opcode == LOAD_DEREF:
+            frame = env
+            for _ in xrange(arg[0]):
+                frame = frame.parent
+            value = frame.values[arg[1]]
+            if value is unassigned:
+                value = frame.parent[frame.scope.names[arg[1]]]
+            push(value)
+
+        elif opcode == MAKE_FUNCTION:
+            template = constants[arg]
+            function = LispFunction(env, template.arg_names, template.exprs,
+                                    template.name)
+            function.scope = template.code.scope
+            function.code = template.code
+            push(function)
+
+        elif opcode == LET:
+            scope_index, count = arg
+            scope = constants[scope_index]
+            if count:
+                values = stack[-count:]
+                del stack[-count:]
+            else:
+                values = []
+            if scope.padding:
+                values.extend(scope.padding)
+            env = Frame(scope, values, env)
+
+        elif opcode == END_LET:
+            env = env.parent
+
+        elif opcode == DEFINE_SLOT or opcode == SET_SLOT:
+            frame = env
+            for _ in xrange(arg[0]):
+                frame = frame.parent
+            index = arg[1]
+            original = frame.values[index]
+            if opcode == DEFINE_SLOT:
+                frame.values[index] = pop()
+                push(None)
+            elif original is unassigned:
+                # Not defined yet, so it still refers to an outer binding.
+                push(frame.parent.redefine(frame.scope.names[index], pop()))
+            else:
+                frame.values[index] = pop()
+                push(original)
+
+        elif opcode == DEFINE_FREE or opcode == SET_FREE:
+            frame = env
+            for _ in xrange(arg[0]):
+                frame = frame.parent
+            if opcode == DEFINE_FREE:
+                frame[arg[1]] = pop()
+                push(None)
+            else:
+                push(frame.redefine(arg[1], pop()))
+
+        elif opcode == TIME_START:
+            push(interpreter.start_timer())
+
+        elif opcode == TIME_END:
+            value = pop()
+            interpreter.report_time(pop())
+            push(value)
+
+        else:
+            raise ValueError('Unknown opcode %s.' % opcode)